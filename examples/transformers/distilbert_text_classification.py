@@ -2,7 +2,7 @@ import time
 import json
 import torch
 import numpy as np
-from typing import Mapping, Dict
+from typing import Mapping, Dict, List, Sequence
 from transformers import AutoTokenizer, AutoModelForSequenceClassification #
 
 from chassisml import ChassisModel #
@@ -16,31 +16,40 @@ distilbert_model = AutoModelForSequenceClassification.from_pretrained("bhadresh-
 labels = distilbert_model.config.id2label
 
 # define predict function #
-def predict(inputs: Mapping[str, bytes]) -> Dict[str, bytes]:
-    text = inputs['input.txt'].decode()
-    inputs = tokenizer(text, return_tensors="pt")
+def predict(inputs: Sequence[Mapping[str, bytes]]) -> List[Dict[str, bytes]]:
+    texts = [i['input.txt'].decode() for i in inputs]
+    # pad each batch to its longest text
+    tokens = tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
     # run preprocessed data through model
     with torch.no_grad():
-        logits = distilbert_model(**inputs).logits
+        logits = distilbert_model(**tokens).logits
         softmax = torch.nn.functional.softmax(logits, dim=1).detach().cpu().numpy()
 
     # postprocess 
-    indices = np.argsort(softmax)[0][::-1]
-    results = {
-        "data": {
-            "result": {
-                "classPredictions": [{"class": labels[i], "score": round(softmax[0][i].item(), 4)} for i in indices]
+    outputs = []
+    for scores in softmax:
+        indices = np.argsort(scores)[::-1]
+        results = {
+            "data": {
+                "result": {
+                    "classPredictions": [{"class": labels[i], "score": round(scores[i].item(), 4)} for i in indices]
+                }
             }
         }
-    }        
-    return {'results.json': json.dumps(results).encode()}
+        outputs.append({'results.json': json.dumps(results).encode()})
+    return outputs
+
+# batch texts of similar length together so that less padding is computed #
+def text_length(inputs: Mapping[str, bytes]) -> int:
+    return len(inputs['input.txt'])
 
 # create chassis model object
-chassis_model = ChassisModel(process_fn=predict)                       # 
+chassis_model = ChassisModel(process_fn=predict, batch_size=8, bucket_key=text_length)  # 
 # add metadata & requirements
 chassis_model.add_requirements(["transformers", "torch", "numpy"])     # 
 chassis_model.metadata.model_name = "DistilBERT Text Classification"   # 
 chassis_model.metadata.model_version = "0.0.1"
+chassis_model.metadata.batch_size = 8
 chassis_model.metadata.add_input(                                                                    
     key="input.txt",
     accepted_media_types=["text/plain"],
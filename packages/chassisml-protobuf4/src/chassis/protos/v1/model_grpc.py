@@ -22,6 +22,10 @@ class ModzyModelBase(abc.ABC):
     async def Run(self, stream: 'grpclib.server.Stream[chassis.protos.v1.model_pb2.RunRequest, chassis.protos.v1.model_pb2.RunResponse]') -> None:
         pass
 
+    @abc.abstractmethod
+    async def RunStream(self, stream: 'grpclib.server.Stream[chassis.protos.v1.model_pb2.RunRequest, chassis.protos.v1.model_pb2.RunResponse]') -> None:
+        pass
+
     @abc.abstractmethod
     async def Shutdown(self, stream: 'grpclib.server.Stream[chassis.protos.v1.model_pb2.ShutdownRequest, chassis.protos.v1.model_pb2.ShutdownResponse]') -> None:
         pass
@@ -40,6 +44,12 @@ class ModzyModelBase(abc.ABC):
                 chassis.protos.v1.model_pb2.RunRequest,
                 chassis.protos.v1.model_pb2.RunResponse,
             ),
+            '/ModzyModel/RunStream': grpclib.const.Handler(
+                self.RunStream,
+                grpclib.const.Cardinality.STREAM_STREAM,
+                chassis.protos.v1.model_pb2.RunRequest,
+                chassis.protos.v1.model_pb2.RunResponse,
+            ),
             '/ModzyModel/Shutdown': grpclib.const.Handler(
                 self.Shutdown,
                 grpclib.const.Cardinality.UNARY_UNARY,
@@ -64,6 +74,12 @@ class ModzyModelStub:
             chassis.protos.v1.model_pb2.RunRequest,
             chassis.protos.v1.model_pb2.RunResponse,
         )
+        self.RunStream = grpclib.client.StreamStreamMethod(
+            channel,
+            '/ModzyModel/RunStream',
+            chassis.protos.v1.model_pb2.RunRequest,
+            chassis.protos.v1.model_pb2.RunResponse,
+        )
         self.Shutdown = grpclib.client.UnaryUnaryMethod(
             channel,
             '/ModzyModel/Shutdown',
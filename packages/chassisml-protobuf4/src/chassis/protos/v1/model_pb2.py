@@ -13,7 +13,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1d\x63hassis/protos/v1/model.proto\"\x0f\n\rStatusRequest\"p\n\tModelInfo\x12\x12\n\nmodel_name\x18\x01 \x01(\t\x12\x15\n\rmodel_version\x18\x02 \x01(\t\x12\x14\n\x0cmodel_author\x18\x03 \x01(\t\x12\x12\n\nmodel_type\x18\x04 \x01(\t\x12\x0e\n\x06source\x18\x05 \x01(\t\"\\\n\x10ModelDescription\x12\x0f\n\x07summary\x18\x01 \x01(\t\x12\x0f\n\x07\x64\x65tails\x18\x02 \x01(\t\x12\x11\n\ttechnical\x18\x03 \x01(\t\x12\x13\n\x0bperformance\x18\x04 \x01(\t\"c\n\nModelInput\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x1c\n\x14\x61\x63\x63\x65pted_media_types\x18\x02 \x03(\t\x12\x10\n\x08max_size\x18\x03 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x04 \x01(\t\"Z\n\x0bModelOutput\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x12\n\nmedia_type\x18\x02 \x01(\t\x12\x10\n\x08max_size\x18\x03 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x04 \x01(\t\"J\n\x0eModelResources\x12\x14\n\x0crequired_ram\x18\x01 \x01(\t\x12\x10\n\x08num_cpus\x18\x02 \x01(\x02\x12\x10\n\x08num_gpus\x18\x03 \x01(\x05\"+\n\x0cModelTimeout\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0b\n\x03run\x18\x02 \x01(\t\"\x9f\x01\n\rModelFeatures\x12\x1b\n\x13\x61\x64versarial_defense\x18\x01 \x01(\x08\x12\x12\n\nbatch_size\x18\x02 \x01(\x05\x12\x13\n\x0bretrainable\x18\x03 \x01(\x08\x12\x16\n\x0eresults_format\x18\x04 \x01(\t\x12\x14\n\x0c\x64rift_format\x18\x05 \x01(\t\x12\x1a\n\x12\x65xplanation_format\x18\x06 \x01(\t\"\xb0\x02\n\x0eStatusResponse\x12\x13\n\x0bstatus_code\x18\x01 \x01(\x05\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\x12\x1e\n\nmodel_info\x18\x04 \x01(\x0b\x32\n.ModelInfo\x12&\n\x0b\x64\x65scription\x18\x05 \x01(\x0b\x32\x11.ModelDescription\x12\x1b\n\x06inputs\x18\x06 \x03(\x0b\x32\x0b.ModelInput\x12\x1d\n\x07outputs\x18\x07 \x03(\x0b\x32\x0c.ModelOutput\x12\"\n\tresources\x18\x08 \x01(\x0b\x32\x0f.ModelResources\x12\x1e\n\x07timeout\x18\t \x01(\x0b\x32\r.ModelTimeout\x12 \n\x08\x66\x65\x61tures\x18\n \x01(\x0b\x32\x0e.ModelFeatures\"_\n\tInputItem\x12$\n\x05input\x18\x01 \x03(\x0b\x32\x15.InputItem.InputEntry\x1a,\n\nInputEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c:\x02\x38\x01\"O\n\nRunRequest\x12\x1a\n\x06inputs\x18\x01 \x03(\x0b\x32\n.InputItem\x12\x14\n\x0c\x64\x65tect_drift\x18\x02 \x01(\x08\x12\x0f\n\x07\x65xplain\x18\x03 \x01(\x08\"u\n\nOutputItem\x12\'\n\x06output\x18\x01 \x03(\x0b\x32\x17.OutputItem.OutputEntry\x12\x0f\n\x07success\x18\x02 \x01(\x08\x1a-\n\x0bOutputEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c:\x02\x38\x01\"a\n\x0bRunResponse\x12\x13\n\x0bstatus_code\x18\x01 \x01(\x05\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\x12\x1c\n\x07outputs\x18\x04 \x03(\x0b\x32\x0b.OutputItem\"\x11\n\x0fShutdownRequest\"H\n\x10ShutdownResponse\x12\x13\n\x0bstatus_code\x18\x01 \x01(\x05\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07message\x18\x03 \x01(\t2\x8a\x01\n\nModzyModel\x12)\n\x06Status\x12\x0e.StatusRequest\x1a\x0f.StatusResponse\x12 \n\x03Run\x12\x0b.RunRequest\x1a\x0c.RunResponse\x12/\n\x08Shutdown\x12\x10.ShutdownRequest\x1a\x11.ShutdownResponseB\x18\n\x14\x63om.modzy.model.grpcP\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1d\x63hassis/protos/v1/model.proto\"\x0f\n\rStatusRequest\"p\n\tModelInfo\x12\x12\n\nmodel_name\x18\x01 \x01(\t\x12\x15\n\rmodel_version\x18\x02 \x01(\t\x12\x14\n\x0cmodel_author\x18\x03 \x01(\t\x12\x12\n\nmodel_type\x18\x04 \x01(\t\x12\x0e\n\x06source\x18\x05 \x01(\t\"\\\n\x10ModelDescription\x12\x0f\n\x07summary\x18\x01 \x01(\t\x12\x0f\n\x07\x64\x65tails\x18\x02 \x01(\t\x12\x11\n\ttechnical\x18\x03 \x01(\t\x12\x13\n\x0bperformance\x18\x04 \x01(\t\"\x81\x01\n\nModelInput\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x1c\n\x14\x61\x63\x63\x65pted_media_types\x18\x02 \x03(\t\x12\x10\n\x08max_size\x18\x03 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x04 \x01(\t\x12\r\n\x05\x64type\x18\x05 \x01(\t\x12\r\n\x05shape\x18\x06 \x03(\x03\"x\n\x0bModelOutput\x12\x10\n\x08\x66ilename\x18\x01 \x01(\t\x12\x12\n\nmedia_type\x18\x02 \x01(\t\x12\x10\n\x08max_size\x18\x03 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x04 \x01(\t\x12\r\n\x05\x64type\x18\x05 \x01(\t\x12\r\n\x05shape\x18\x06 \x03(\x03\"J\n\x0eModelResources\x12\x14\n\x0crequired_ram\x18\x01 \x01(\t\x12\x10\n\x08num_cpus\x18\x02 \x01(\x02\x12\x10\n\x08num_gpus\x18\x03 \x01(\x05\"+\n\x0cModelTimeout\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0b\n\x03run\x18\x02 \x01(\t\"\x9f\x01\n\rModelFeatures\x12\x1b\n\x13\x61\x64versarial_defense\x18\x01 \x01(\x08\x12\x12\n\nbatch_size\x18\x02 \x01(\x05\x12\x13\n\x0bretrainable\x18\x03 \x01(\x08\x12\x16\n\x0eresults_format\x18\x04 \x01(\t\x12\x14\n\x0c\x64rift_format\x18\x05 \x01(\t\x12\x1a\n\x12\x65xplanation_format\x18\x06 \x01(\t\"\xb0\x02\n\x0eStatusResponse\x12\x13\n\x0bstatus_code\x18\x01 \x01(\x05\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\x12\x1e\n\nmodel_info\x18\x04 \x01(\x0b\x32\n.ModelInfo\x12&\n\x0b\x64\x65scription\x18\x05 \x01(\x0b\x32\x11.ModelDescription\x12\x1b\n\x06inputs\x18\x06 \x03(\x0b\x32\x0b.ModelInput\x12\x1d\n\x07outputs\x18\x07 \x03(\x0b\x32\x0c.ModelOutput\x12\"\n\tresources\x18\x08 \x01(\x0b\x32\x0f.ModelResources\x12\x1e\n\x07timeout\x18\t \x01(\x0b\x32\r.ModelTimeout\x12 \n\x08\x66\x65\x61tures\x18\n \x01(\x0b\x32\x0e.ModelFeatures\"4\n\x06Tensor\x12\r\n\x05\x64type\x18\x01 \x01(\t\x12\r\n\x05shape\x18\x02 \x03(\x03\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\x0c\"\xc2\x01\n\tInputItem\x12$\n\x05input\x18\x01 \x03(\x0b\x32\x15.InputItem.InputEntry\x12(\n\x07tensors\x18\x02 \x03(\x0b\x32\x17.InputItem.TensorsEntry\x1a,\n\nInputEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c:\x02\x38\x01\x1a\x37\n\x0cTensorsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.Tensor:\x02\x38\x01\"O\n\nRunRequest\x12\x1a\n\x06inputs\x18\x01 \x03(\x0b\x32\n.InputItem\x12\x14\n\x0c\x64\x65tect_drift\x18\x02 \x01(\x08\x12\x0f\n\x07\x65xplain\x18\x03 \x01(\x08\"\xd9\x01\n\nOutputItem\x12\'\n\x06output\x18\x01 \x03(\x0b\x32\x17.OutputItem.OutputEntry\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12)\n\x07tensors\x18\x03 \x03(\x0b\x32\x18.OutputItem.TensorsEntry\x1a-\n\x0bOutputEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c:\x02\x38\x01\x1a\x37\n\x0cTensorsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.Tensor:\x02\x38\x01\"a\n\x0bRunResponse\x12\x13\n\x0bstatus_code\x18\x01 \x01(\x05\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07message\x18\x03 \x01(\t\x12\x1c\n\x07outputs\x18\x04 \x03(\x0b\x32\x0b.OutputItem\"\x11\n\x0fShutdownRequest\"H\n\x10ShutdownResponse\x12\x13\n\x0bstatus_code\x18\x01 \x01(\x05\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0f\n\x07message\x18\x03 \x01(\t2\xb6\x01\n\nModzyModel\x12)\n\x06Status\x12\x0e.StatusRequest\x1a\x0f.StatusResponse\x12 \n\x03Run\x12\x0b.RunRequest\x1a\x0c.RunResponse\x12*\n\tRunStream\x12\x0b.RunRequest\x1a\x0c.RunResponse(\x01\x30\x01\x12/\n\x08Shutdown\x12\x10.ShutdownRequest\x1a\x11.ShutdownResponseB\x18\n\x14\x63om.modzy.model.grpcP\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -24,42 +24,52 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._serialized_options = b'\n\024com.modzy.model.grpcP\001'
   _INPUTITEM_INPUTENTRY._options = None
   _INPUTITEM_INPUTENTRY._serialized_options = b'8\001'
+  _INPUTITEM_TENSORSENTRY._options = None
+  _INPUTITEM_TENSORSENTRY._serialized_options = b'8\001'
   _OUTPUTITEM_OUTPUTENTRY._options = None
   _OUTPUTITEM_OUTPUTENTRY._serialized_options = b'8\001'
+  _OUTPUTITEM_TENSORSENTRY._options = None
+  _OUTPUTITEM_TENSORSENTRY._serialized_options = b'8\001'
   _globals['_STATUSREQUEST']._serialized_start=33
   _globals['_STATUSREQUEST']._serialized_end=48
   _globals['_MODELINFO']._serialized_start=50
   _globals['_MODELINFO']._serialized_end=162
   _globals['_MODELDESCRIPTION']._serialized_start=164
   _globals['_MODELDESCRIPTION']._serialized_end=256
-  _globals['_MODELINPUT']._serialized_start=258
-  _globals['_MODELINPUT']._serialized_end=357
-  _globals['_MODELOUTPUT']._serialized_start=359
-  _globals['_MODELOUTPUT']._serialized_end=449
-  _globals['_MODELRESOURCES']._serialized_start=451
-  _globals['_MODELRESOURCES']._serialized_end=525
-  _globals['_MODELTIMEOUT']._serialized_start=527
-  _globals['_MODELTIMEOUT']._serialized_end=570
-  _globals['_MODELFEATURES']._serialized_start=573
-  _globals['_MODELFEATURES']._serialized_end=732
-  _globals['_STATUSRESPONSE']._serialized_start=735
-  _globals['_STATUSRESPONSE']._serialized_end=1039
-  _globals['_INPUTITEM']._serialized_start=1041
-  _globals['_INPUTITEM']._serialized_end=1136
-  _globals['_INPUTITEM_INPUTENTRY']._serialized_start=1092
-  _globals['_INPUTITEM_INPUTENTRY']._serialized_end=1136
-  _globals['_RUNREQUEST']._serialized_start=1138
-  _globals['_RUNREQUEST']._serialized_end=1217
-  _globals['_OUTPUTITEM']._serialized_start=1219
-  _globals['_OUTPUTITEM']._serialized_end=1336
-  _globals['_OUTPUTITEM_OUTPUTENTRY']._serialized_start=1291
-  _globals['_OUTPUTITEM_OUTPUTENTRY']._serialized_end=1336
-  _globals['_RUNRESPONSE']._serialized_start=1338
-  _globals['_RUNRESPONSE']._serialized_end=1435
-  _globals['_SHUTDOWNREQUEST']._serialized_start=1437
-  _globals['_SHUTDOWNREQUEST']._serialized_end=1454
-  _globals['_SHUTDOWNRESPONSE']._serialized_start=1456
-  _globals['_SHUTDOWNRESPONSE']._serialized_end=1528
-  _globals['_MODZYMODEL']._serialized_start=1531
-  _globals['_MODZYMODEL']._serialized_end=1669
+  _globals['_MODELINPUT']._serialized_start=259
+  _globals['_MODELINPUT']._serialized_end=388
+  _globals['_MODELOUTPUT']._serialized_start=390
+  _globals['_MODELOUTPUT']._serialized_end=510
+  _globals['_MODELRESOURCES']._serialized_start=512
+  _globals['_MODELRESOURCES']._serialized_end=586
+  _globals['_MODELTIMEOUT']._serialized_start=588
+  _globals['_MODELTIMEOUT']._serialized_end=631
+  _globals['_MODELFEATURES']._serialized_start=634
+  _globals['_MODELFEATURES']._serialized_end=793
+  _globals['_STATUSRESPONSE']._serialized_start=796
+  _globals['_STATUSRESPONSE']._serialized_end=1100
+  _globals['_TENSOR']._serialized_start=1102
+  _globals['_TENSOR']._serialized_end=1154
+  _globals['_INPUTITEM']._serialized_start=1157
+  _globals['_INPUTITEM']._serialized_end=1351
+  _globals['_INPUTITEM_INPUTENTRY']._serialized_start=1250
+  _globals['_INPUTITEM_INPUTENTRY']._serialized_end=1294
+  _globals['_INPUTITEM_TENSORSENTRY']._serialized_start=1296
+  _globals['_INPUTITEM_TENSORSENTRY']._serialized_end=1351
+  _globals['_RUNREQUEST']._serialized_start=1353
+  _globals['_RUNREQUEST']._serialized_end=1432
+  _globals['_OUTPUTITEM']._serialized_start=1435
+  _globals['_OUTPUTITEM']._serialized_end=1652
+  _globals['_OUTPUTITEM_OUTPUTENTRY']._serialized_start=1550
+  _globals['_OUTPUTITEM_OUTPUTENTRY']._serialized_end=1595
+  _globals['_OUTPUTITEM_TENSORSENTRY']._serialized_start=1296
+  _globals['_OUTPUTITEM_TENSORSENTRY']._serialized_end=1351
+  _globals['_RUNRESPONSE']._serialized_start=1654
+  _globals['_RUNRESPONSE']._serialized_end=1751
+  _globals['_SHUTDOWNREQUEST']._serialized_start=1753
+  _globals['_SHUTDOWNREQUEST']._serialized_end=1770
+  _globals['_SHUTDOWNRESPONSE']._serialized_start=1772
+  _globals['_SHUTDOWNRESPONSE']._serialized_end=1844
+  _globals['_MODZYMODEL']._serialized_start=1847
+  _globals['_MODZYMODEL']._serialized_end=2029
 # @@protoc_insertion_point(module_scope)
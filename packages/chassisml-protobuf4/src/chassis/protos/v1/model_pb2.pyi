@@ -36,28 +36,36 @@ class ModelDescription(_message.Message):
     def __init__(self, summary: _Optional[str] = ..., details: _Optional[str] = ..., technical: _Optional[str] = ..., performance: _Optional[str] = ...) -> None: ...
 
 class ModelInput(_message.Message):
-    __slots__ = ["filename", "accepted_media_types", "max_size", "description"]
+    __slots__ = ["filename", "accepted_media_types", "max_size", "description", "dtype", "shape"]
     FILENAME_FIELD_NUMBER: _ClassVar[int]
     ACCEPTED_MEDIA_TYPES_FIELD_NUMBER: _ClassVar[int]
     MAX_SIZE_FIELD_NUMBER: _ClassVar[int]
     DESCRIPTION_FIELD_NUMBER: _ClassVar[int]
+    DTYPE_FIELD_NUMBER: _ClassVar[int]
+    SHAPE_FIELD_NUMBER: _ClassVar[int]
     filename: str
     accepted_media_types: _containers.RepeatedScalarFieldContainer[str]
     max_size: str
     description: str
-    def __init__(self, filename: _Optional[str] = ..., accepted_media_types: _Optional[_Iterable[str]] = ..., max_size: _Optional[str] = ..., description: _Optional[str] = ...) -> None: ...
+    dtype: str
+    shape: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, filename: _Optional[str] = ..., accepted_media_types: _Optional[_Iterable[str]] = ..., max_size: _Optional[str] = ..., description: _Optional[str] = ..., dtype: _Optional[str] = ..., shape: _Optional[_Iterable[int]] = ...) -> None: ...
 
 class ModelOutput(_message.Message):
-    __slots__ = ["filename", "media_type", "max_size", "description"]
+    __slots__ = ["filename", "media_type", "max_size", "description", "dtype", "shape"]
     FILENAME_FIELD_NUMBER: _ClassVar[int]
     MEDIA_TYPE_FIELD_NUMBER: _ClassVar[int]
     MAX_SIZE_FIELD_NUMBER: _ClassVar[int]
     DESCRIPTION_FIELD_NUMBER: _ClassVar[int]
+    DTYPE_FIELD_NUMBER: _ClassVar[int]
+    SHAPE_FIELD_NUMBER: _ClassVar[int]
     filename: str
     media_type: str
     max_size: str
     description: str
-    def __init__(self, filename: _Optional[str] = ..., media_type: _Optional[str] = ..., max_size: _Optional[str] = ..., description: _Optional[str] = ...) -> None: ...
+    dtype: str
+    shape: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, filename: _Optional[str] = ..., media_type: _Optional[str] = ..., max_size: _Optional[str] = ..., description: _Optional[str] = ..., dtype: _Optional[str] = ..., shape: _Optional[_Iterable[int]] = ...) -> None: ...
 
 class ModelResources(_message.Message):
     __slots__ = ["required_ram", "num_cpus", "num_gpus"]
@@ -117,8 +125,18 @@ class StatusResponse(_message.Message):
     features: ModelFeatures
     def __init__(self, status_code: _Optional[int] = ..., status: _Optional[str] = ..., message: _Optional[str] = ..., model_info: _Optional[_Union[ModelInfo, _Mapping]] = ..., description: _Optional[_Union[ModelDescription, _Mapping]] = ..., inputs: _Optional[_Iterable[_Union[ModelInput, _Mapping]]] = ..., outputs: _Optional[_Iterable[_Union[ModelOutput, _Mapping]]] = ..., resources: _Optional[_Union[ModelResources, _Mapping]] = ..., timeout: _Optional[_Union[ModelTimeout, _Mapping]] = ..., features: _Optional[_Union[ModelFeatures, _Mapping]] = ...) -> None: ...
 
+class Tensor(_message.Message):
+    __slots__ = ["dtype", "shape", "data"]
+    DTYPE_FIELD_NUMBER: _ClassVar[int]
+    SHAPE_FIELD_NUMBER: _ClassVar[int]
+    DATA_FIELD_NUMBER: _ClassVar[int]
+    dtype: str
+    shape: _containers.RepeatedScalarFieldContainer[int]
+    data: bytes
+    def __init__(self, dtype: _Optional[str] = ..., shape: _Optional[_Iterable[int]] = ..., data: _Optional[bytes] = ...) -> None: ...
+
 class InputItem(_message.Message):
-    __slots__ = ["input"]
+    __slots__ = ["input", "tensors"]
     class InputEntry(_message.Message):
         __slots__ = ["key", "value"]
         KEY_FIELD_NUMBER: _ClassVar[int]
@@ -126,9 +144,18 @@ class InputItem(_message.Message):
         key: str
         value: bytes
         def __init__(self, key: _Optional[str] = ..., value: _Optional[bytes] = ...) -> None: ...
+    class TensorsEntry(_message.Message):
+        __slots__ = ["key", "value"]
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: Tensor
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[_Union[Tensor, _Mapping]] = ...) -> None: ...
     INPUT_FIELD_NUMBER: _ClassVar[int]
+    TENSORS_FIELD_NUMBER: _ClassVar[int]
     input: _containers.ScalarMap[str, bytes]
-    def __init__(self, input: _Optional[_Mapping[str, bytes]] = ...) -> None: ...
+    tensors: _containers.MessageMap[str, Tensor]
+    def __init__(self, input: _Optional[_Mapping[str, bytes]] = ..., tensors: _Optional[_Mapping[str, Tensor]] = ...) -> None: ...
 
 class RunRequest(_message.Message):
     __slots__ = ["inputs", "detect_drift", "explain"]
@@ -141,7 +168,7 @@ class RunRequest(_message.Message):
     def __init__(self, inputs: _Optional[_Iterable[_Union[InputItem, _Mapping]]] = ..., detect_drift: bool = ..., explain: bool = ...) -> None: ...
 
 class OutputItem(_message.Message):
-    __slots__ = ["output", "success"]
+    __slots__ = ["output", "success", "tensors"]
     class OutputEntry(_message.Message):
         __slots__ = ["key", "value"]
         KEY_FIELD_NUMBER: _ClassVar[int]
@@ -149,11 +176,20 @@ class OutputItem(_message.Message):
         key: str
         value: bytes
         def __init__(self, key: _Optional[str] = ..., value: _Optional[bytes] = ...) -> None: ...
+    class TensorsEntry(_message.Message):
+        __slots__ = ["key", "value"]
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: Tensor
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[_Union[Tensor, _Mapping]] = ...) -> None: ...
     OUTPUT_FIELD_NUMBER: _ClassVar[int]
     SUCCESS_FIELD_NUMBER: _ClassVar[int]
+    TENSORS_FIELD_NUMBER: _ClassVar[int]
     output: _containers.ScalarMap[str, bytes]
     success: bool
-    def __init__(self, output: _Optional[_Mapping[str, bytes]] = ..., success: bool = ...) -> None: ...
+    tensors: _containers.MessageMap[str, Tensor]
+    def __init__(self, output: _Optional[_Mapping[str, bytes]] = ..., success: bool = ..., tensors: _Optional[_Mapping[str, Tensor]] = ...) -> None: ...
 
 class RunResponse(_message.Message):
     __slots__ = ["status_code", "status", "message", "outputs"]
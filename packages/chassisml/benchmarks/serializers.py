@@ -0,0 +1,41 @@
+"""
+Compares the JSON serializers in `chassis.runtime.serializers` on the kind of
+results legacy predict functions return.
+
+Usage:
+    python benchmarks/serializers.py [--size 1000000] [--repeat 5]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from chassis.runtime.serializers import SERIALIZER_JSON, SERIALIZER_ORJSON, get_serializer, orjson
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = {
+        "float64 array": {"scores": rng.random(args.size)},
+        "float32 array": {"scores": rng.random(args.size, dtype=np.float32)},
+        "int64 array": {"labels": rng.integers(0, 1000, args.size)},
+        "list of float32 scalars": {"scores": list(rng.random(args.size // 10, dtype=np.float32))},
+    }
+    names = [SERIALIZER_JSON] + ([SERIALIZER_ORJSON] if orjson is not None else [])
+    print(f"{'result':<26}" + "".join(f"{n:>12}" for n in names) + f"{'speedup':>10}")
+    for label, result in results.items():
+        timings = []
+        for name in names:
+            serializer = get_serializer(name)
+            timings.append(min(timeit.repeat(lambda: serializer.dumps(result), number=1, repeat=args.repeat)))
+        speedup = f"{timings[0] / timings[-1]:>9.1f}x" if len(timings) > 1 else ""
+        print(f"{label:<26}" + "".join(f"{t * 1000:>10.1f}ms" for t in timings) + speedup)
+
+
+if __name__ == "__main__":
+    main()
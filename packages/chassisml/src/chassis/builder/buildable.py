@@ -1,20 +1,21 @@
 from __future__ import annotations
 
 import abc
+import json
 import os
-import posixpath
 import shutil
 import subprocess
 import sys
 from shutil import copy, copytree
 from typing import List, Union
 
-import cloudpickle
 from jinja2 import Environment, PackageLoader, select_autoescape
 
 from chassis.builder import BuildContext
 from chassis.metadata import ModelMetadata
-from chassis.runtime import PACKAGE_DATA_PATH, python_pickle_filename_for_key
+from chassis.runtime import MMAP_MANIFEST_FILENAME, PACKAGE_DATA_PATH, pickling, python_pickle_filename_for_key
+from chassis.runtime.artifacts import get_packaged_path
+from chassis.runtime.transport import parse_size
 from .options import BuildOptions, DefaultBuildOptions
 from .errors import RequiredFieldMissing
 
@@ -63,6 +64,8 @@ class Buildable(metaclass=abc.ABCMeta):
         apt_packages: A set of `apt-get` packages required by this model.
         additional_files: A set of additional files required by the model
             at runtime.
+        mmap_files: The subset of `additional_files` that are memory-mapped
+            when the model server starts.
         python_modules: A dictionary of Python objects that will be serialized
             using `cloudpickle` before being copied into the container. The
             key should be one of the constants defined in
@@ -75,6 +78,7 @@ class Buildable(metaclass=abc.ABCMeta):
         self.requirements: set[str] = set()
         self.apt_packages: set[str] = set()
         self.additional_files: set[str] = set()
+        self.mmap_files: set[str] = set()
         self.python_modules: dict = {}
 
     def merge_package(self, package: Buildable):
@@ -89,6 +93,7 @@ class Buildable(metaclass=abc.ABCMeta):
         self.requirements = self.requirements.union(package.requirements)
         self.apt_packages = self.apt_packages.union(package.apt_packages)
         self.additional_files = self.additional_files.union(package.additional_files)
+        self.mmap_files = self.mmap_files.union(package.mmap_files)
         self.python_modules.update(package.python_modules)
 
     def add_requirements(self, reqs: Union[str, list[str]]):
@@ -132,6 +137,40 @@ class Buildable(metaclass=abc.ABCMeta):
         elif isinstance(packages, list):
             self.apt_packages = self.apt_packages.union(packages)
 
+    def add_mmap_files(self, files: Union[str, List[str]]):
+        """
+        Adds files, such as model weights, that the model reads through
+        memory maps instead of loading them into memory.
+
+        The files are copied into the container like other additional files.
+        When the model server starts, they are mapped read-only so that every
+        worker process and every replica on the same node shares one copy of
+        the data in the page cache. Predict functions access them with
+        [chassis.runtime.artifacts.open_mmap][] or
+        [chassis.runtime.artifacts.open_memmap][], which also work on the
+        local files before the model is built.
+
+        Args:
+            files: A path or list of paths to local files.
+
+        Example:
+        ```python
+        from chassis.runtime.artifacts import open_memmap
+
+        weights = open_memmap("weights.npy")
+
+        def predict(inputs):
+            ...
+
+        model = ChassisModel(predict)
+        model.add_mmap_files("weights.npy")
+        ```
+        """
+        if isinstance(files, str):
+            files = [files]
+        self.additional_files = self.additional_files.union(files)
+        self.mmap_files = self.mmap_files.union(files)
+
     def get_packaged_path(self, path: str) -> str:
         """
         Convenience method for developers wanting to implement their own
@@ -145,7 +184,7 @@ class Buildable(metaclass=abc.ABCMeta):
         Returns:
             The path the file will have in the final built container.
         """
-        return posixpath.join(PACKAGE_DATA_PATH, os.path.basename(path))
+        return get_packaged_path(path)
 
     def verify_prerequisites(self, options: BuildOptions):
         """
@@ -246,7 +285,7 @@ class Buildable(metaclass=abc.ABCMeta):
         print("Done!")
         print("Copying files...", end="", flush=True)
         self._write_additional_files(context)
-        self._write_python_modules(context)
+        self._write_python_modules(context, options)
         print("Done!")
 
         return context
@@ -267,17 +306,34 @@ class Buildable(metaclass=abc.ABCMeta):
             apt_package_list = " ".join(self.apt_packages)
             run_apt_get = f"RUN apt-get update && apt-get install -y {apt_package_list} && rm -rf /var/lib/apt/lists/*"
 
+        env = {}
+        if options.result_cache_max_memory:
+            env["CHASSIS_RESULT_CACHE_MAX_MEMORY"] = options.result_cache_max_memory
+            if options.result_cache_max_entries is not None:
+                env["CHASSIS_RESULT_CACHE_MAX_ENTRIES"] = str(options.result_cache_max_entries)
+            if options.result_cache_ttl is not None:
+                env["CHASSIS_RESULT_CACHE_TTL"] = str(options.result_cache_ttl)
+        if options.deduplicate_inputs:
+            env["CHASSIS_DEDUPLICATE_INPUTS"] = "true"
+        if options.metrics_port is not None:
+            env["CHASSIS_METRICS_PORT"] = str(options.metrics_port)
+
         #   TODO keys here are variables available in template
         return dockerfile_template.render(
             python_version=options.python_version,
             cuda_version=options.cuda_version,
             apt_packages=run_apt_get,
             labels=options.labels or {},
+            env=env,
+            extract_weights=options.extract_weights,
         )
 
     def _write_additional_files(self, context: BuildContext):
         for file in self.additional_files:
             copy(file, os.path.join(context.data_dir, os.path.basename(file)))
+        if len(self.mmap_files) > 0:
+            with open(os.path.join(context.data_dir, MMAP_MANIFEST_FILENAME), "w") as f:
+                json.dump(sorted(os.path.basename(file) for file in self.mmap_files), f)
 
     def _write_requirements(self, context: BuildContext, options: BuildOptions):
         requirements_template = _env.get_template("requirements.txt")
@@ -291,6 +347,8 @@ class Buildable(metaclass=abc.ABCMeta):
         elif options.server == "kserve":
             from chassis.server.kserve import REQUIREMENTS
             additional_requirements.extend(REQUIREMENTS)
+        if options.metrics_port is not None:
+            additional_requirements.append("prometheus-client >= 0.13")
         # Sort the list so our requirements.txt is stable for Docker caching.
         additional_requirements.sort()
         rendered_template = requirements_template.render(
@@ -315,11 +373,21 @@ class Buildable(metaclass=abc.ABCMeta):
         # with open(requirements_txt, "wb") as f:
         #     f.write(reqs.encode())
 
-    def _write_python_modules(self, context: BuildContext):
+    def _write_python_modules(self, context: BuildContext, options: BuildOptions):
+        weights_dir = None
+        if options.extract_weights:
+            weights_dir = context.weights_dir
+            # The Dockerfile copies this folder even if nothing is extracted.
+            os.makedirs(weights_dir, exist_ok=True)
+        min_size = parse_size(options.extract_weights_min_size) or 0
         for key, m in self.python_modules.items():
-            output_filename = python_pickle_filename_for_key(key)
-            with open(os.path.join(context.data_dir, output_filename), "wb") as f:
-                cloudpickle.dump({key: m}, f)
+            output_filename = os.path.join(context.data_dir, python_pickle_filename_for_key(key))
+            with open(output_filename, "wb") as f:
+                if options.out_of_band_buffers:
+                    with open(output_filename + pickling.BUFFERS_SUFFIX, "wb") as buffers_file:
+                        pickling.dump({key: m}, f, weights_dir=weights_dir, min_size=min_size, buffers_file=buffers_file)
+                else:
+                    pickling.dump({key: m}, f, weights_dir=weights_dir, min_size=min_size)
 
     def _write_metadata(self, context: BuildContext):
         data = self.metadata.serialize()
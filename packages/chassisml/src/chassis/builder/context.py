@@ -5,7 +5,7 @@ import shutil
 import tempfile
 from typing import List, Optional
 
-from chassis.runtime import PACKAGE_DATA_PATH
+from chassis.runtime import PACKAGE_DATA_PATH, PACKAGE_WEIGHTS_PATH
 
 
 class BuildContext:
@@ -30,6 +30,8 @@ class BuildContext:
         self.base_dir = base_dir if base_dir is not None else tempfile.mkdtemp()
         self.chassis_dir = os.path.join(self.base_dir, "chassis")
         self.data_dir = os.path.join(self.base_dir, PACKAGE_DATA_PATH)
+        # Copied into `PACKAGE_DATA_PATH` in its own layer.
+        self.weights_dir = os.path.join(self.base_dir, PACKAGE_WEIGHTS_PATH)
         if platforms is None:
             platforms = ["linux/amd64"]
         self.platforms: List[str] = platforms
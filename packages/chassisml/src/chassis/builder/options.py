@@ -45,6 +45,24 @@ class BuildOptions:
     something other than Docker (but that supports using Dockerfiles) to build
     the container.
 
+    Deterministic models that receive the same inputs repeatedly can cache
+    their outputs by setting `result_cache_max_memory`. Inputs with exactly
+    the same keys and bytes as a cached input are then answered from the
+    cache without running the model. The settings are baked into the
+    container as environment variables, so they can also be overridden when
+    the container is started. Setting `deduplicate_inputs` additionally
+    lets identical inputs that arrive while the first one is still being
+    processed share its inference.
+
+    Setting `extract_weights` writes the large numpy arrays and torch tensors
+    captured by the model (e.g. its weights) to separate files instead of
+    into the pickled model. They are copied into their own image layer, which
+    stays cached when only the code of the model changes, and are
+    memory-mapped when the model is loaded instead of being unpickled.
+    Setting `out_of_band_buffers` pickles the model with protocol 5 and
+    writes the data of the remaining arrays to an aligned file next to it,
+    which is also memory-mapped instead of being copied while loading.
+
     Attributes:
         arch: List of target platforms to build and compile container versions.
             See above for more information.
@@ -53,6 +71,22 @@ class BuildOptions:
         cuda_version: CUDA version if model supports GPU.
         server: Server specification to build. "omi" and "kserve" supported.
         base_dir: Optional directory path to save the build context.
+        labels: Labels to add to the container image.
+        result_cache_max_memory: Enables the result cache with this memory
+            budget, e.g. "256M".
+        result_cache_max_entries: The maximum number of cached results.
+        result_cache_ttl: The number of seconds a result stays cached.
+        deduplicate_inputs: Whether concurrent identical inputs share one
+            inference.
+        extract_weights: Whether to extract large arrays from the pickled
+            model.
+        extract_weights_min_size: The size from which arrays are extracted,
+            e.g. "1M".
+        out_of_band_buffers: Whether to pickle the model with out-of-band
+            buffers.
+        metrics_port: If set, the server exposes Prometheus metrics on
+            `/metrics` on this HTTP port, and `prometheus-client` is
+            installed in the container to collect them.
     """
     base_dir: Optional[str] = None
     arch: Union[str, List[str]] = platform.machine() or "amd64"
@@ -60,6 +94,14 @@ class BuildOptions:
     cuda_version: Optional[str] = None
     server: str = "omi"
     labels: Optional[Dict[str, str]] = None
+    result_cache_max_memory: Optional[str] = None
+    result_cache_max_entries: Optional[int] = None
+    result_cache_ttl: Optional[float] = None
+    deduplicate_inputs: bool = False
+    extract_weights: bool = False
+    extract_weights_min_size: str = "1M"
+    out_of_band_buffers: bool = False
+    metrics_port: Optional[int] = None
 
 
 DefaultBuildOptions = BuildOptions()
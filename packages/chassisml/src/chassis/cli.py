@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from contextlib import redirect_stdout
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from chassis.client.bench import benchmark, load_corpus
+from chassis.client.omi import OMIClient, run_container
+
+
+def _parse_input(value: str) -> Tuple[str, str]:
+    key, sep, path = value.partition("=")
+    if not sep or not key or not path:
+        raise argparse.ArgumentTypeError(f"inputs must be given as KEY=PATH, got '{value}'")
+    return key, path
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="chassis", description="Chassis command line tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench = subparsers.add_parser(
+        "bench",
+        help="Load test a running OMI model container.",
+        description="Sends inference requests to an OMI model container and reports its throughput, "
+                    "latency percentiles and error rates as JSON.",
+    )
+    target = bench.add_argument_group("target")
+    target.add_argument("--host", default="localhost", help="Host of a running model container.")
+    target.add_argument("--port", type=int, default=45000, help="Port of the model container.")
+    target.add_argument("--image", help="Start this image with the local Docker engine and benchmark it instead.")
+    target.add_argument("--tag", default="latest", help="Tag of --image.")
+    target.add_argument("--no-pull", action="store_true", help="Don't pull --image if it isn't present locally.")
+    target.add_argument("--timeout", type=int, default=10, help="Seconds to wait for the model to be ready.")
+    target.add_argument("--compression", choices=["gzip", "deflate"], help="Compress inputs and outputs.")
+
+    load = bench.add_argument_group("load")
+    load.add_argument("-i", "--input", action="append", required=True, type=_parse_input, metavar="KEY=PATH",
+                      help="File to send as the input KEY, or a directory of files to send in turn. Repeat for "
+                           "models with several inputs.")
+    load.add_argument("-n", "--requests", type=int, default=100, help="Number of requests to send.")
+    load.add_argument("-d", "--duration", type=float, help="Stop after this many seconds.")
+    load.add_argument("-c", "--concurrency", type=int, default=1, help="Number of requests in flight at once.")
+    load.add_argument("-r", "--rate", type=float,
+                      help="Requests to start per second. By default, requests are sent as fast as possible.")
+    load.add_argument("-b", "--batch-size", type=int, default=1, help="Number of inputs in each request.")
+    load.add_argument("--warmup", type=int, default=0, help="Requests to send before measuring.")
+    bench.add_argument("-o", "--output", help="Write the report to this file instead of stdout.")
+    return parser
+
+
+async def _bench(args: argparse.Namespace, corpus: List[Dict[str, bytes]]) -> Dict[str, Any]:
+    async with OMIClient(args.host, args.port, timeout=args.timeout, compression=args.compression) as client:
+        return await benchmark(
+            client,
+            corpus,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            batch_size=args.batch_size,
+            duration=args.duration,
+            warmup=args.warmup,
+        )
+
+
+def bench(args: argparse.Namespace) -> int:
+    """
+    Runs the `chassis bench` command.
+    """
+    corpus = load_corpus(dict(args.input))
+    if args.image is None:
+        report = asyncio.run(_bench(args, corpus))
+    else:
+        # Keep stdout for the report.
+        with redirect_stdout(sys.stderr), \
+                run_container(args.image, tag=args.tag, port=args.port, pull=not args.no_pull) as container:
+            if container is None:
+                return 1
+            args.host = "localhost"
+            report = asyncio.run(_bench(args, corpus))
+        report["image"] = f"{args.image}:{args.tag}"
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    The entry point of the `chassis` command.
+    """
+    args = _build_parser().parse_args(argv)
+    if args.command == "bench":
+        return bench(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from chassis.runtime.timings import summarize_latencies
+
+
+def load_corpus(inputs: Mapping[str, str]) -> List[Dict[str, bytes]]:
+    """
+    Reads the inputs to benchmark a model with from files.
+
+    Args:
+        inputs: Maps each input key of the model to a file or a directory.
+            A file is used as the value of every input. A directory provides
+            one value per file, in order of their names, and the corpus
+            repeats the shorter directories to match the longest one.
+
+    Returns:
+        The inputs.
+    """
+    values: Dict[str, List[bytes]] = {}
+    for key, path in inputs.items():
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in sorted(os.listdir(path))]
+            files = [f for f in files if os.path.isfile(f)]
+            if not files:
+                raise ValueError(f"No input files in directory '{path}'")
+        else:
+            files = [path]
+        values[key] = []
+        for file in files:
+            with open(file, "rb") as f:
+                values[key].append(f.read())
+    size = max((len(v) for v in values.values()), default=0)
+    return [{key: v[i % len(v)] for key, v in values.items()} for i in range(size)]
+
+
+class _Results:
+    def __init__(self):
+        self.requests = 0
+        self.latencies: List[float] = []
+        self.error_latencies: List[float] = []
+        self.inputs = 0
+        self.request_errors = 0
+        self.input_errors = 0
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        requests = self.requests
+        return {
+            "requests": requests,
+            "inputs": self.inputs,
+            "duration_seconds": elapsed,
+            "throughput": {
+                "requests_per_second": requests / elapsed if elapsed > 0 else 0.0,
+                "inputs_per_second": self.inputs / elapsed if elapsed > 0 else 0.0,
+            },
+            "latency_seconds": summarize_latencies(self.latencies),
+            "errors": {
+                "requests": self.request_errors,
+                "inputs": self.input_errors,
+                "request_error_rate": self.request_errors / requests if requests else 0.0,
+                "input_error_rate": self.input_errors / self.inputs if self.inputs else 0.0,
+                "latency_seconds": summarize_latencies(self.error_latencies),
+            },
+        }
+
+
+async def benchmark(client: Any, corpus: Sequence[Mapping[str, bytes]], requests: int = 100, concurrency: int = 1,
+                    rate: Optional[float] = None, batch_size: int = 1, duration: Optional[float] = None,
+                    warmup: int = 0) -> Dict[str, Any]:
+    """
+    Load tests a running model with inference requests and reports its
+    throughput, latency and error rates.
+
+    Requests are sent by `concurrency` concurrent workers. Without a `rate`,
+    each worker sends its next request as soon as the previous one returns.
+    With a `rate`, requests are started on a fixed schedule of `rate`
+    requests per second no matter how long earlier requests take, as long
+    as a worker is free, and latencies are measured from the time a request
+    was scheduled, so that queueing in the client is included in them.
+
+    Args:
+        client: A connected [OMIClient][chassis.client.OMIClient].
+        corpus: The inputs to send. Requests take `batch_size` consecutive
+            inputs, starting over at the beginning of the corpus when they
+            reach its end.
+        requests: The number of requests to send, not counting `warmup`.
+        concurrency: The number of requests in flight at the same time.
+        rate: The number of requests to start per second, or `None` to
+            send them as fast as the model answers.
+        batch_size: The number of inputs in each request.
+        duration: If given, stop sending requests after this many seconds
+            even if fewer than `requests` were sent.
+        warmup: The number of requests to send before measuring, e.g. so
+            that the model is loaded into caches.
+
+    Returns:
+        The report, which can be serialized as JSON. Its latencies are those
+        of the requests that succeeded, and those of failed requests are
+        reported with the errors, so that fast failures don't hide slow
+        responses.
+    """
+    if not corpus:
+        raise ValueError("The corpus must contain at least one input")
+    if concurrency < 1 or batch_size < 1:
+        raise ValueError("`concurrency` and `batch_size` must be at least 1")
+    inputs = itertools.cycle(corpus)
+
+    def next_batch() -> List[Mapping[str, bytes]]:
+        return [next(inputs) for _ in range(batch_size)]
+
+    for _ in range(warmup):
+        await client.run(next_batch())
+
+    results = _Results()
+    counter = itertools.count()
+    start = time.perf_counter()
+
+    async def worker():
+        while True:
+            i = next(counter)
+            scheduled = start + i / rate if rate is not None else time.perf_counter()
+            if i >= requests or (duration is not None and scheduled - start >= duration):
+                return
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            batch = next_batch()
+            try:
+                res = await client.run(batch)
+            except Exception:
+                results.request_errors += 1
+                results.error_latencies.append(time.perf_counter() - scheduled)
+            else:
+                results.input_errors += sum(not output.success for output in res.outputs)
+                results.latencies.append(time.perf_counter() - scheduled)
+            results.requests += 1
+            results.inputs += len(batch)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report = {
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "rate": rate,
+    }
+    report.update(results.report(time.perf_counter() - start))
+    return report
@@ -1,16 +1,31 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Mapping, Optional, Sequence
+import os
+import time
+from contextlib import contextmanager
+from typing import (Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence,
+                    Tuple, Union)
 
 import docker
 from docker.models.containers import Container
 from grpclib.client import Channel
 
 from chassis.protos.v1.model_grpc import ModzyModelStub
-from chassis.protos.v1.model_pb2 import (RunRequest, InputItem, RunResponse,
-                                         ShutdownRequest, StatusRequest,
-                                         StatusResponse)
+from chassis.protos.v1.model_pb2 import (RunRequest, InputItem, OutputItem,
+                                         RunResponse, ShutdownRequest,
+                                         StatusRequest, StatusResponse)
+from chassis.runtime import tracing
+from chassis.runtime.timings import TIMINGS_METADATA_KEY, StageTimings
+from chassis.runtime.transport import (ACCEPT_COMPRESSION_METADATA_KEY,
+                                       COMPRESSION_METADATA_KEY,
+                                       SizeLimitedProtoCodec, decompress,
+                                       encode_item, getenv_size, parse_size,
+                                       validate_compression)
+
+# `run_stream` sends at most this many requests ahead of the outputs it has
+# received, so that it doesn't read the inputs faster than the model runs.
+_STREAM_MAX_PENDING_REQUESTS = 4
 
 
 class OMIClient:
@@ -21,6 +36,14 @@ class OMIClient:
     The API for this object is asynchronous like the underlying gRPC `grpclib`
     client.
 
+    Large inputs and outputs can be compressed by setting `compression` to
+    "gzip" or "deflate". The inputs are compressed before they are sent and
+    the model is asked to compress its outputs with the same algorithm. Since
+    `grpclib` doesn't support gRPC message compression, only the values of
+    the input and output maps are compressed, and only OMI servers built by
+    Chassis support it. Other servers will see the client's compressed bytes
+    as they are.
+
     Attributes:
         client: Access to the underlying `grpclib` async client.
 
@@ -35,11 +58,44 @@ class OMIClient:
         ```
     """
 
-    def __init__(self, host: str, port: int = 45000, timeout: int = 10):
+    def __init__(self, host: str, port: int = 45000, timeout: int = 10,
+                 compression: Optional[str] = None,
+                 max_send_message_size: Union[int, str, None] = None,
+                 max_receive_message_size: Union[int, str, None] = None):
+        """
+        Init.
+
+        Args:
+            host: The host the model is running on.
+            port: The port the model is listening on.
+            timeout: The number of seconds to wait for the model to become
+                available when used as a context manager.
+            compression: "gzip" or "deflate" to compress inputs and outputs.
+                Defaults to the `CHASSIS_CLIENT_COMPRESSION` environment
+                variable or no compression.
+            max_send_message_size: The largest request, in bytes or with a
+                K, M or G suffix, that the client will send. Defaults to the
+                `CHASSIS_CLIENT_MAX_SEND_MESSAGE_SIZE` environment variable or
+                unlimited.
+            max_receive_message_size: The largest response that the client
+                will accept. Defaults to the
+                `CHASSIS_CLIENT_MAX_RECEIVE_MESSAGE_SIZE` environment variable
+                or unlimited.
+        """
         self._host = host
         self._port = port
         self._timeout = timeout
-        self._channel = Channel(host, port, ssl=False)
+        if compression is None:
+            compression = os.getenv("CHASSIS_CLIENT_COMPRESSION")
+        self._compression = validate_compression(compression)
+        codec = SizeLimitedProtoCodec(
+            max_send_message_size=(parse_size(max_send_message_size) if max_send_message_size is not None
+                                   else getenv_size("CHASSIS_CLIENT_MAX_SEND_MESSAGE_SIZE")),
+            max_receive_message_size=(parse_size(max_receive_message_size) if max_receive_message_size is not None
+                                      else getenv_size("CHASSIS_CLIENT_MAX_RECEIVE_MESSAGE_SIZE")),
+        )
+        self._max_receive_message_size = codec.max_receive_message_size
+        self._channel = Channel(host, port, ssl=False, codec=codec)
         self.client = ModzyModelStub(self._channel)
 
     def __del__(self):
@@ -88,11 +144,13 @@ class OMIClient:
         should match the key name expected by the model (e.g. the first value
         supplied in the [ChassisModel.metadata.add_input]
         [chassis.metadata.ModelMetadata.add_input] method)
-        and the value should always be of type `bytes`. The bytes should be
+        and the value should be of type `bytes`. The bytes should be
         decodable using one of the model's declared media type for that key
         (e.g. the `accepted_media_types` argument in
         [ChassisModel.metadata.add_input]
-        [chassis.metadata.ModelMetadata.add_input]).
+        [chassis.metadata.ModelMetadata.add_input]). Values for inputs that
+        the model declares as tensors can be numpy arrays instead, which are
+        sent without being serialized.
 
         To enable drift detection and/or explainability on models that support
         it, you can set the appropriate parameters to `True`.
@@ -105,7 +163,10 @@ class OMIClient:
         can return multiple pieces of data per inference. The key and media
         type of the bytes value should match the values supplied in
         [ChassisModel.metadata.add_input]
-        [chassis.metadata.ModelMetadata.add_input]).
+        [chassis.metadata.ModelMetadata.add_input]). Outputs that the model
+        returns as numpy arrays are in the `tensors` property of each output
+        instead and can be decoded with
+        [chassis.runtime.tensors.tensor_from_proto][].
 
         Args:
             inputs: The batch of inputs to supply to the model. See above for
@@ -117,15 +178,149 @@ class OMIClient:
         Returns:
             See above for more details.
         """
-        req = RunRequest(
-            inputs=[
-                InputItem(input=i)
-                for i in inputs
-            ],
-            detect_drift=detect_drift,
-            explain=explain,
-        )
-        return await self.client.Run(req)
+        res, _ = await self._run(inputs, detect_drift, explain, self._compression_metadata())
+        return res
+
+    async def run_with_timings(self, inputs: Sequence[Mapping[str, bytes]], detect_drift: bool = False,
+                               explain: bool = False) -> Tuple[RunResponse, Dict[str, List[float]]]:
+        """
+        Performs an inference like [chassis.client.OMIClient.run][] and
+        returns how long the server spent on each stage of the request.
+
+        The timings map the name of each stage to the durations in seconds
+        that were recorded for it. See
+        [StageTimings][chassis.runtime.timings.StageTimings] for the stages.
+        The `round_trip` stage is the time the client waited for the
+        response, including time spent on the network. Only OMI servers
+        built by Chassis report timings; other servers return only the
+        `round_trip` stage.
+
+        Args:
+            inputs: The batch of inputs to supply to the model.
+            detect_drift: Whether to enable drift detection on models that
+                support it.
+            explain: Whether to enable explainability on models that support it.
+
+        Returns:
+            The `RunResponse` and the timings.
+
+        Example:
+            ```python
+            async with OMIClient("localhost", 45000) as client:
+                res, timings = await client.run_with_timings([{"input": b"testing"}])
+                print(f"Predict took {sum(timings['predict'])}s")
+            ```
+        """
+        metadata = dict(self._compression_metadata() or {})
+        metadata[TIMINGS_METADATA_KEY] = "true"
+        start = time.perf_counter()
+        res, trailing_metadata = await self._run(inputs, detect_drift, explain, metadata)
+        round_trip = time.perf_counter() - start
+        value = trailing_metadata.get(TIMINGS_METADATA_KEY) if trailing_metadata is not None else None
+        timings = StageTimings.from_json(value) if isinstance(value, str) else StageTimings()
+        timings.record("round_trip", round_trip)
+        return res, timings.stages
+
+    async def _run(self, inputs: Sequence[Mapping[str, bytes]], detect_drift: bool, explain: bool,
+                   metadata: Optional[Mapping[str, str]]) -> Tuple[RunResponse, Any]:
+        with tracing.start_span("OMIClient.run", kind=tracing.SPAN_KIND_CLIENT, attributes={"chassis.inputs": len(inputs)}):
+            req = RunRequest(
+                inputs=[self._input_item(i) for i in inputs],
+                detect_drift=detect_drift,
+                explain=explain,
+            )
+            async with self.client.Run.open(metadata=tracing.inject(metadata)) as stream:
+                await stream.send_message(req, end=True)
+                res: RunResponse = await stream.recv_message()
+                await stream.recv_trailing_metadata()
+                _decompress_outputs(res, _response_compression(stream), self._max_receive_message_size)
+        return res, stream.trailing_metadata
+
+    async def run_stream(self, inputs: Union[Iterable[Mapping[str, bytes]], AsyncIterable[Mapping[str, bytes]]],
+                         chunk_size: int = 32, detect_drift: bool = False,
+                         explain: bool = False) -> AsyncIterator[OutputItem]:
+        """
+        Perform inference on a large or unbounded number of inputs.
+
+        Unlike [chassis.client.OMIClient.run][], the inputs don't need to be
+        held in memory all at once and results are returned as soon as the
+        model finishes each of its batches. The inputs are sent to the model
+        in requests of `chunk_size` inputs while the outputs of earlier
+        requests are being received, and are read from `inputs` only a few
+        requests ahead of the outputs.
+
+        Each input has the same structure as the inputs to
+        [chassis.client.OMIClient.run][], and one `OutputItem` is yielded per
+        input, in the same order as the inputs.
+
+        Args:
+            inputs: An iterable or async iterable of inputs.
+            chunk_size: The number of inputs to send to the model per request.
+            detect_drift: Whether to enable drift detection on models that
+                support it.
+            explain: Whether to enable explainability on models that support it.
+
+        Returns:
+            An async iterator of `OutputItem`s.
+
+        Example:
+            ```python
+            async with OMIClient("localhost", 45000) as client:
+                inputs = ({"input": line.encode()} for line in open("data.txt"))
+                async for output in client.run_stream(inputs):
+                    print(output.output["results.json"])
+            ```
+        """
+        with tracing.start_span("OMIClient.run_stream", kind=tracing.SPAN_KIND_CLIENT):
+            async for output in self._run_stream(inputs, chunk_size, detect_drift, explain):
+                yield output
+
+    async def _run_stream(self, inputs: Union[Iterable[Mapping[str, bytes]], AsyncIterable[Mapping[str, bytes]]],
+                          chunk_size: int, detect_drift: bool, explain: bool) -> AsyncIterator[OutputItem]:
+        async with self.client.RunStream.open(metadata=tracing.inject(self._compression_metadata())) as stream:
+            # The number of inputs sent that have no output yet.
+            pending = 0
+            progress = asyncio.Condition()
+
+            async def _send():
+                nonlocal pending
+                async for chunk in _chunk_inputs(inputs, chunk_size):
+                    async with progress:
+                        await progress.wait_for(lambda: pending < chunk_size * _STREAM_MAX_PENDING_REQUESTS)
+                    pending += len(chunk)
+                    await stream.send_message(RunRequest(
+                        inputs=[self._input_item(i) for i in chunk],
+                        detect_drift=detect_drift,
+                        explain=explain,
+                    ))
+                await stream.end()
+
+            await stream.send_request()
+            sender = asyncio.ensure_future(_send())
+            try:
+                async for response in stream:
+                    _decompress_outputs(response, _response_compression(stream), self._max_receive_message_size)
+                    async with progress:
+                        pending -= len(response.outputs)
+                        progress.notify()
+                    for output in response.outputs:
+                        yield output
+                await sender
+            finally:
+                if not sender.done():
+                    sender.cancel()
+
+    def _input_item(self, data: Mapping[str, Any]) -> InputItem:
+        values, tensors = encode_item(data, self._compression)
+        return InputItem(input=values, tensors=tensors)
+
+    def _compression_metadata(self) -> Optional[Mapping[str, str]]:
+        if self._compression is None:
+            return None
+        return {
+            COMPRESSION_METADATA_KEY: self._compression,
+            ACCEPT_COMPRESSION_METADATA_KEY: self._compression,
+        }
 
     async def shutdown(self):
         """
@@ -162,49 +357,108 @@ class OMIClient:
         Returns:
             See [chassis.client.OMIClient.run][] for more information.
         """
-        # Concat the container name and tag to get the full reference.
-        container_tag = f"{container_name}:{tag}"
-        # Grab an instance of the Docker client using the current environment.
-        docker_client = docker.from_env()
-        # List local images that match the supplied repository name.
-        local_images = docker_client.images.list(container_name)
-        # Check to see if the image (and tag) exist already.
-        image_present = False
-        for img in local_images:
-            if container_tag in img.tags:
-                image_present = True
-                break
-
-        # If the image is not present then either pull it or return an error
-        # if `pull=False`.
-        if not image_present:
-            if not pull:
-                print("Image not present in local image cache and `pull` is set to False")
+        with run_container(container_name, tag=tag, port=port, pull=pull) as container:
+            if container is None:
                 return None
-            print("Pulling image...", end="", flush=True)
-            docker_client.images.pull(container_name, tag)
-            print("Done!")
-
-        container: Optional[Container] = None
-        try:
-            # Start the container configured to expose the port to `localhost`.
-            container = docker_client.containers.run(
-                image=container_tag,
-                auto_remove=True,
-                detach=True,
-                environment={
-                    "PSC_MODEL_PORT": "45000"
-                },
-                ports={
-                    "45000/tcp": port,
-                },
-                remove=True,
-            )
-
             # Use the OMIClient to run an inference.
             async with cls("localhost", port, timeout=timeout) as omi_client:
                 return await omi_client.run(inputs, detect_drift=detect_drift, explain=explain)
-        finally:
-            # No matter what happens, kill the container at the end.
-            if container is not None:
-                container.kill()
+
+
+@contextmanager
+def run_container(container_name: str, tag: str = "latest", port: int = 45000,
+                  pull: bool = True) -> Iterator[Optional[Container]]:
+    """
+    Starts a model container with your local Docker engine and kills it when
+    the `with` statement exits.
+
+    Args:
+        container_name: The full name of the container without the tag.
+        tag: The tag of the image to run.
+        port: The port on the host that the container should map to.
+        pull: Whether to pull the image if it doesn't exist in your local
+            image cache.
+
+    Returns:
+        A context manager that yields the running container, or `None` if
+        the image isn't present and `pull` is `False`.
+    """
+    # Concat the container name and tag to get the full reference.
+    container_tag = f"{container_name}:{tag}"
+    # Grab an instance of the Docker client using the current environment.
+    docker_client = docker.from_env()
+    # List local images that match the supplied repository name.
+    local_images = docker_client.images.list(container_name)
+    # Check to see if the image (and tag) exist already.
+    image_present = False
+    for img in local_images:
+        if container_tag in img.tags:
+            image_present = True
+            break
+
+    # If the image is not present then either pull it or return an error
+    # if `pull=False`.
+    if not image_present:
+        if not pull:
+            print("Image not present in local image cache and `pull` is set to False")
+            yield None
+            return
+        print("Pulling image...", end="", flush=True)
+        docker_client.images.pull(container_name, tag)
+        print("Done!")
+
+    container: Optional[Container] = None
+    try:
+        # Start the container configured to expose the port to `localhost`.
+        container = docker_client.containers.run(
+            image=container_tag,
+            auto_remove=True,
+            detach=True,
+            environment={
+                "PSC_MODEL_PORT": "45000"
+            },
+            ports={
+                "45000/tcp": port,
+            },
+            remove=True,
+        )
+        yield container
+    finally:
+        # No matter what happens, kill the container at the end.
+        if container is not None:
+            container.kill()
+
+
+def _response_compression(stream) -> Optional[str]:
+    if stream.initial_metadata is None:
+        return None
+    return validate_compression(stream.initial_metadata.get(COMPRESSION_METADATA_KEY))
+
+
+def _decompress_outputs(response: RunResponse, compression: Optional[str], max_size: Optional[int]):
+    if compression is None:
+        return
+    for output_item in response.outputs:
+        for key, value in list(output_item.output.items()):
+            output_item.output[key] = decompress(value, compression, max_size)
+        for tensor in output_item.tensors.values():
+            tensor.data = decompress(tensor.data, compression, max_size)
+
+
+async def _chunk_inputs(inputs: Union[Iterable[Mapping[str, bytes]], AsyncIterable[Mapping[str, bytes]]],
+                        size: int) -> AsyncIterator[List[Mapping[str, bytes]]]:
+    chunk: List[Mapping[str, bytes]] = []
+    if isinstance(inputs, AsyncIterable):
+        async for i in inputs:
+            chunk.append(i)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    else:
+        for i in inputs:
+            chunk.append(i)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if len(chunk) > 0:
+        yield chunk
@@ -2,11 +2,20 @@ from __future__ import annotations
 
 from typing import Any, Callable, Mapping, Sequence, Union
 
+import numpy as np
+
 LegacyNormalPredictFunction = Callable[[bytes], Any]
 LegacyBatchPredictFunction = Callable[[Sequence[bytes]], Sequence[Any]]
 
 NormalPredictFunction = Callable[[Mapping[str, bytes]], Mapping[str, bytes]]
 BatchPredictFunction = Callable[[Sequence[Mapping[str, bytes]]], Sequence[Mapping[str, bytes]]]
 
+# Inputs and outputs declared as tensors are passed as numpy arrays instead
+# of bytes.
+TensorValue = Union[bytes, np.ndarray]
+TensorNormalPredictFunction = Callable[[Mapping[str, TensorValue]], Mapping[str, TensorValue]]
+TensorBatchPredictFunction = Callable[[Sequence[Mapping[str, TensorValue]]], Sequence[Mapping[str, TensorValue]]]
+
 LegacyPredictFunction = Union[LegacyNormalPredictFunction, LegacyBatchPredictFunction]
-PredictFunction = Union[LegacyPredictFunction, NormalPredictFunction, BatchPredictFunction]
+TensorPredictFunction = Union[TensorNormalPredictFunction, TensorBatchPredictFunction]
+PredictFunction = Union[LegacyPredictFunction, NormalPredictFunction, BatchPredictFunction, TensorPredictFunction]
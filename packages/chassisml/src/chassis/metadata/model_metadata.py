@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from chassis.protos.v1.model_pb2 import (ModelDescription, ModelFeatures,
                                          ModelInfo, ModelInput, ModelOutput,
                                          ModelResources, ModelTimeout,
                                          StatusResponse)
+from chassis.runtime.tensors import validate_dtype
 
 
 class ModelMetadata:
@@ -121,7 +122,8 @@ class ModelMetadata:
         return len(self._inputs) > 0
 
     def add_input(self, key: str, accepted_media_types: Optional[List[str]] = None,
-                  max_size: str = "1M", description: str = ""):
+                  max_size: str = "1M", description: str = "",
+                  dtype: Optional[str] = None, shape: Optional[Sequence[int]] = None):
         """
         Defines an input to the model. Inputs are identified by a string `key`
         that will be used to retrieve them from the dictionary of inputs during
@@ -139,6 +141,11 @@ class ModelMetadata:
         requirements, such as indicating whether color channels need to be
         stripped from the image, etc.
 
+        Inputs of numeric models can instead be declared as tensors by
+        setting `dtype` (and optionally `shape`). Clients send tensor inputs
+        as numpy arrays, which are passed to the predict function as
+        read-only `numpy.ndarray`s without being serialized.
+
         Args:
              key: Key name to represent the input. E.g., "input", "image", etc.
              accepted_media_types: Acceptable mime type(s) for the respective
@@ -148,6 +155,10 @@ class ModelMetadata:
                 include an integer followed by a letter indicating the unit of
                 measure (e.g., "3M" = 3 MB, "1.5G" = 1.5 GB, etc.)
              description: Short description of the input
+             dtype: If set, the input is a tensor of this numpy dtype (e.g.
+                "float32").
+             shape: The shape of the tensor input. Dimensions of -1, such as
+                the batch dimension, can have any size.
 
         Example:
         ```python
@@ -160,6 +171,11 @@ class ModelMetadata:
             "Image to be classified by computer vision model"
         )
         ```
+
+        A tensor input:
+        ```python
+        model.metadata.add_input("features", dtype="float32", shape=[-1, 128])
+        ```
         """
         if accepted_media_types is None:
             accepted_media_types = ["application/octet-stream"]
@@ -168,6 +184,8 @@ class ModelMetadata:
             accepted_media_types=accepted_media_types,
             max_size=max_size,
             description=description,
+            dtype=validate_dtype(dtype) if dtype is not None else "",
+            shape=shape if shape is not None else [],
         )]
 
     def has_outputs(self) -> bool:
@@ -178,7 +196,8 @@ class ModelMetadata:
         return len(self._outputs) > 0
 
     def add_output(self, key: str, media_type: str = "application/octet-stream",
-                   max_size: str = "1M", description: str = ""):
+                   max_size: str = "1M", description: str = "",
+                   dtype: Optional[str] = None, shape: Optional[Sequence[int]] = None):
         """
         Defines an output from the model. Outputs are identified by a string
         `key` that will be used to retrieve them from the dictionary of outputs
@@ -194,6 +213,10 @@ class ModelMetadata:
         Finally, you can give each output a description which can be used in
         documentation to explain any further details about the output.
 
+        Outputs of numeric models can instead be declared as tensors by
+        setting `dtype` (and optionally `shape`). The predict function
+        returns tensor outputs as numpy arrays, which are sent to clients
+        without being serialized.
 
         Args:
              key: Key name to represent the output. E.g., "results.json",
@@ -205,6 +228,10 @@ class ModelMetadata:
                 include an integer followed by a letter indicating the unit of
                 measure (e.g., "3M" = 3 MB, "1.5G" = 1.5 GB, etc.)
              description: Short description of the output
+             dtype: If set, the output is a tensor of this numpy dtype (e.g.
+                "float32").
+             shape: The shape of the tensor output. Dimensions of -1, such as
+                the batch dimension, can have any size.
 
         Example:
         ```python
@@ -223,6 +250,8 @@ class ModelMetadata:
             media_type=media_type,
             max_size=max_size,
             description=description,
+            dtype=validate_dtype(dtype) if dtype is not None else "",
+            shape=shape if shape is not None else [],
         )]
 
     @property
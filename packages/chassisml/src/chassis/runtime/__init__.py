@@ -1,2 +1,3 @@
 from .model_runner import ModelRunner
 from .constants import *
+from .executor import InferenceExecutor
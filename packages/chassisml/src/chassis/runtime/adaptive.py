@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import statistics
+import threading
+from typing import List, Optional, Tuple
+
+# Substrings of the messages of the out-of-memory errors raised by common
+# frameworks, e.g. torch's "CUDA out of memory" and TensorFlow's
+# "OOM when allocating tensor".
+_OUT_OF_MEMORY_MESSAGES = ("out of memory", "oom when allocating", "failed to allocate")
+_OUT_OF_MEMORY_TYPES = ("OutOfMemory", "ResourceExhausted")
+
+
+def is_out_of_memory(e: BaseException) -> bool:
+    """
+    Returns `True` if `e` looks like the model ran out of (device) memory.
+    """
+    if isinstance(e, MemoryError):
+        return True
+    name = type(e).__name__
+    if any(t in name for t in _OUT_OF_MEMORY_TYPES):
+        return True
+    message = str(e).lower()
+    return any(m in message for m in _OUT_OF_MEMORY_MESSAGES)
+
+
+class AdaptiveBatchSizer:
+    """
+    Tunes the batch size used for inference based on the throughput measured
+    at runtime.
+
+    The sizer starts at the maximum batch size and hill-climbs by halving or
+    doubling the size. After every `window` batches at the current size, the
+    median throughput (inputs per second) is compared with the throughput at
+    the previous size. The sizer keeps stepping in the same direction while
+    throughput doesn't drop, and otherwise returns to the previous size and
+    holds it for `hold` windows before probing the other direction.
+
+    When a batch fails with an out-of-memory error,
+    [backoff][chassis.runtime.adaptive.AdaptiveBatchSizer.backoff] caps the
+    size at half the size that failed. After `recovery` batches at the cap,
+    the sizer probes a larger size: halfway to the smallest size that failed,
+    which binary-searches the largest size that fits in a few probes, or
+    twice the cap if no larger size failed. A probe that runs out of memory
+    restores the cap. Memory may have been short only for a while, so once
+    the search has converged the size that failed is probed again, and each
+    time it fails again the number of batches until the next probe doubles.
+    """
+
+    def __init__(self, max_batch_size: int, min_batch_size: int = 1,
+                 window: int = 3, tolerance: float = 0.05, hold: int = 10, recovery: int = 100):
+        """
+        Init.
+
+        Args:
+            max_batch_size: The largest batch size the model supports.
+            min_batch_size: The smallest batch size to use.
+            window: The number of batches to measure at each size.
+            tolerance: The fraction by which throughput may drop before a
+                step is considered worse than the previous size.
+            hold: The number of windows to stay at a size after a step made
+                throughput worse.
+            recovery: The number of batches at the cap set by an
+                out-of-memory error after which a larger size is probed.
+        """
+        self.max_batch_size = max(1, max_batch_size)
+        self.min_batch_size = max(1, min(min_batch_size, self.max_batch_size))
+        self.size = self.max_batch_size
+        self._ceiling = self.max_batch_size
+        self._window = max(1, window)
+        self._tolerance = tolerance
+        self._hold = hold
+        self._samples: List[float] = []
+        self._direction = -1
+        self._previous: Optional[Tuple[int, float]] = None
+        self._holding = 0
+        self._recovery = max(1, recovery)
+        self._at_ceiling = 0
+        # The smallest size above the ceiling that ran out of memory.
+        self._failed: Optional[int] = None
+        # The ceiling before the current probe, if probing.
+        self._probing: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def record(self, batch_size: int, seconds: float):
+        """
+        Records how long a batch took. Batches smaller than the current size,
+        such as the last batch of a request, are ignored.
+
+        Args:
+            batch_size: The number of inputs in the batch.
+            seconds: How long the inference took.
+        """
+        with self._lock:
+            if batch_size != self.size or seconds <= 0:
+                return
+            if self._probing is not None:
+                # The probe fit.
+                self._probing = None
+                if self._failed is not None and self.size >= self._failed:
+                    self._failed = None
+            if self.size == self._ceiling < self.max_batch_size:
+                self._at_ceiling += 1
+                if self._at_ceiling >= self._recovery:
+                    self._probe()
+                    return
+            self._samples.append(batch_size / seconds)
+            if len(self._samples) < self._window:
+                return
+            throughput = statistics.median(self._samples)
+            self._samples = []
+            if self._holding > 0:
+                self._holding -= 1
+                return
+            if self._previous is not None and throughput < self._previous[1] * (1 - self._tolerance):
+                # The last step made things worse, so go back.
+                self._set_size(self._previous[0])
+                self._direction = -self._direction
+                self._previous = None
+                self._holding = self._hold
+                return
+            self._previous = (self.size, throughput)
+            next_size = self._step()
+            if next_size == self.size:
+                self._direction = -self._direction
+                next_size = self._step()
+            self._set_size(next_size)
+
+    def backoff(self, batch_size: int):
+        """
+        Shrinks the batch size after a batch of `batch_size` inputs ran out
+        of memory.
+        """
+        with self._lock:
+            self._at_ceiling = 0
+            self._direction = -1
+            self._previous = None
+            if self._probing is not None and batch_size == self.size:
+                if self._failed is not None and batch_size >= self._failed:
+                    # A size that failed before still fails.
+                    self._recovery *= 2
+                self._failed = batch_size
+                self._ceiling = self._probing
+                self._probing = None
+            else:
+                self._probing = None
+                self._ceiling = max(self.min_batch_size, min(self._ceiling, batch_size // 2))
+                if batch_size > self._ceiling:
+                    self._failed = batch_size if self._failed is None else min(self._failed, batch_size)
+            self._set_size(self._ceiling)
+
+    def _probe(self):
+        if self._failed is None:
+            size = self._ceiling * 2
+        else:
+            size = (self._ceiling + self._failed + 1) // 2
+        self._probing = self._ceiling
+        self._ceiling = min(self.max_batch_size, size)
+        self._at_ceiling = 0
+        self._previous = None
+        self._set_size(self._ceiling)
+
+    def _step(self) -> int:
+        size = self.size * 2 if self._direction > 0 else self.size // 2
+        return max(self.min_batch_size, min(self._ceiling, size))
+
+    def _set_size(self, size: int):
+        if size != self.size:
+            self.size = size
+            self._samples = []
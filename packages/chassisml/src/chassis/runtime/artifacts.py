@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import posixpath
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .constants import MMAP_MANIFEST_FILENAME, PACKAGE_DATA_PATH
+
+# Every file is mapped at most once per process, so that all the models and
+# threads in a process share the same mapping.
+_mappings: Dict[str, mmap.mmap] = {}
+_mappings_lock = threading.Lock()
+
+
+def get_packaged_path(path: str) -> str:
+    """
+    Returns the path an additional file has in the built container.
+
+    Args:
+        path: The local path of a file added to the model, e.g. with
+            [add_mmap_files][chassis.builder.Buildable.add_mmap_files].
+
+    Returns:
+        The path of the file in the container.
+    """
+    return posixpath.join(PACKAGE_DATA_PATH, os.path.basename(path))
+
+
+def resolve_path(path: str) -> str:
+    """
+    Returns the packaged path of `path` if it exists, e.g. inside the built
+    container, and `path` itself otherwise, e.g. when testing the model
+    locally before it is built.
+    """
+    packaged = get_packaged_path(path)
+    return packaged if os.path.exists(packaged) else path
+
+
+def open_mmap(path: str) -> mmap.mmap:
+    """
+    Maps a file into memory read-only.
+
+    Pages are read from disk the first time they are accessed and are shared
+    through the page cache by every process on the node that maps the same
+    file, so multiple server workers and replicas don't each keep a private
+    copy of large weights in memory.
+
+    Args:
+        path: The local or packaged path of the file. See
+            [resolve_path][chassis.runtime.artifacts.resolve_path].
+
+    Returns:
+        The read-only mapping. The same mapping is returned every time the
+        same file is opened in a process.
+    """
+    resolved = os.path.abspath(resolve_path(path))
+    with _mappings_lock:
+        mapping = _mappings.get(resolved)
+        if mapping is None:
+            with open(resolved, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _mappings[resolved] = mapping
+        return mapping
+
+
+def open_memmap(path: str, dtype: Any = np.uint8, shape: Optional[Sequence[int]] = None,
+                offset: int = 0) -> np.ndarray:
+    """
+    Returns a read-only numpy array backed by a memory-mapped file.
+
+    Files saved with `numpy.save` (`.npy`) are mapped with the dtype and
+    shape from their header. Other files are treated as raw arrays of
+    `dtype`.
+
+    Args:
+        path: The local or packaged path of the file.
+        dtype: The dtype of the elements of a raw file.
+        shape: The shape of a raw file. Defaults to one dimension that covers
+            the rest of the file.
+        offset: The byte offset of the array in a raw file.
+
+    Returns:
+        The array. It can't be modified; copy it first if you need to.
+    """
+    mapping = open_mmap(path)
+    if path.endswith(".npy"):
+        with open(resolve_path(path), "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(f)
+            else:
+                header = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        shape, fortran_order, dtype = header
+        count = int(np.prod(shape))
+        array = np.frombuffer(mapping, dtype=dtype, count=count, offset=offset)
+        return array.reshape(shape, order="F" if fortran_order else "C")
+    array = np.frombuffer(mapping, dtype=dtype, offset=offset)
+    return array.reshape(shape) if shape is not None else array
+
+
+def preload_mmap_files() -> List[str]:
+    """
+    Maps the files declared with
+    [add_mmap_files][chassis.builder.Buildable.add_mmap_files] and asks the
+    kernel to start reading them into the page cache.
+
+    [ModelRunner.load][chassis.runtime.ModelRunner.load] calls this before
+    unpickling the model. Server workers forked after a preload inherit the
+    mappings, but the workers of a process executor are spawned, so each of
+    them maps the files again when it loads the model. Either way, the pages
+    are shared through the page cache rather than copied.
+
+    Returns:
+        The paths of the files that were mapped.
+    """
+    manifest = os.path.join(PACKAGE_DATA_PATH, MMAP_MANIFEST_FILENAME)
+    if not os.path.exists(manifest):
+        return []
+    with open(manifest, "r") as f:
+        paths = json.load(f)
+    for path in paths:
+        mapping = open_mmap(path)
+        if hasattr(mapping, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            mapping.madvise(mmap.MADV_WILLNEED)
+    return paths
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import itertools
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from .model_runner import ModelRunner, is_error_output
+from .timings import summarize_latencies
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Returns the peak resident set size of the process so far, in bytes, or
+    `None` if the platform doesn't report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS reports bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _with_batch_size(runner: ModelRunner, batch_size: int) -> ModelRunner:
+    """
+    Returns a copy of `runner` that performs inference in batches of
+    `batch_size`, without the result cache.
+    """
+    predict_fn: Any = runner.predict_fn
+    if runner.supports_batch and batch_size == 1:
+        # Models that don't support batching are called with one input.
+        batch_predict_fn = predict_fn
+
+        def predict_fn(input_item):
+            return batch_predict_fn([input_item])[0]
+    elif not runner.supports_batch and batch_size > 1:
+        raise ValueError("Batch sizes above 1 can only be benchmarked for models that support batching")
+    return ModelRunner(predict_fn, batch_size=batch_size, is_legacy_fn=runner.legacy,
+                       concurrency=runner.concurrency, buffer_inputs=runner.buffer_inputs,
+                       adaptive_batching=runner.adaptive_batching, bucket_key=runner.bucket_key)
+
+
+def _profile_allocations(runner: ModelRunner, inputs: Sequence[Mapping[str, bytes]]) -> Dict[str, int]:
+    # Tracing allocations slows inference down a lot, so allocations are
+    # measured on a separate call to predict.
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        start_size, _ = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        runner.predict(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    retained = [d for d in after.compare_to(before, "filename") if d.count_diff > 0]
+    return {
+        "peak_bytes": max(0, peak - start_size),
+        "retained_blocks": sum(d.count_diff for d in retained),
+        "retained_bytes": sum(max(0, d.size_diff) for d in retained),
+    }
+
+
+def benchmark_config(runner: ModelRunner, inputs: Sequence[Mapping[str, bytes]], iterations: int,
+                     concurrency: int, warmup: int = 1, trace_allocations: bool = True) -> Dict[str, Any]:
+    """
+    Measures one configuration of a model. See
+    [benchmark][chassis.runtime.benchmark.benchmark].
+    """
+    corpus = itertools.cycle(inputs)
+    lock = threading.Lock()
+
+    def next_request() -> List[Mapping[str, bytes]]:
+        with lock:
+            return [next(corpus) for _ in range(runner.batch_size)]
+
+    for _ in range(warmup):
+        runner.predict(next_request())
+
+    latencies: List[float] = []
+    errors = [0]
+    counter = itertools.count()
+
+    def worker():
+        while next(counter) < iterations:
+            request = next_request()
+            start = time.perf_counter()
+            outputs = runner.predict(request)
+            elapsed = time.perf_counter() - start
+            failed = sum(is_error_output(output) for output in outputs)
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += failed
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, name=f"chassis-benchmark-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    inputs_run = len(latencies) * runner.batch_size
+    report: Dict[str, Any] = {
+        "batch_size": runner.batch_size,
+        "concurrency": concurrency,
+        "iterations": len(latencies),
+        "inputs": inputs_run,
+        "duration_seconds": elapsed,
+        "throughput": {
+            "predicts_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "inputs_per_second": inputs_run / elapsed if elapsed > 0 else 0.0,
+        },
+        "latency_seconds": summarize_latencies(latencies),
+        "errors": errors[0],
+        "peak_rss_bytes": peak_rss(),
+    }
+    if trace_allocations:
+        report["allocations"] = _profile_allocations(runner, next_request())
+    return report
+
+
+def benchmark(runner: ModelRunner, inputs: Sequence[Mapping[str, bytes]], iterations: int = 20,
+              concurrency: Sequence[int] = (1,), batch_sizes: Optional[Sequence[int]] = None,
+              warmup: int = 1, trace_allocations: bool = True) -> Dict[str, Any]:
+    """
+    Benchmarks a model in this process for every combination of batch size
+    and number of threads. See [chassisml.ChassisModel.benchmark][].
+
+    Returns:
+        A report with one result per combination, in the order they ran,
+        and the combination with the highest throughput.
+    """
+    if not inputs:
+        raise ValueError("At least one input is required")
+    if iterations < 1 or any(c < 1 for c in concurrency):
+        raise ValueError("`iterations` and `concurrency` must be at least 1")
+    if batch_sizes is None:
+        batch_sizes = [runner.batch_size]
+    results: List[Dict[str, Any]] = []
+    for batch_size in batch_sizes:
+        config_runner = _with_batch_size(runner, batch_size)
+        for threads in concurrency:
+            results.append(benchmark_config(config_runner, inputs, iterations, threads, warmup=warmup,
+                                            trace_allocations=trace_allocations))
+    best = max(results, key=lambda r: r["throughput"]["inputs_per_second"])
+    return {
+        "results": results,
+        "best": {"batch_size": best["batch_size"], "concurrency": best["concurrency"]},
+    }
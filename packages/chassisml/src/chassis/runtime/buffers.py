@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def as_buffer(data: Buffer) -> memoryview:
+    """
+    Returns a read-only `memoryview` of `data` without copying it.
+
+    Args:
+        data: The bytes of an input.
+
+    Returns:
+        A read-only view of `data`.
+    """
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    return view if view.readonly else view.toreadonly()
+
+
+def as_buffers(data: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Returns a copy of an input mapping whose bytes values are read-only
+    `memoryview`s of the original values. The data itself is not copied.
+    Tensors are passed through as they are.
+
+    Args:
+        data: Mapping of input name (str) to input data.
+
+    Returns:
+        Mapping of input name (str) to a read-only view of the input data.
+    """
+    return {k: as_buffer(v) if isinstance(v, (bytes, bytearray, memoryview)) else v for k, v in data.items()}
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .transport import parse_size
+
+# Rough per-entry overhead of the dictionaries and bytes objects that hold a
+# cached output, added to the size of its values.
+_ENTRY_OVERHEAD = 256
+
+
+def hash_input(input_item: Mapping[str, Any]) -> bytes:
+    """
+    Returns a 128-bit BLAKE2b digest of an input mapping's keys and values.
+    Inputs with the same keys and the same bytes (or tensors with the same
+    dtype, shape and elements) have the same digest, regardless of the order
+    of their keys.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for key in sorted(input_item):
+        value = input_item[key]
+        encoded_key = key.encode()
+        h.update(len(encoded_key).to_bytes(8, "little"))
+        h.update(encoded_key)
+        if isinstance(value, np.ndarray):
+            h.update(f"{value.dtype.str}{value.shape}".encode())
+            value = np.ascontiguousarray(value)
+        data = memoryview(value)
+        h.update(data.nbytes.to_bytes(8, "little"))
+        h.update(data)
+    return h.digest()
+
+
+def _output_size(output: Mapping[str, Any]) -> int:
+    size = _ENTRY_OVERHEAD
+    for key, value in output.items():
+        size += len(key) + (value.nbytes if isinstance(value, (np.ndarray, memoryview)) else len(value))
+    return size
+
+
+class ResultCache:
+    """
+    A thread-safe LRU cache of model outputs keyed by
+    [hash_input][chassis.runtime.cache.hash_input], for deterministic models
+    that receive the same inputs repeatedly.
+
+    Entries are evicted least-recently-used first once the cache holds more
+    than `max_memory` bytes of outputs or more than `max_entries` entries,
+    and expire `ttl` seconds after they were added.
+
+    Attributes:
+        hits: The number of lookups that found an output.
+        misses: The number of lookups that didn't.
+        evictions: The number of entries removed to stay within the limits.
+    """
+
+    def __init__(self, max_memory: int, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Init.
+
+        Args:
+            max_memory: The approximate number of bytes the cached outputs
+                may use.
+            max_entries: The maximum number of cached outputs, if any.
+            ttl: The number of seconds an output stays cached, if limited.
+        """
+        self.max_memory = max_memory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory = 0
+        self._entries: OrderedDict[bytes, Tuple[float, int, Mapping[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional[ResultCache]:
+        """
+        Creates a cache configured by the `CHASSIS_RESULT_CACHE_MAX_MEMORY`
+        (e.g. "256M"), `CHASSIS_RESULT_CACHE_MAX_ENTRIES` and
+        `CHASSIS_RESULT_CACHE_TTL` (in seconds) environment variables.
+
+        Returns:
+            The cache, or `None` if `CHASSIS_RESULT_CACHE_MAX_MEMORY` isn't
+            set.
+        """
+        max_memory = parse_size(os.getenv("CHASSIS_RESULT_CACHE_MAX_MEMORY"))
+        if not max_memory:
+            return None
+        max_entries = os.getenv("CHASSIS_RESULT_CACHE_MAX_ENTRIES")
+        ttl = os.getenv("CHASSIS_RESULT_CACHE_TTL")
+        return cls(
+            max_memory,
+            max_entries=int(max_entries) if max_entries else None,
+            ttl=float(ttl) if ttl else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[Mapping[str, Any]]:
+        """
+        Returns the output cached for `key`, or `None`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and entry[0] + self.ttl < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: bytes, output: Mapping[str, Any]):
+        """
+        Caches `output` for `key`, evicting the least recently used outputs
+        if the cache is full. Outputs larger than the whole cache aren't
+        cached.
+        """
+        size = _output_size(output)
+        if size > self.max_memory:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), size, output)
+            self.memory += size
+            while self.memory > self.max_memory or (
+                    self.max_entries is not None and len(self._entries) > self.max_entries):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: bytes):
+        _, size, _ = self._entries.pop(key)
+        self.memory -= size
@@ -1,6 +1,11 @@
 PACKAGE_DATA_PATH = "data"
+# Lists the additional files that are memory-mapped at startup.
+MMAP_MANIFEST_FILENAME = "mmap_files.json"
+# Weights extracted from the pickled model, relative to `PACKAGE_DATA_PATH`.
+PACKAGE_WEIGHTS_PATH = "weights"
 
 PYTHON_MODEL_KEY = "__chassis_model"
+PYTHON_WARMUP_KEY = "__chassis_warmup"
 
 
 # PYTHON_PREPROCESSOR_KEY = "__chassis_preprocessor"
@@ -26,6 +31,8 @@ def python_pickle_filename_for_key(key: str) -> str:
     """
     if key == PYTHON_MODEL_KEY:
         return "model.pkl"
+    if key == PYTHON_WARMUP_KEY:
+        return "warmup.pkl"
     # if key == PYTHON_PREPROCESSOR_KEY:
     #     return "preprocessor.pkl"
     # if key == PYTHON_POSTPROCESSOR_KEY:
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from . import metrics
+from .model_runner import ModelRunner, batch
+from .timings import StageTimings
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+# The model loaded by each worker of a process pool.
+_worker_model: Optional[ModelRunner] = None
+
+
+def _init_process_worker():
+    global _worker_model
+    _worker_model = ModelRunner.load()
+    if _worker_model is not None:
+        _worker_model.warmup()
+
+
+def _predict_in_process_worker(inputs: Sequence[Mapping[str, bytes]]) -> Tuple[Sequence[Mapping[str, bytes]], Dict[str, List[float]]]:
+    if _worker_model is None:
+        raise RuntimeError("Model failed to initialize in worker process.")
+    # Timings recorded in the worker are sent back with the outputs.
+    timings = StageTimings()
+    outputs = _worker_model.predict(inputs, timings)
+    return outputs, timings.stages
+
+
+def _timed(fn: Callable[..., Any], submitted: float, *args: Any) -> Any:
+    # Runs on the executor, so the time since submission is the time the
+    # call waited for a free worker.
+    metrics.QUEUE_WAIT_SECONDS.observe(time.perf_counter() - submitted, queue="executor")
+    return fn(*args)
+
+
+def _in_context(fn: Callable[..., Any], *args: Any) -> Tuple[Callable[..., Any], ...]:
+    # Unlike `asyncio.to_thread`, `run_in_executor` doesn't run the function
+    # in the caller's context, so spans created by the model wouldn't be
+    # children of the server's span.
+    return (contextvars.copy_context().run, _timed, fn, time.perf_counter(), *args)
+
+
+class InferenceExecutor:
+    """
+    Runs inferences outside of the model server's event loop so that a slow
+    `predict` call does not block other requests, including status and
+    health checks.
+
+    Two kinds of executor are supported:
+
+    - `"thread"`: Inferences run on a pool of threads in the server process.
+        This is the right choice for predict functions that release the GIL
+        (e.g. numpy, torch, onnxruntime) or that are mostly waiting on I/O.
+    - `"process"`: Inferences run on a pool of worker processes, each of which
+        loads its own copy of the model. This is the right choice for predict
+        functions that hold the GIL for most of their runtime, at the cost of
+        one copy of the model in memory per worker. Metrics recorded by the
+        model in worker processes aren't exported.
+    """
+
+    def __init__(self, kind: str = EXECUTOR_THREAD, workers: int = 1):
+        """
+        Init.
+
+        Args:
+            kind: Either "thread" or "process".
+            workers: The number of threads or processes in the pool.
+        """
+        if kind not in (EXECUTOR_THREAD, EXECUTOR_PROCESS):
+            raise ValueError(f"Unsupported executor kind '{kind}'")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self._executor: Executor
+        if kind == EXECUTOR_PROCESS:
+            # Use "spawn" so that worker processes don't inherit the server's
+            # event loop and threads.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="chassis-inference")
+
+    @classmethod
+    def from_env(cls) -> InferenceExecutor:
+        """
+        Creates an executor configured by the `CHASSIS_INFERENCE_EXECUTOR`
+        ("thread" or "process", defaults to "thread") and
+        `CHASSIS_INFERENCE_WORKERS` (defaults to 1) environment variables.
+        """
+        kind = os.getenv("CHASSIS_INFERENCE_EXECUTOR", default=EXECUTOR_THREAD).lower()
+        workers = int(os.getenv("CHASSIS_INFERENCE_WORKERS", default="1"))
+        return cls(kind, workers)
+
+    async def predict(self, model: ModelRunner, inputs: Sequence[Mapping[str, bytes]],
+                      timings: Optional[StageTimings] = None) -> Sequence[Mapping[str, bytes]]:
+        """
+        Performs an inference on the executor.
+
+        Args:
+            model: The model loaded in the server process. Process executors
+                use the copy of the model loaded in the worker instead.
+            inputs: The inputs to perform inference on. When using a process
+                executor, they must be picklable.
+            timings: If given, the timings recorded by the model are added
+                to it.
+
+        Returns:
+            The outputs of [ModelRunner.predict][chassis.runtime.ModelRunner.predict].
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == EXECUTOR_PROCESS:
+            outputs, stages = await loop.run_in_executor(self._executor, _predict_in_process_worker, inputs)
+            if timings is not None:
+                timings.merge(stages)
+            return outputs
+        return await loop.run_in_executor(self._executor, *_in_context(model.predict, inputs, timings))
+
+    async def predict_iter(self, model: ModelRunner, inputs: Sequence[Mapping[str, bytes]],
+                           timings: Optional[StageTimings] = None) -> AsyncIterator[Sequence[Mapping[str, bytes]]]:
+        """
+        Performs an inference on the executor, yielding outputs as they
+        become available.
+
+        Args:
+            model: The model loaded in the server process.
+            inputs: The inputs to perform inference on.
+            timings: If given, the timings recorded by the model are added
+                to it.
+
+        Returns:
+            An async iterator over the chunks of outputs produced by
+            [ModelRunner.predict_iter][chassis.runtime.ModelRunner.predict_iter].
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == EXECUTOR_PROCESS:
+            # Generators can't be shared with worker processes, so send the
+            # inputs to the workers one batch at a time instead.
+            for b in batch(inputs, model.batch_size):
+                yield await self.predict(model, b, timings)
+            return
+        outputs = model.predict_iter(inputs, timings)
+        while True:
+            chunk = await loop.run_in_executor(self._executor, *_in_context(next, outputs, None))
+            if chunk is None:
+                break
+            yield chunk
+
+    def shutdown(self):
+        """
+        Shuts down the pool, waiting for in-flight inferences to finish.
+        """
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import os
+import threading
+from http.server import ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+try:
+    import prometheus_client
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # pragma: no cover - depends on the environment
+    prometheus_client = None  # type: ignore
+
+DEFAULT_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_BYTES_BUCKETS = tuple(float(4 ** i) for i in range(4, 16))
+DEFAULT_RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# Metrics used by the model servers are registered in the default
+# `prometheus_client` registry, next to its process metrics.
+REGISTRY: Any = prometheus_client.REGISTRY if prometheus_client is not None else None
+
+
+def is_enabled() -> bool:
+    """
+    Returns `True` if `prometheus_client` is installed.
+    """
+    return prometheus_client is not None
+
+
+class _Metric:
+    """
+    Records values in a `prometheus_client` metric, or does nothing if
+    `prometheus_client` isn't installed.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Any = REGISTRY, **kwargs: Any):
+        self.name = name
+        self._metric: Any = None
+        if prometheus_client is not None:
+            metric_type = getattr(prometheus_client, self.kind)
+            self._metric = metric_type(name, documentation, labelnames, registry=registry, **kwargs)
+
+    def _child(self, labels: Dict[str, str]) -> Any:
+        return self._metric.labels(**labels) if labels else self._metric
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up, like a number of errors.
+    """
+    kind = "Counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        """
+        Increases the counter for `labels` by `amount`.
+        """
+        if self._metric is not None:
+            self._child(labels).inc(amount)
+
+
+class Histogram(_Metric):
+    """
+    Counts observed values, like latencies, in cumulative buckets.
+    """
+    kind = "Histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_SECONDS_BUCKETS,
+                 labelnames: Sequence[str] = (), registry: Any = REGISTRY):
+        """
+        Init.
+
+        Args:
+            name: The name of the metric.
+            documentation: A description of the metric.
+            buckets: The upper bounds of the buckets, in increasing order.
+                A bucket for all values is always added.
+            labelnames: The names of the labels values are observed with.
+            registry: The `prometheus_client` registry to expose the
+                histogram in, if any.
+        """
+        super().__init__(name, documentation, labelnames, registry, buckets=buckets)
+
+    def observe(self, value: float, **labels: str):
+        """
+        Records a value for `labels`.
+        """
+        if self._metric is not None:
+            self._child(labels).observe(value)
+
+    def count(self, **labels: str) -> int:
+        """
+        Returns the number of values observed for `labels`.
+        """
+        if self._metric is None:
+            return 0
+        for family in self._metric.collect():
+            for sample in family.samples:
+                if sample.name == f"{self.name}_count" and sample.labels == labels:
+                    return int(sample.value)
+        return 0
+
+
+REQUEST_SECONDS = Histogram(
+    "chassis_request_duration_seconds",
+    "Time to handle an inference request, from receiving its inputs to returning its outputs.",
+)
+BATCH_PREDICT_SECONDS = Histogram(
+    "chassis_batch_predict_duration_seconds",
+    "Time spent in each call to the model's predict function.",
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "chassis_queue_wait_seconds",
+    "Time inputs wait for the dynamic batcher or for a free inference worker.",
+    labelnames=("queue",),
+)
+INPUT_BYTES = Histogram("chassis_input_bytes", "Size of each input.", DEFAULT_BYTES_BUCKETS)
+OUTPUT_BYTES = Histogram("chassis_output_bytes", "Size of each output.", DEFAULT_BYTES_BUCKETS)
+BATCH_FILL_RATIO = Histogram(
+    "chassis_batch_fill_ratio",
+    "Number of inputs in each batch divided by the model's batch size.",
+    DEFAULT_RATIO_BUCKETS,
+)
+ERRORS = Counter(
+    "chassis_errors_total",
+    "Failed requests (kind=request) and inputs the model failed on (kind=input).",
+    labelnames=("kind",),
+)
+
+
+class _ServerCollector:
+    """
+    Reports the state of the server's model when the metrics are collected.
+    """
+
+    def __init__(self):
+        self.get_model: Callable[[], Any] = lambda: None
+        self.single_flight: Any = None
+
+    def collect(self) -> Iterator[Any]:
+        model = self.get_model()
+        cache = getattr(model, "result_cache", None)
+        yield GaugeMetricFamily(
+            "chassis_effective_batch_size",
+            "Batch size currently used for inference.",
+            value=getattr(model, "effective_batch_size", 0),
+        )
+        yield CounterMetricFamily(
+            "chassis_result_cache_hits_total",
+            "Inputs answered from the result cache.",
+            value=getattr(cache, "hits", 0),
+        )
+        yield CounterMetricFamily(
+            "chassis_result_cache_misses_total",
+            "Inputs not found in the result cache.",
+            value=getattr(cache, "misses", 0),
+        )
+        yield CounterMetricFamily(
+            "chassis_deduplicated_inputs_total",
+            "Inputs that shared the inference of an identical input.",
+            value=getattr(self.single_flight, "deduplicated", 0),
+        )
+
+
+_SERVER_COLLECTOR = _ServerCollector()
+if REGISTRY is not None:
+    REGISTRY.register(_SERVER_COLLECTOR)
+
+
+def item_size(item: Mapping[str, Any]) -> int:
+    """
+    Returns the number of bytes of the values of an input or output.
+    """
+    return sum(value.nbytes if hasattr(value, "nbytes") else len(value) for value in item.values())
+
+
+def observe_sizes(histogram: Histogram, items: Iterable[Mapping[str, Any]]):
+    """
+    Records the size of each of `items`.
+    """
+    for item in items:
+        histogram.observe(item_size(item))
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: Any = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Serves the metrics in the Prometheus text format on `http://host:port`
+    from a background thread.
+
+    Args:
+        port: The port to listen on. Use 0 to pick a free port.
+        host: The address to listen on.
+        registry: The `prometheus_client` registry to serve.
+
+    Returns:
+        The HTTP server. Call `shutdown()` on it to stop it.
+
+    Raises:
+        RuntimeError: If `prometheus_client` isn't installed.
+    """
+    if prometheus_client is None:
+        raise RuntimeError("Serving metrics requires prometheus-client. Install chassisml[metrics].")
+    server = ThreadingHTTPServer((host, port), prometheus_client.MetricsHandler.factory(registry))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="chassis-metrics", daemon=True).start()
+    return server
+
+
+def get_metrics_port() -> Optional[int]:
+    """
+    Returns the port set by the `CHASSIS_METRICS_PORT` environment variable,
+    or `None` if metrics shouldn't be served.
+    """
+    port = os.getenv("CHASSIS_METRICS_PORT")
+    return int(port) if port else None
+
+
+def observe_outputs(outputs: Iterable[Mapping[str, Any]]):
+    """
+    Records the size of each output and counts the inputs the model failed
+    on.
+    """
+    # Imported here because the model runner records metrics too.
+    from .model_runner import is_error_output
+    errors = 0
+    for output in outputs:
+        OUTPUT_BYTES.observe(item_size(output))
+        errors += is_error_output(output)
+    if errors > 0:
+        ERRORS.inc(errors, kind="input")
+
+
+def export_server_metrics(get_model: Callable[[], Any], single_flight: Any = None):
+    """
+    Reports the effective batch size and result cache statistics of the
+    model returned by `get_model` and the number of inputs deduplicated by
+    `single_flight` whenever the metrics are collected.
+
+    Args:
+        get_model: Returns the server's `ModelRunner`, or `None` if it isn't
+            loaded.
+        single_flight: The server's `SingleFlight`, if any.
+    """
+    _SERVER_COLLECTOR.get_model = get_model
+    _SERVER_COLLECTOR.single_flight = single_flight
@@ -1,16 +1,76 @@
 from __future__ import annotations
 
+import contextvars
+import itertools
 import os
-import json
+import threading
+import time
 import traceback
 
-import cloudpickle
-from typing import List, Mapping, Optional, Sequence, cast
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Mapping, Optional, Sequence, Tuple, cast
 
 from chassis.ftypes import BatchPredictFunction, LegacyBatchPredictFunction, LegacyNormalPredictFunction, NormalPredictFunction, PredictFunction
-from .numpy_encoder import NumpyEncoder
-from .constants import (PACKAGE_DATA_PATH, PYTHON_MODEL_KEY,
-                        python_pickle_filename_for_key)
+from .artifacts import preload_mmap_files
+from .adaptive import AdaptiveBatchSizer, is_out_of_memory
+from .buffers import as_buffers
+from .cache import ResultCache, hash_input
+from . import metrics, pickling, serializers, tracing
+from .timings import STAGE_ENCODE, STAGE_INPUT, STAGE_PREDICT, StageTimings
+from .constants import (PACKAGE_DATA_PATH, PACKAGE_WEIGHTS_PATH, PYTHON_MODEL_KEY,
+                        PYTHON_WARMUP_KEY, python_pickle_filename_for_key)
+
+
+def _load_module(key: str) -> Any:
+    filename = os.path.join(PACKAGE_DATA_PATH, python_pickle_filename_for_key(key))
+    weights_dir = os.path.join(PACKAGE_DATA_PATH, PACKAGE_WEIGHTS_PATH)
+    # Out-of-band buffers are written next to the pickle when enabled.
+    buffers_path = filename + pickling.BUFFERS_SUFFIX
+    with open(filename, "rb") as f:
+        modules = pickling.load(f, weights_dir, buffers_path if os.path.exists(buffers_path) else None)
+    return modules[key]
+
+
+class ErrorOutput(dict):
+    """
+    The output returned for an input the predict function failed on. It has
+    a single "error" key with the error message.
+    """
+
+
+def error_output(e: BaseException) -> ErrorOutput:
+    """
+    Creates the output returned for an input that failed with `e`.
+    """
+    # TODO - is there more information we can include here like a backtrace?
+    return ErrorOutput(error=f"{e}".encode())
+
+
+def is_error_output(output: Mapping) -> bool:
+    """
+    Returns `True` if `output` reports that the predict function failed on
+    its input.
+    """
+    return isinstance(output, ErrorOutput)
+
+
+def _in_order(outputs: List[Optional[Mapping[str, bytes]]], positions: Sequence[int],
+              chunks: Iterator[Sequence[Mapping[str, bytes]]]) -> Iterator[List[Mapping[str, bytes]]]:
+    # Fills `outputs` with the outputs in `chunks`, which belong at
+    # `positions`, and yields the outputs that are complete up to the first
+    # one still missing so that they are yielded in order.
+    position = 0
+    ready = 0
+    for chunk in itertools.chain([[]], chunks):
+        for output in chunk:
+            outputs[positions[position]] = output
+            position += 1
+        end = ready
+        while end < len(outputs) and outputs[end] is not None:
+            end += 1
+        if end > ready:
+            yield cast(List[Mapping[str, bytes]], outputs[ready:end])
+            ready = end
 
 
 def batch(items: Sequence, size: int):
@@ -45,12 +105,21 @@ class ModelRunner:
         try:
             # If this is the first time calling the `Status` route, then
             # attempt to load the model.
-            filename = python_pickle_filename_for_key(PYTHON_MODEL_KEY)
-            with open(os.path.join(PACKAGE_DATA_PATH, filename), "rb") as f:
-                modules = cloudpickle.load(f)
-            model: ModelRunner = modules[PYTHON_MODEL_KEY]
+            # Map the model's artifacts before unpickling it, so that the
+            # predict function's module-level `open_mmap` calls reuse them.
+            mapped = preload_mmap_files()
+            if len(mapped) > 0:
+                print(f"Memory-mapped {len(mapped)} model artifact(s).")
+            model: ModelRunner = _load_module(PYTHON_MODEL_KEY)
             if model is None:
                 raise "Model not found"
+            # Warmup inputs and callables are saved next to the model.
+            warmup_filename = os.path.join(PACKAGE_DATA_PATH, python_pickle_filename_for_key(PYTHON_WARMUP_KEY))
+            if os.path.exists(warmup_filename):
+                model.set_warmup(**_load_module(PYTHON_WARMUP_KEY))
+            model.result_cache = ResultCache.from_env()
+            if model.result_cache is not None:
+                print(f"Result cache enabled with a budget of {model.result_cache.max_memory} bytes.")
             message = "Model Initialized Successfully."
             print(message)
             return model
@@ -62,7 +131,9 @@ class ModelRunner:
             return None
 
     def __init__(self, predict_fn: PredictFunction, batch_size: int = 1,
-                 is_legacy_fn: bool = False):
+                 is_legacy_fn: bool = False, concurrency: int = 1,
+                 buffer_inputs: bool = False, adaptive_batching: bool = False,
+                 bucket_key: Optional[Callable[[Mapping[str, bytes]], Any]] = None):
         """
         Init.
 
@@ -73,83 +144,389 @@ class ModelRunner:
                 If your model does not support batching, the default value is 1
             is_legacy_fn: If `True`, predict_fn follows legacy format (not typed,
                 only single input and output supported, returns dictionary)
+            concurrency: The number of inputs a model that doesn't support
+                batching performs inference on at the same time, using a pool
+                of threads. Values greater than 1 only help if `predict_fn`
+                releases the GIL (e.g. numpy, onnxruntime or torch operations)
+                and is safe to call from multiple threads.
+            buffer_inputs: If `True`, the values of the inputs passed to
+                `predict_fn` are read-only `memoryview`s of the request data
+                instead of `bytes`. Functions that accept buffers (e.g.
+                `np.frombuffer`, `io.BytesIO`) can then read large inputs
+                without copying them.
+            adaptive_batching: If `True`, models that support batching tune
+                the size of the batches they perform inference on at runtime,
+                up to `batch_size`, based on the measured throughput, and
+                retry with smaller batches when a batch runs out of memory.
+                See [AdaptiveBatchSizer][chassis.runtime.adaptive.AdaptiveBatchSizer].
+            bucket_key: For models that support batching, a function that
+                returns the size of an input (e.g. its length in tokens). The
+                inputs of each call to `predict` are sorted by this key before
+                they are split into batches so that inputs of similar size are
+                batched together, which reduces padding. Outputs are returned
+                in the original order of the inputs.
         """
         self.predict_fn = predict_fn
         self.supports_batch = batch_size > 1
         self.batch_size = batch_size
         self.legacy = is_legacy_fn
+        self.concurrency = max(1, concurrency)
+        self.buffer_inputs = buffer_inputs
+        self.adaptive_batching = adaptive_batching
+        self.bucket_key = bucket_key
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._sizer = self._create_sizer()
+        self.result_cache: Optional[ResultCache] = None
+        self.warmup_inputs: Optional[Sequence[Mapping[str, bytes]]] = None
+        self.warmup_fn: Optional[Callable[[], None]] = None
+
+    def __getstate__(self):
+        # Thread pools and locks can't be pickled. The pool is created again
+        # the first time it's needed after the model is loaded, and batch
+        # sizes are tuned again from scratch on the machine serving the model.
+        state = self.__dict__.copy()
+        state.pop("_pool", None)
+        state.pop("_pool_lock", None)
+        state.pop("_sizer", None)
+        state.pop("result_cache", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("concurrency", 1)
+        self.__dict__.setdefault("buffer_inputs", False)
+        self.__dict__.setdefault("adaptive_batching", False)
+        self.__dict__.setdefault("bucket_key", None)
+        self.__dict__.setdefault("warmup_inputs", None)
+        self.__dict__.setdefault("warmup_fn", None)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._sizer = self._create_sizer()
+        self.result_cache = None
+
+    def _create_sizer(self) -> Optional[AdaptiveBatchSizer]:
+        if self.adaptive_batching and self.supports_batch and not self.legacy:
+            return AdaptiveBatchSizer(self.batch_size)
+        return None
 
-    def predict(self, inputs: Sequence[Mapping[str, bytes]]) -> Sequence[Mapping[str, bytes]]:
+    @property
+    def effective_batch_size(self) -> int:
+        """
+        The batch size currently used for inference. This is `batch_size`
+        unless adaptive batching is enabled.
+        """
+        return self._sizer.size if self._sizer is not None else self.batch_size
+
+    def set_warmup(self, inputs: Optional[Sequence[Mapping[str, bytes]]] = None,
+                   fn: Optional[Callable[[], None]] = None):
+        """
+        Sets what [warmup][chassis.runtime.ModelRunner.warmup] runs.
+
+        Args:
+            inputs: Inputs to perform inference on, in the same format as the
+                inputs to `predict`.
+            fn: A function with no arguments that exercises the model.
+        """
+        self.warmup_inputs = inputs
+        self.warmup_fn = fn
+
+    def warmup(self):
+        """
+        Runs the warmup function and then performs inference on the warmup
+        inputs, if either was set, discarding the results.
+
+        Model servers call this after loading the model and before reporting
+        that it is ready, so that one-time costs such as lazy kernel selection
+        or allocator growth aren't paid by the first real requests. Errors are
+        reported but don't prevent the model from being served.
+        """
+        if self.warmup_fn is None and not self.warmup_inputs:
+            return
+        start = time.time()
+        try:
+            if self.warmup_fn is not None:
+                self.warmup_fn()
+            if self.warmup_inputs:
+                self.predict(self.warmup_inputs)
+            print(f"Model warmed up in {time.time() - start:.3f}s.")
+        except Exception as e:
+            print(f"Model warmup failed. Error: {e}")
+            traceback.print_exc()
+
+    def predict(self, inputs: Sequence[Mapping[str, bytes]],
+                timings: Optional[StageTimings] = None) -> Sequence[Mapping[str, bytes]]:
         """
         Performs an inference against the model.
 
+        If `result_cache` is set, only the inputs whose outputs aren't cached
+        are sent to the model.
+
         Args:
             inputs: Mapping of input name (str) to input data (bytes) which the
                 predict function is expected to process for inference.
+            timings: If given, how long assembling the inputs, each call to
+                `predict_fn` and encoding the outputs took is recorded in it.
 
         Returns:
             List of outputs the `predict_fn` returns
         """
+        if timings is None:
+            timings = StageTimings()
+        with tracing.start_span("ModelRunner.predict", attributes={"chassis.inputs": len(inputs)}):
+            if self.result_cache is not None:
+                return [o for chunk in self.predict_iter(inputs, timings) for o in chunk]
+            if self.buffer_inputs:
+                with timings.time(STAGE_INPUT):
+                    inputs = [as_buffers(i) for i in inputs]
+            if self.legacy:
+                return self._predict_legacy(inputs, timings)
+            if self.supports_batch:
+                return self._predict_batch(inputs, timings)
+            else:
+                return self._predict_single(inputs, timings)
+
+    def predict_iter(self, inputs: Sequence[Mapping[str, bytes]],
+                     timings: Optional[StageTimings] = None) -> Iterator[Sequence[Mapping[str, bytes]]]:
+        """
+        Performs an inference against the model, yielding outputs as they
+        become available instead of waiting for all of them.
+
+        For batch models, the outputs of each batch are yielded as soon as
+        that batch finishes. For models that don't support batch, each output
+        is yielded as soon as its input has been processed, or as soon as
+        each group of `concurrency` inputs has been processed.
+
+        If `result_cache` is set, outputs for inputs that are in the cache
+        are returned without performing inference, and only the other inputs
+        are sent to the model.
+
+        Args:
+            inputs: Mapping of input name (str) to input data (bytes) which the
+                predict function is expected to process for inference.
+            timings: If given, the timings of each stage are recorded in it.
+                See [predict][chassis.runtime.ModelRunner.predict].
+
+        Returns:
+            An iterator of lists of outputs. Concatenated, the lists contain
+            one output per input in the same order as `inputs`.
+        """
+        if timings is None:
+            timings = StageTimings()
+        if self.buffer_inputs:
+            with timings.time(STAGE_INPUT):
+                inputs = [as_buffers(i) for i in inputs]
+        if self.result_cache is None:
+            yield from self._predict_iter_uncached(inputs, timings)
+            return
+        with timings.time(STAGE_INPUT):
+            keys = [hash_input(i) for i in inputs]
+            outputs = [self.result_cache.get(k) for k in keys]
+            misses = [i for i, o in enumerate(outputs) if o is None]
+        chunks = self._predict_iter_uncached([inputs[i] for i in misses], timings)
+        yield from _in_order(outputs, misses, self._cache_outputs(chunks, [keys[i] for i in misses]))
+
+    def _cache_outputs(self, chunks: Iterator[Sequence[Mapping[str, bytes]]],
+                       keys: Sequence[bytes]) -> Iterator[Sequence[Mapping[str, bytes]]]:
+        cache = cast(ResultCache, self.result_cache)
+        position = 0
+        for chunk in chunks:
+            for output in chunk:
+                if not is_error_output(output):
+                    cache.put(keys[position], output)
+                position += 1
+            yield chunk
+
+    def _predict_iter_uncached(self, inputs: Sequence[Mapping[str, bytes]],
+                               timings: StageTimings) -> Iterator[Sequence[Mapping[str, bytes]]]:
         if self.legacy:
-            return self._predict_legacy(inputs)
+            yield from self._predict_legacy_iter(inputs, timings)
+            return
         if self.supports_batch:
-            return self._predict_batch(inputs)
-        else:
-            return self._predict_single(inputs)
+            yield from self._predict_batch_iter(inputs, timings)
+            return
+        # Give concurrent models enough inputs at a time to keep all of
+        # their threads busy.
+        for b in batch(inputs, self.concurrency):
+            yield self._predict_single(b, timings)
+
+    def _predict_single(self, inputs: Sequence[Mapping[str, bytes]],
+                        timings: StageTimings) -> Sequence[Mapping[str, bytes]]:
+        if self.concurrency > 1 and len(inputs) > 1:
+            # Run each input in a copy of the caller's context so that its
+            # span is a child of the caller's span. `map` returns the outputs
+            # in the same order as the inputs.
+            contexts = [contextvars.copy_context() for _ in inputs]
+            return list(self._get_pool().map(
+                lambda context, input_item: context.run(self._predict_one, input_item, timings), contexts, inputs))
+        return [self._predict_one(input_item, timings) for input_item in inputs]
 
-    def _predict_single(self, inputs: Sequence[Mapping[str, bytes]]) -> Sequence[Mapping[str, bytes]]:
+    def _predict_one(self, input_item: Mapping[str, bytes], timings: StageTimings) -> Mapping[str, bytes]:
         # Since the predict function could be any of a number of types,
         # we need to cast it to the particular type we're expecting to
         # avoid mypy errors.
         predict_fn = cast(NormalPredictFunction, self.predict_fn)
+        try:
+            start = time.perf_counter()
+            with tracing.start_span("ModelRunner.batch", attributes={"chassis.batch_size": 1}):
+                output = predict_fn(input_item)
+            elapsed = time.perf_counter() - start
+            metrics.BATCH_PREDICT_SECONDS.observe(elapsed)
+            timings.record(STAGE_PREDICT, elapsed)
+            return output
+        except Exception as e:
+            print(f"Error: {e}")
+            traceback.print_exc()
+            return error_output(e)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                thread_name_prefix="chassis-predict")
+            return self._pool
+
+    def _predict_batch(self, inputs: Sequence[Mapping[str, bytes]],
+                       timings: StageTimings) -> Sequence[Mapping[str, bytes]]:
         outputs: List[Mapping[str, bytes]] = []
-        for input_item in inputs:
-            try:
-                output: Mapping[str, bytes] = predict_fn(input_item)
-            except Exception as e:
-                print(f"Error: {e}")
-                traceback.print_exc()
-                # TODO - is there more information we can include here like a backtrace?
-                # TODO - convert the error to bytes
-                output = {"error": f"{e}".encode()}
-            outputs.append(output)
+        for b in self._predict_batch_iter(inputs, timings):
+            outputs.extend(b)
         return outputs
 
-    def _predict_batch(self, inputs: Sequence[Mapping[str, bytes]]) -> Sequence[Mapping[str, bytes]]:
+    def _predict_batch_iter(self, inputs: Sequence[Mapping[str, bytes]],
+                            timings: StageTimings) -> Iterator[Sequence[Mapping[str, bytes]]]:
+        if self.bucket_key is None or len(inputs) <= 1:
+            yield from self._run_batches(inputs, timings)
+            return
+        bucket_key = self.bucket_key
+        with timings.time(STAGE_INPUT):
+            order = sorted(range(len(inputs)), key=lambda i: bucket_key(inputs[i]))
+        outputs: List[Optional[Mapping[str, bytes]]] = [None] * len(inputs)
+        yield from _in_order(outputs, order, self._run_batches([inputs[i] for i in order], timings))
+
+    def _run_batches(self, inputs: Sequence[Mapping[str, bytes]],
+                     timings: StageTimings) -> Iterator[Sequence[Mapping[str, bytes]]]:
         # Since the predict function could be any of a number of types,
         # we need to cast it to the particular type we're expecting to
         # avoid mypy errors.
         predict_fn = cast(BatchPredictFunction, self.predict_fn)
+        if self._sizer is None:
+            # Split inputs into groups of self.batch_size
+            for b in batch(inputs, self.batch_size):
+                try:
+                    outputs, _ = self._call_batch(predict_fn, b, timings)
+                except Exception as e:
+                    outputs = self._isolate_failures(predict_fn, b, e, timings)
+                yield outputs
+            return
+        start = 0
+        while start < len(inputs):
+            b = inputs[start:start + self._sizer.size]
+            try:
+                outputs, elapsed = self._call_batch(predict_fn, b, timings)
+                self._sizer.record(len(b), elapsed)
+            except Exception as e:
+                if len(b) > 1 and is_out_of_memory(e):
+                    # Retry the same inputs in smaller batches.
+                    self._sizer.backoff(len(b))
+                    print(f"Batch of {len(b)} ran out of memory. Reducing batch size to {self._sizer.size}.")
+                    continue
+                outputs = self._isolate_failures(predict_fn, b, e, timings)
+            start += len(b)
+            yield outputs
+
+    def _call_batch(self, predict_fn: Callable[[Sequence[Any]], Sequence[Any]],
+                    inputs: Sequence[Any], timings: StageTimings) -> Tuple[Sequence[Any], float]:
+        """
+        Calls `predict_fn` on a batch and records how long it took and how
+        full the batch was.
+
+        Raises:
+            ValueError: If `predict_fn` doesn't return one output per input,
+                since the outputs couldn't be matched to their inputs.
+        """
+        start = time.perf_counter()
+        with tracing.start_span("ModelRunner.batch", attributes={"chassis.batch_size": len(inputs)}):
+            outputs = predict_fn(inputs)
+        elapsed = time.perf_counter() - start
+        metrics.BATCH_PREDICT_SECONDS.observe(elapsed)
+        metrics.BATCH_FILL_RATIO.observe(len(inputs) / self.batch_size)
+        timings.record(STAGE_PREDICT, elapsed)
+        if len(outputs) != len(inputs):
+            raise ValueError(f"The predict function returned {len(outputs)} outputs for a batch of {len(inputs)} inputs")
+        return outputs, elapsed
+
+    def _isolate_failures(self, predict_fn: BatchPredictFunction, inputs: Sequence[Mapping[str, bytes]],
+                          error: Exception, timings: StageTimings) -> List[Mapping[str, bytes]]:
+        """
+        Finds the inputs that made a batch fail by splitting the batch in
+        halves and retrying each half until the failing inputs are alone.
+        Only those inputs get error outputs.
+
+        The number of retries is bounded by a small multiple of the depth of
+        the bisection, so a batch with many bad inputs costs at most a few
+        extra batches. Inputs that haven't been isolated when the retries run
+        out get error outputs too.
+        """
+        print(f"Batch of {len(inputs)} failed. Retrying in smaller batches to isolate the error: {error}")
+        traceback.print_exc()
+        retries = 4 * len(inputs).bit_length()
+
+        def bisect(items: Sequence[Mapping[str, bytes]], e: Exception) -> List[Mapping[str, bytes]]:
+            nonlocal retries
+            if len(items) == 1 or retries <= 0:
+                return [error_output(e) for _ in items]
+            outputs: List[Mapping[str, bytes]] = []
+            middle = len(items) // 2
+            for half in (items[:middle], items[middle:]):
+                if retries <= 0:
+                    outputs.extend(error_output(e) for _ in half)
+                    continue
+                retries -= 1
+                try:
+                    half_outputs, _ = self._call_batch(predict_fn, half, timings)
+                    outputs.extend(half_outputs)
+                except Exception as half_error:
+                    outputs.extend(bisect(half, half_error))
+            return outputs
+
+        return bisect(inputs, error)
+
+    def _predict_legacy(self, inputs: Sequence[Mapping[str, bytes]],
+                        timings: StageTimings) -> Sequence[Mapping[str, bytes]]:
         outputs: List[Mapping[str, bytes]] = []
-        # Split inputs into groups of self.batch_size
-        batches = batch(inputs, self.batch_size)
-        for b in batches:
-            outputs.extend(predict_fn(b))
+        for b in self._predict_legacy_iter(inputs, timings):
+            outputs.extend(b)
         return outputs
 
-    def _predict_legacy(self, inputs: Sequence[Mapping[str, bytes]]) -> Sequence[Mapping[str, bytes]]:
-        outputs: List[Mapping[str, bytes]] = []
+    def _predict_legacy_iter(self, inputs: Sequence[Mapping[str, bytes]],
+                             timings: StageTimings) -> Iterator[List[Mapping[str, bytes]]]:
         if self.batch_size == 1:
             # Since the predict function could be any of a number of types,
             # we need to cast it to the particular type we're expecting to
             # avoid mypy errors.
             predict_fn = cast(LegacyNormalPredictFunction, self.predict_fn)
             for input_item in inputs:
-                output = predict_fn(input_item["input"])
-                outputs.append({"results.json": json.dumps(output, separators=(
-                    ",", ":"), cls=NumpyEncoder).encode()})
-            return outputs
+                start = time.perf_counter()
+                with tracing.start_span("ModelRunner.batch", attributes={"chassis.batch_size": 1}):
+                    output = predict_fn(input_item["input"])
+                elapsed = time.perf_counter() - start
+                metrics.BATCH_PREDICT_SECONDS.observe(elapsed)
+                timings.record(STAGE_PREDICT, elapsed)
+                with timings.time(STAGE_ENCODE):
+                    encoded = serializers.dumps(output)
+                yield [{"results.json": encoded}]
         else:
             # Since the predict function could be any of a number of types,
             # we need to cast it to the particular type we're expecting to
             # avoid mypy errors.
             batch_predict_fn = cast(LegacyBatchPredictFunction, self.predict_fn)
             adjusted_inputs = [input_item["input"] for input_item in inputs]
-            # Split inputs into groups of self.batch_size
-            batches = batch(adjusted_inputs, self.batch_size)
-            for b in batches:
-                outputs.extend(batch_predict_fn(b))
-            adjusted_outputs: List[Mapping[str, bytes]] = [
-                {"results.json": json.dumps(o, separators=(",", ":"), cls=NumpyEncoder).encode()}
-                for o in outputs]
-            return adjusted_outputs
+            # Split inputs into groups of self.batch_size and encode the
+            # outputs of each batch as soon as it finishes so that the raw
+            # outputs of only one batch are held at a time.
+            for b in batch(adjusted_inputs, self.batch_size):
+                outputs, _ = self._call_batch(batch_predict_fn, b, timings)
+                with timings.time(STAGE_ENCODE):
+                    encoded_outputs: List[Mapping[str, bytes]] = [{"results.json": o} for o in serializers.dumps_batch(outputs)]
+                yield encoded_outputs
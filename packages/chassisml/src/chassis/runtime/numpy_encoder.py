@@ -6,8 +6,8 @@ class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, np.ndarray):
             return obj.tolist()
-        if isinstance(obj, np.float32) or isinstance(obj, np.float64):
-            return float(obj)
-        if isinstance(obj, np.int32) or isinstance(obj, np.int64):
-            return int(obj)
+        # Covers every numpy scalar type, including bool_, float16 and the
+        # unsigned and smaller integer types.
+        if isinstance(obj, np.generic):
+            return obj.item()
         return json.JSONEncoder.default(self, obj)
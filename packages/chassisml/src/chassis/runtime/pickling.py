@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import sys
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+import cloudpickle
+import numpy as np
+
+# Identifies the persistent IDs of extracted weights in a pickle.
+_WEIGHTS_TAG = "chassis.weights"
+# Out-of-band buffers are written next to the pickle, in a file with the
+# pickle's name and this suffix.
+BUFFERS_SUFFIX = ".buffers"
+# Out-of-band buffers start at multiples of this many bytes, which satisfies
+# the alignment of every numpy dtype and of SIMD loads.
+_BUFFER_ALIGNMENT = 64
+# Smaller buffers are kept in the pickle.
+_MIN_OUT_OF_BAND_SIZE = 1024
+
+
+def _weights_array(obj: Any) -> Optional[Tuple[Any, np.ndarray, str]]:
+    """
+    Returns the object that owns the data of `obj`, the numpy array holding
+    that data and the kind of object it should be rehydrated to, if `obj`
+    can be extracted.
+    """
+    if type(obj) is np.ndarray:
+        return obj, obj, "numpy"
+    # Only look for tensors if the model already imported torch.
+    torch = sys.modules.get("torch")
+    # Tensors pickle their storage along with their offset, shape, strides
+    # and `requires_grad`, so the storage is extracted rather than the
+    # tensor, which keeps those and lets views of one storage share it again
+    # after loading. Parameters pickle their data as a plain tensor.
+    if torch is not None and type(obj) is getattr(torch, "TypedStorage", None):
+        storage = obj._untyped_storage
+        if storage.device.type != "cpu":
+            return None
+        # The raw bytes, so that dtypes without a numpy equivalent, like
+        # bfloat16, are extracted too.
+        return storage, torch.empty(0, dtype=torch.uint8).set_(storage).numpy(), str(obj.dtype)
+    return None
+
+
+class WeightsPickler(cloudpickle.CloudPickler):
+    """
+    A `CloudPickler` that writes large numpy arrays and the storages of
+    torch tensors to `.npy` files in `weights_dir` instead of into the
+    pickle.
+
+    The files are named by the hash of their contents, so rebuilding a model
+    whose weights didn't change produces identical files, and the Docker
+    layer that holds them stays cached.
+    """
+
+    def __init__(self, file: IO[bytes], weights_dir: str, min_size: int, **kwargs):
+        """
+        Init.
+
+        Args:
+            file: The file to write the pickle to.
+            weights_dir: The directory to write the extracted weights to.
+            min_size: The number of bytes from which arrays are extracted.
+            kwargs: Passed to `CloudPickler`.
+        """
+        super().__init__(file, **kwargs)
+        self.weights_dir = weights_dir
+        self.min_size = min_size
+        self._persistent_ids: Dict[int, Tuple[Any, Optional[Tuple[Any, ...]]]] = {}
+
+    def persistent_id(self, obj: Any) -> Optional[Tuple[Any, ...]]:
+        weights = _weights_array(obj)
+        if weights is None:
+            return None
+        owner, array, kind = weights
+        # Tensors that share a storage and arrays that appear several times
+        # are only hashed once. The owners are kept so that their ids aren't
+        # reused during the dump.
+        cached = self._persistent_ids.get(id(owner))
+        if cached is not None:
+            return cached[1]
+        pid = self._extract(array, kind)
+        self._persistent_ids[id(owner)] = owner, pid
+        return pid
+
+    def _extract(self, array: np.ndarray, kind: str) -> Optional[Tuple[Any, ...]]:
+        if array.nbytes < self.min_size or array.dtype.hasobject:
+            return None
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{array.dtype.str}{array.shape}".encode())
+        h.update(np.ascontiguousarray(array).data)
+        filename = f"{h.hexdigest()}.npy"
+        path = os.path.join(self.weights_dir, filename)
+        if not os.path.exists(path):
+            np.save(path, array, allow_pickle=False)
+        if kind == "numpy":
+            return _WEIGHTS_TAG, filename, kind
+        # Storages with the same contents are written to the same file, so
+        # the pid identifies the storage for the loader to share it.
+        return _WEIGHTS_TAG, filename, kind, len(self._persistent_ids)
+
+
+class BufferWriter:
+    """
+    A pickle protocol 5 `buffer_callback` that writes out-of-band buffers to
+    a file, each aligned to 64 bytes.
+
+    [close][chassis.runtime.pickling.BufferWriter.close] appends the offsets
+    and sizes of the buffers, followed by the 8-byte offset of that index,
+    so that [read_buffers][chassis.runtime.pickling.read_buffers] can map
+    them in the same order.
+    """
+
+    def __init__(self, file: IO[bytes]):
+        """
+        Init.
+
+        Args:
+            file: The file to write the buffers to.
+        """
+        self.file = file
+        self.index: List[Tuple[int, int]] = []
+        self._offset = 0
+
+    def __call__(self, buffer: pickle.PickleBuffer) -> bool:
+        data = buffer.raw()
+        if data.nbytes < _MIN_OUT_OF_BAND_SIZE:
+            # Keep the buffer in-band.
+            return True
+        padding = -self._offset % _BUFFER_ALIGNMENT
+        self.file.write(b"\0" * padding)
+        self._offset += padding
+        self.index.append((self._offset, data.nbytes))
+        self.file.write(data)
+        self._offset += data.nbytes
+        return False
+
+    def close(self):
+        """
+        Writes the index of the buffers.
+        """
+        self.file.write(json.dumps(self.index).encode())
+        self.file.write(self._offset.to_bytes(8, "little"))
+
+
+def read_buffers(path: str) -> List[memoryview]:
+    """
+    Maps a file written by a [BufferWriter][chassis.runtime.pickling.BufferWriter]
+    into memory copy-on-write.
+
+    Returns:
+        The buffers, in the order they were written. They are only read from
+        disk when they are accessed and are only copied if they are
+        modified.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    index_offset = int.from_bytes(mapping[-8:], "little")
+    index = json.loads(mapping[index_offset:-8])
+    data = memoryview(mapping)
+    return [data[offset:offset + size] for offset, size in index]
+
+
+class WeightsUnpickler(pickle.Unpickler):
+    """
+    Loads pickles written by [WeightsPickler][chassis.runtime.pickling.WeightsPickler].
+
+    Extracted weights are memory-mapped copy-on-write, so they are read from
+    disk only when they are first accessed, share the page cache with other
+    processes that load the same model, and are only copied if the model
+    modifies them.
+    """
+
+    def __init__(self, file: IO[bytes], weights_dir: str, buffers: Optional[List[memoryview]] = None):
+        """
+        Init.
+
+        Args:
+            file: The file to read the pickle from.
+            weights_dir: The directory the weights were extracted to.
+            buffers: The out-of-band buffers of the pickle, if any.
+        """
+        super().__init__(file, buffers=buffers)
+        self.weights_dir = weights_dir
+        self._storages: Dict[Any, Any] = {}
+
+    def persistent_load(self, pid: Any) -> Any:
+        if not isinstance(pid, tuple) or len(pid) not in (3, 4) or pid[0] != _WEIGHTS_TAG:
+            raise pickle.UnpicklingError(f"Unsupported persistent ID: {pid!r}")
+        filename, kind = pid[1:3]
+        if kind == "numpy":
+            return self._load_array(filename)
+        import torch
+        storage = self._storages.get(pid[3])
+        if storage is None:
+            storage = torch.from_numpy(self._load_array(filename)).untyped_storage()
+            self._storages[pid[3]] = storage
+        return torch.TypedStorage(wrap_storage=storage, dtype=getattr(torch, kind.split(".")[-1]), _internal=True)
+
+    def _load_array(self, filename: str) -> np.ndarray:
+        return np.load(os.path.join(self.weights_dir, filename), mmap_mode="c", allow_pickle=False)
+
+
+def dump(obj: Any, file: IO[bytes], weights_dir: Optional[str] = None, min_size: int = 1 << 20,
+         buffers_file: Optional[IO[bytes]] = None):
+    """
+    Cloudpickles `obj` into `file`.
+
+    Args:
+        obj: The object to pickle.
+        file: The file to write the pickle to.
+        weights_dir: If given, numpy arrays and the storages of torch
+            tensors of at least `min_size` bytes are written to this
+            directory instead of into the pickle.
+        min_size: The number of bytes from which arrays are extracted.
+        buffers_file: If given, `obj` is pickled with protocol 5 and the
+            data of objects that support out-of-band buffers, like numpy
+            arrays, is written to this file instead of being copied into the
+            pickle.
+    """
+    kwargs: dict = {}
+    writer = None
+    if buffers_file is not None:
+        writer = BufferWriter(buffers_file)
+        kwargs = {"protocol": 5, "buffer_callback": writer}
+    if weights_dir is None:
+        cloudpickle.CloudPickler(file, **kwargs).dump(obj)
+    else:
+        os.makedirs(weights_dir, exist_ok=True)
+        WeightsPickler(file, weights_dir, min_size, **kwargs).dump(obj)
+    if writer is not None:
+        writer.close()
+
+
+def load(file: IO[bytes], weights_dir: str, buffers_path: Optional[str] = None) -> Any:
+    """
+    Loads a pickle written by [dump][chassis.runtime.pickling.dump].
+
+    Args:
+        file: The file to read the pickle from.
+        weights_dir: The directory the weights were extracted to, if any.
+        buffers_path: The path of the `buffers_file` it was dumped with, if
+            any.
+
+    Returns:
+        The unpickled object.
+    """
+    buffers = read_buffers(buffers_path) if buffers_path is not None else None
+    return WeightsUnpickler(file, weights_dir, buffers=buffers).load()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .numpy_encoder import NumpyEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore
+
+SERIALIZER_JSON = "json"
+SERIALIZER_ORJSON = "orjson"
+
+
+class Serializer(ABC):
+    """
+    Converts the results returned by a predict function into bytes.
+
+    Subclasses implement [dumps][chassis.runtime.serializers.Serializer.dumps]
+    and can override
+    [dumps_batch][chassis.runtime.serializers.Serializer.dumps_batch] to
+    serialize batches more efficiently.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Serializes `obj`, which may contain numpy arrays and scalars.
+        """
+
+    def dumps_batch(self, objs: Sequence[Any]) -> List[bytes]:
+        """
+        Serializes each item of a batch of results separately. `objs` may be
+        a numpy array, in which case each row is an item.
+        """
+        return [self.dumps(o) for o in objs]
+
+
+class JSONSerializer(Serializer):
+    """
+    Serializes to compact JSON using the standard library and
+    [NumpyEncoder][chassis.runtime.numpy_encoder.NumpyEncoder].
+    """
+
+    name = SERIALIZER_JSON
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), cls=NumpyEncoder).encode()
+
+
+def _orjson_default(obj: Any) -> Any:
+    # orjson serializes contiguous arrays of the common numeric dtypes and
+    # numpy scalars natively. Everything else goes through the same
+    # conversions as `NumpyEncoder`.
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonSerializer(Serializer):
+    """
+    Serializes to compact JSON using `orjson`, which encodes numpy arrays
+    directly from their buffers instead of converting them to lists first.
+
+    Unlike [JSONSerializer][chassis.runtime.serializers.JSONSerializer],
+    float32 and float16 values are written with the shortest representation
+    for their precision, and NaN and infinity are written as `null`. Results
+    orjson can't serialize, like integers wider than 64 bits, are serialized
+    with [JSONSerializer][chassis.runtime.serializers.JSONSerializer]
+    instead.
+    """
+
+    name = SERIALIZER_ORJSON
+
+    def __init__(self):
+        """
+        Init.
+        """
+        if orjson is None:
+            raise ImportError("orjson is not installed. Install it with `pip install chassisml[orjson]`.")
+        self._option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        self._fallback = JSONSerializer()
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=self._option)
+        except TypeError:
+            # `orjson.JSONEncodeError` is a `TypeError`.
+            return self._fallback.dumps(obj)
+
+    def dumps_batch(self, objs: Sequence[Any]) -> List[bytes]:
+        if isinstance(objs, np.ndarray):
+            # Rows of a C-contiguous array are contiguous too, so orjson can
+            # serialize each of them straight from the array's buffer.
+            objs = np.ascontiguousarray(objs)
+        return super().dumps_batch(objs)
+
+
+_SERIALIZERS: Dict[str, Callable[[], Serializer]] = {
+    SERIALIZER_JSON: JSONSerializer,
+    SERIALIZER_ORJSON: OrjsonSerializer,
+}
+_default_serializer: Optional[Serializer] = None
+
+
+def register_serializer(name: str, factory: Callable[[], Serializer]):
+    """
+    Makes a serializer available to
+    [get_serializer][chassis.runtime.serializers.get_serializer].
+
+    Args:
+        name: The name used to select the serializer, e.g. in the
+            `CHASSIS_JSON_SERIALIZER` environment variable.
+        factory: A callable with no arguments that returns the serializer.
+    """
+    global _default_serializer
+    _SERIALIZERS[name] = factory
+    _default_serializer = None
+
+
+def get_serializer(name: Optional[str] = None) -> Serializer:
+    """
+    Returns a serializer by name.
+
+    Args:
+        name: The name of a registered serializer. Defaults to the
+            `CHASSIS_JSON_SERIALIZER` environment variable or, if that isn't
+            set, "json". Set it to "orjson" to serialize large numpy
+            results faster.
+
+    Returns:
+        The serializer.
+    """
+    if name is None:
+        name = os.getenv("CHASSIS_JSON_SERIALIZER", default="")
+        if len(name) == 0:
+            name = SERIALIZER_JSON
+    factory = _SERIALIZERS.get(name.lower())
+    if factory is None:
+        raise ValueError(f"Unknown serializer '{name}'. Use one of {list(_SERIALIZERS)}.")
+    return factory()
+
+
+def _get_default_serializer() -> Serializer:
+    global _default_serializer
+    if _default_serializer is None:
+        _default_serializer = get_serializer()
+    return _default_serializer
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serializes `obj` with the default serializer. See
+    [get_serializer][chassis.runtime.serializers.get_serializer].
+    """
+    return _get_default_serializer().dumps(obj)
+
+
+def dumps_batch(objs: Sequence[Any]) -> List[bytes]:
+    """
+    Serializes each item of a batch of results with the default serializer.
+    See [Serializer.dumps_batch][chassis.runtime.serializers.Serializer.dumps_batch].
+    """
+    return _get_default_serializer().dumps_batch(objs)
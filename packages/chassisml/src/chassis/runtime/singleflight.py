@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, cast
+
+from .cache import hash_input
+
+PredictCoroutine = Callable[[List[Mapping[str, Any]]], Awaitable[Sequence[Mapping[str, Any]]]]
+
+
+class SingleFlight:
+    """
+    Deduplicates identical inputs that are being processed at the same time.
+
+    Only enable this for deterministic models, since inputs that share an
+    inference also share its output.
+
+    Inputs are identified by [hash_input][chassis.runtime.cache.hash_input].
+    When an input arrives while an identical input is still being processed,
+    it waits for that inference to finish and shares its output instead of
+    running the model again. Identical inputs within the same call are also
+    only processed once.
+
+    The inference runs in its own task, so a caller that is cancelled (e.g.
+    because its client disconnected) doesn't cancel it for the callers that
+    share it. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        """
+        Init.
+        """
+        self._in_flight: Dict[bytes, Tuple[asyncio.Future, int]] = {}
+        self.deduplicated = 0
+
+    @classmethod
+    def from_env(cls) -> Optional[SingleFlight]:
+        """
+        Returns a `SingleFlight` if the `CHASSIS_DEDUPLICATE_INPUTS`
+        environment variable is set to "true", otherwise `None`.
+        """
+        if os.getenv("CHASSIS_DEDUPLICATE_INPUTS", default="false").lower() in ("1", "true", "yes"):
+            return cls()
+        return None
+
+    async def run(self, inputs: Sequence[Mapping[str, Any]], predict: PredictCoroutine) -> List[Mapping[str, Any]]:
+        """
+        Performs inference on the inputs that aren't already in flight.
+
+        Args:
+            inputs: The inputs to perform inference on.
+            predict: A coroutine function that performs inference on a list
+                of inputs and returns one output per input.
+
+        Returns:
+            One output per input in the same order as `inputs`.
+        """
+        keys = [hash_input(i) for i in inputs]
+        # For each input, the inference it shares and the position of its
+        # output, or `None` if it needs a new inference.
+        shared: List[Optional[Tuple[asyncio.Future, int]]] = []
+        new_keys: List[bytes] = []
+        new_inputs: List[Mapping[str, Any]] = []
+        positions: Dict[bytes, int] = {}
+        for key, input_item in zip(keys, inputs):
+            in_flight = self._in_flight.get(key)
+            if in_flight is None and key not in positions:
+                positions[key] = len(new_inputs)
+                new_keys.append(key)
+                new_inputs.append(input_item)
+            else:
+                self.deduplicated += 1
+            shared.append(in_flight)
+        task: Optional[asyncio.Future] = None
+        if len(new_inputs) > 0:
+            task = asyncio.ensure_future(predict(new_inputs))
+            for position, key in enumerate(new_keys):
+                self._in_flight[key] = (task, position)
+            task.add_done_callback(lambda t: self._finish(t, new_keys))
+        outputs: List[Mapping[str, Any]] = []
+        for key, in_flight in zip(keys, shared):
+            future, position = in_flight if in_flight is not None else (cast(asyncio.Future, task), positions[key])
+            outputs.append((await asyncio.shield(future))[position])
+        return outputs
+
+    def _finish(self, task: asyncio.Future, keys: List[bytes]):
+        for key in keys:
+            if self._in_flight.get(key, (None, 0))[0] is task:
+                del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller waiting
+            # for it was cancelled.
+            task.exception()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from chassis.protos.v1.model_pb2 import Tensor
+
+# The kinds of numpy dtypes that can be sent as tensors: booleans, signed and
+# unsigned integers, floats and complex numbers.
+_TENSOR_DTYPE_KINDS = "biufc"
+
+
+def is_tensor(value: Any) -> bool:
+    """
+    Returns `True` if `value` is sent as a [Tensor][] instead of as bytes.
+    """
+    return isinstance(value, np.ndarray)
+
+
+def validate_dtype(dtype: Any) -> str:
+    """
+    Normalizes a tensor dtype to the name of its numpy dtype, raising
+    `ValueError` if tensors of that dtype aren't supported.
+
+    Args:
+        dtype: Anything `numpy.dtype` accepts, e.g. "float32" or `np.int64`.
+
+    Returns:
+        The name of the dtype, e.g. "float32".
+    """
+    try:
+        np_dtype = np.dtype(dtype)
+    except TypeError as e:
+        raise ValueError(f"Invalid tensor dtype '{dtype}': {e}")
+    if np_dtype.kind not in _TENSOR_DTYPE_KINDS:
+        raise ValueError(f"Unsupported tensor dtype '{dtype}'. Tensors must be of a boolean or numeric dtype.")
+    return np_dtype.name
+
+
+def tensor_to_proto(array: np.ndarray, data: Optional[bytes] = None) -> Tensor:
+    """
+    Encodes a numpy array as a [Tensor][].
+
+    Args:
+        array: The array to encode.
+        data: The bytes to send instead of the array's elements, e.g. the
+            compressed elements.
+
+    Returns:
+        The tensor message.
+    """
+    dtype = validate_dtype(array.dtype)
+    if data is None:
+        # `tobytes` always returns the elements in C order. Only arrays that
+        # aren't little-endian need to be converted first.
+        if array.dtype.byteorder == ">":
+            array = array.astype(array.dtype.newbyteorder("<"))
+        data = array.tobytes()
+    return Tensor(dtype=dtype, shape=array.shape, data=data)
+
+
+def tensor_from_proto(tensor: Tensor, data: Optional[bytes] = None) -> np.ndarray:
+    """
+    Decodes a [Tensor][] into a numpy array.
+
+    The array is a read-only view of the tensor's data, so no elements are
+    copied. Use `array.copy()` if the array needs to be modified.
+
+    Args:
+        tensor: The tensor message.
+        data: The bytes to read the elements from instead of the tensor's
+            data, e.g. the decompressed data.
+
+    Returns:
+        The array.
+
+    Raises:
+        ValueError: If the dtype isn't supported or the size of the data
+            doesn't match the dtype and shape.
+    """
+    dtype = np.dtype(validate_dtype(tensor.dtype)).newbyteorder("<")
+    if data is None:
+        data = tensor.data
+    shape = tuple(tensor.shape)
+    if any(d < 0 for d in shape):
+        raise ValueError(f"Invalid tensor shape {list(shape)}")
+    expected = math.prod(shape) * dtype.itemsize
+    if len(data) != expected:
+        raise ValueError(
+            f"Tensor of dtype {dtype.name} and shape {list(shape)} needs {expected} bytes of data, got {len(data)}"
+        )
+    return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+
+def check_declared(array: np.ndarray, dtype: str, shape: Sequence[int]):
+    """
+    Checks a decoded tensor against the dtype and shape declared for it in
+    the model's metadata.
+
+    Args:
+        array: The decoded tensor.
+        dtype: The declared dtype.
+        shape: The declared shape. Dimensions of -1 can have any size, and an
+            empty shape accepts any shape.
+
+    Raises:
+        ValueError: If the tensor doesn't match the declaration.
+    """
+    if array.dtype.name != dtype:
+        raise ValueError(f"Expected dtype {dtype}, got {array.dtype.name}")
+    if len(shape) > 0 and (
+        array.ndim != len(shape) or any(d != -1 and d != n for d, n in zip(shape, array.shape))
+    ):
+        raise ValueError(f"Expected shape {list(shape)}, got {list(array.shape)}")
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Sequence
+
+# Clients that send this metadata key with the value "true" receive the
+# timings of their request in the trailing metadata under the same key.
+TIMINGS_METADATA_KEY = "chassis-timings"
+
+# The stages timed by the model runner and the OMI server.
+STAGE_DECODE = "decode"
+STAGE_INPUT = "input"
+STAGE_PREDICT = "predict"
+STAGE_ENCODE = "encode"
+STAGE_RESPONSE = "response"
+
+
+class StageTimings:
+    """
+    Records how long each stage of handling a request took, in seconds.
+
+    A stage can be timed more than once, e.g. the `predict` stage is timed
+    once per batch, so each stage has a list of durations.
+
+    Stages:
+        decode: Decoding and decompressing the inputs of the request.
+        input: Assembling the inputs for the model, including result cache
+            lookups.
+        predict: Each call to the model's predict function.
+        encode: Encoding the outputs of legacy models as JSON.
+        response: Building and compressing the response.
+    """
+
+    def __init__(self):
+        """
+        Init.
+        """
+        self.stages: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        """
+        Adds a duration to a stage.
+        """
+        self.stages.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """
+        Records how long the body of the `with` statement takes.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def merge(self, stages: Mapping[str, List[float]]):
+        """
+        Adds the durations recorded by another `StageTimings`, e.g. in a
+        worker process.
+        """
+        for stage, durations in stages.items():
+            self.stages.setdefault(stage, []).extend(durations)
+
+    def total(self, stage: str) -> float:
+        """
+        Returns the sum of the durations of a stage.
+        """
+        return sum(self.stages.get(stage, []))
+
+    def to_json(self) -> str:
+        return json.dumps(self.stages, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> StageTimings:
+        timings = cls()
+        timings.merge(json.loads(data))
+        return timings
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    Returns the `q`th percentile of `sorted_values`, interpolating linearly
+    between the closest values.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize_latencies(latencies: Sequence[float]) -> Dict[str, float]:
+    """
+    Returns the mean, minimum, p50, p95, p99 and maximum of `latencies`,
+    e.g. for benchmark reports. All values are 0 if there are no latencies.
+    """
+    values = sorted(latencies)
+    return {
+        "mean": sum(values) / len(values) if values else 0.0,
+        "min": values[0] if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, MutableMapping, Optional
+
+try:
+    from opentelemetry import propagate, trace
+except ImportError:  # pragma: no cover - depends on the environment
+    propagate = None  # type: ignore
+    trace = None  # type: ignore
+
+TRACER_NAME = "chassis"
+
+SPAN_KIND_INTERNAL = "internal"
+SPAN_KIND_SERVER = "server"
+SPAN_KIND_CLIENT = "client"
+
+
+class _NoopSpan:
+    """
+    Stands in for an OpenTelemetry span when OpenTelemetry isn't installed.
+    """
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def is_enabled() -> bool:
+    """
+    Returns `True` if the OpenTelemetry API is installed.
+    """
+    return trace is not None
+
+
+@contextmanager
+def start_span(name: str, kind: str = SPAN_KIND_INTERNAL, attributes: Optional[Mapping[str, Any]] = None,
+               carrier: Optional[Mapping[str, Any]] = None) -> Iterator[Any]:
+    """
+    Runs the body of the `with` statement in a new span that is a child of
+    the current span, or of the span propagated in `carrier`.
+
+    Spans are created with the OpenTelemetry API, so they are only exported
+    if an OpenTelemetry SDK is configured in the process (e.g. by running
+    the server with `opentelemetry-instrument`). Without the API installed,
+    this does nothing.
+
+    Args:
+        name: The name of the span.
+        kind: "internal", "server" or "client".
+        attributes: Attributes to set on the span.
+        carrier: gRPC metadata or HTTP headers to continue the trace of a
+            remote caller from.
+
+    Returns:
+        A context manager that yields the span.
+    """
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+    context = propagate.extract(_string_values(carrier)) if carrier is not None else None
+    tracer = trace.get_tracer(TRACER_NAME)
+    with tracer.start_as_current_span(name, context=context, kind=trace.SpanKind[kind.upper()],
+                                      attributes=attributes) as span:
+        yield span
+
+
+def inject(carrier: Optional[Mapping[str, str]] = None) -> Optional[Dict[str, str]]:
+    """
+    Adds the current trace context to gRPC metadata or HTTP headers so
+    that the server continues the caller's trace.
+
+    Args:
+        carrier: The metadata to add to. It isn't modified.
+
+    Returns:
+        A copy of `carrier` with the trace context, or `carrier` itself if
+        there is nothing to propagate.
+    """
+    if propagate is None:
+        return dict(carrier) if carrier is not None else None
+    metadata: Dict[str, str] = dict(carrier or {})
+    propagate.inject(metadata)
+    return metadata if metadata or carrier is not None else None
+
+
+def _string_values(carrier: Mapping[str, Any]) -> MutableMapping[str, str]:
+    # gRPC metadata can also hold binary values, which can't be trace
+    # context headers.
+    return {key: value for key, value in carrier.items() if isinstance(value, str)}
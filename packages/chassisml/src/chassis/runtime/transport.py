@@ -0,0 +1,238 @@
+"""
+grpclib does not implement gRPC message compression, so Chassis compresses
+the values of the input and output maps instead. A client that wants this
+sends the encoding it used for its inputs in `COMPRESSION_METADATA_KEY` and
+the encoding it accepts for outputs in `ACCEPT_COMPRESSION_METADATA_KEY`. The
+server answers with the encoding it used for the outputs in its initial
+metadata. Clients that don't send these keys are never sent compressed data.
+The data of tensors is compressed the same way.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+import zlib
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, Type, Union
+
+from grpclib.const import Status
+from grpclib.encoding.proto import ProtoCodec
+from grpclib.exceptions import GRPCError
+
+from chassis.protos.v1.model_pb2 import Tensor
+from .tensors import check_declared, is_tensor, tensor_from_proto, tensor_to_proto
+
+COMPRESSION_METADATA_KEY = "chassis-encoding"
+ACCEPT_COMPRESSION_METADATA_KEY = "chassis-accept-encoding"
+
+GZIP = "gzip"
+DEFLATE = "deflate"
+SUPPORTED_COMPRESSION = (GZIP, DEFLATE)
+
+# Makes zlib read and write gzip headers and trailers.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+_SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(size: Union[str, int, None]) -> Optional[int]:
+    """
+    Parses a size in bytes.
+
+    Args:
+        size: Either an integer number of bytes or a string with an integer
+            followed by an optional unit (e.g. "512K", "64M", "1G").
+
+    Returns:
+        The size in bytes, or `None` if `size` is `None` or empty.
+    """
+    if size is None:
+        return None
+    if isinstance(size, int):
+        return size
+    size = size.strip().upper()
+    if len(size) == 0:
+        return None
+    if size.endswith("B"):
+        size = size[:-1]
+    unit = _SIZE_UNITS.get(size[-1:])
+    if unit is not None:
+        return int(float(size[:-1]) * unit)
+    return int(size)
+
+
+def getenv_size(name: str) -> Optional[int]:
+    """
+    Returns the size in bytes set in the environment variable `name`.
+    """
+    return parse_size(os.getenv(name))
+
+
+def validate_compression(compression: Optional[str]) -> Optional[str]:
+    """
+    Normalizes a compression name, raising `ValueError` if it isn't supported.
+    An empty string or "none" disables compression.
+    """
+    if compression is None:
+        return None
+    compression = compression.strip().lower()
+    if compression in ("", "none", "identity"):
+        return None
+    if compression not in SUPPORTED_COMPRESSION:
+        raise ValueError(f"Unsupported compression '{compression}'. Use one of {SUPPORTED_COMPRESSION}.")
+    return compression
+
+
+def compress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == GZIP:
+        return gzip.compress(data, compresslevel=6)
+    if compression == DEFLATE:
+        return zlib.compress(data, 6)
+    return data
+
+
+def decompress(data: bytes, compression: Optional[str], max_size: Optional[int] = None) -> bytes:
+    """
+    Decompresses `data`.
+
+    Args:
+        data: The compressed data.
+        compression: "gzip", "deflate" or `None` if `data` isn't compressed.
+        max_size: The largest size in bytes the data may decompress to.
+            `None` means unlimited.
+
+    Returns:
+        The decompressed data.
+
+    Raises:
+        GRPCError: With a `RESOURCE_EXHAUSTED` status if the data
+            decompresses to more than `max_size` bytes, or an
+            `INVALID_ARGUMENT` status if it isn't valid compressed data.
+    """
+    if compression not in SUPPORTED_COMPRESSION:
+        return data
+    # Decompress at most one byte more than allowed, so that a small input
+    # that expands to gigabytes is rejected without being expanded.
+    decompressor = zlib.decompressobj(_GZIP_WBITS if compression == GZIP else zlib.MAX_WBITS)
+    try:
+        result = decompressor.decompress(data, max_size + 1 if max_size is not None else 0)
+    except zlib.error as e:
+        raise GRPCError(Status.INVALID_ARGUMENT, f"Invalid {compression} data: {e}")
+    if max_size is not None and (len(result) > max_size or decompressor.unconsumed_tail):
+        raise GRPCError(
+            Status.RESOURCE_EXHAUSTED,
+            f"Decompressed value larger than max ({max_size})",
+        )
+    if not decompressor.eof:
+        raise GRPCError(Status.INVALID_ARGUMENT, f"Truncated {compression} data")
+    return result
+
+
+def compress_mapping(data: Mapping[str, bytes], compression: Optional[str]) -> Dict[str, bytes]:
+    """
+    Compresses every value of an input or output mapping.
+    """
+    return {k: compress(v, compression) for k, v in data.items()}
+
+
+def decompress_mapping(data: Mapping[str, bytes], compression: Optional[str],
+                       max_size: Optional[int] = None) -> Dict[str, bytes]:
+    """
+    Decompresses every value of an input or output mapping. See
+    [decompress][chassis.runtime.transport.decompress].
+    """
+    return {k: decompress(v, compression, max_size) for k, v in data.items()}
+
+
+def encode_item(data: Mapping[str, Any], compression: Optional[str]) -> Tuple[Dict[str, bytes], Dict[str, Tensor]]:
+    """
+    Splits an input or output mapping into the values sent as bytes and the
+    numpy arrays sent as tensors, compressing both.
+
+    Returns:
+        The bytes values and the tensors, to be set as the two maps of an
+        `InputItem` or `OutputItem`.
+    """
+    values: Dict[str, bytes] = {}
+    tensors: Dict[str, Tensor] = {}
+    for k, v in data.items():
+        if is_tensor(v):
+            tensor = tensor_to_proto(v)
+            if compression is not None:
+                tensor.data = compress(tensor.data, compression)
+            tensors[k] = tensor
+        else:
+            values[k] = compress(v, compression)
+    return values, tensors
+
+
+def decode_item(values: Mapping[str, bytes], tensors: Mapping[str, Tensor],
+                compression: Optional[str], max_size: Optional[int] = None,
+                declared: Optional[Mapping[str, Tuple[str, Sequence[int]]]] = None) -> Dict[str, Any]:
+    """
+    Merges the bytes values and tensors of an `InputItem` or `OutputItem`
+    into a single mapping, decompressing both. Tensors are decoded into
+    read-only numpy arrays.
+
+    Args:
+        values: The bytes values.
+        tensors: The tensors.
+        compression: The compression of the values and the tensors' data.
+        max_size: The largest size in bytes each value or tensor may
+            decompress to. `None` means unlimited.
+        declared: The dtype and shape declared for each tensor, by name.
+            Tensors that are declared are checked against them.
+
+    Raises:
+        GRPCError: With an `INVALID_ARGUMENT` status if a tensor's data
+            doesn't match its dtype and shape, or the tensor doesn't match
+            its declaration.
+    """
+    data: Dict[str, Any] = decompress_mapping(values, compression, max_size)
+    for k, tensor in tensors.items():
+        tensor_data = tensor.data if compression is None else decompress(tensor.data, compression, max_size)
+        try:
+            data[k] = tensor_from_proto(tensor, tensor_data)
+            if declared is not None and k in declared:
+                check_declared(data[k], *declared[k])
+        except ValueError as e:
+            raise GRPCError(Status.INVALID_ARGUMENT, f"Invalid tensor '{k}': {e}")
+    return data
+
+
+class SizeLimitedProtoCodec(ProtoCodec):
+    """
+    A protobuf codec for grpclib that rejects messages larger than the
+    configured limits with a `RESOURCE_EXHAUSTED` status, like the message
+    size limits of other gRPC implementations.
+    """
+
+    def __init__(self, max_send_message_size: Optional[int] = None,
+                 max_receive_message_size: Optional[int] = None):
+        """
+        Init.
+
+        Args:
+            max_send_message_size: The largest message in bytes that may be
+                sent. `None` means unlimited.
+            max_receive_message_size: The largest message in bytes that may be
+                received. `None` means unlimited.
+        """
+        self.max_send_message_size = max_send_message_size
+        self.max_receive_message_size = max_receive_message_size
+
+    def encode(self, message, message_type: Type) -> bytes:
+        data = super().encode(message, message_type)
+        if self.max_send_message_size is not None and len(data) > self.max_send_message_size:
+            raise GRPCError(
+                Status.RESOURCE_EXHAUSTED,
+                f"Sent message larger than max ({len(data)} vs. {self.max_send_message_size})",
+            )
+        return data
+
+    def decode(self, data: bytes, message_type: Type):
+        if self.max_receive_message_size is not None and len(data) > self.max_receive_message_size:
+            raise GRPCError(
+                Status.RESOURCE_EXHAUSTED,
+                f"Received message larger than max ({len(data)} vs. {self.max_receive_message_size})",
+            )
+        return super().decode(data, message_type)
@@ -1,25 +1,62 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import os
 import sys
-from typing import Dict, Optional, Union
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
 from uuid import uuid4
 import kserve
 from kserve import InferRequest, InferResponse
+from kserve.errors import InferenceError, InvalidInput
 from kserve.protocol.grpc.grpc_predict_v2_pb2 import ModelInferRequest
 
 from chassis.protos.v1.model_pb2 import StatusResponse
-from chassis.runtime import ModelRunner, PACKAGE_DATA_PATH
+from chassis.runtime import ModelRunner, PACKAGE_DATA_PATH, metrics, tracing
+from chassis.runtime.model_runner import is_error_output
+from chassis.runtime.singleflight import SingleFlight
+from chassis.runtime.tensors import is_tensor
 
 
 class KServe(kserve.Model):
-    def __init__(self, name: str, protocol: str):
+    """
+    Serves the model with the KServe v1 or v2 protocol.
+
+    Each instance is passed to the model as the base64-decoded bytes of its
+    first declared input. Tensor inputs aren't supported: requests to models
+    whose input is declared as a tensor are rejected as invalid. Serve those
+    models with the OMI server instead. Tensor outputs are returned as nested
+    lists.
+
+    With input deduplication, inferences run on a worker thread, one at a
+    time as without it, so that identical instances of requests that arrive
+    meanwhile can share them.
+    """
+
+    def __init__(self, name: str, protocol: str, single_flight: Optional[SingleFlight] = None):
+        """
+        Init.
+
+        Args:
+            name: The name of the model.
+            protocol: The KServe protocol to serve, "v1" or "v2".
+            single_flight: Deduplicates identical instances of concurrent
+                requests so that they share one inference. Defaults to
+                deduplicating if the `CHASSIS_DEDUPLICATE_INPUTS` environment
+                variable is "true".
+        """
         super().__init__(name)
         self.name = name
         self.protocol = protocol
         self.ready = False
         self.model: Optional[ModelRunner] = None
+        self.single_flight = single_flight if single_flight is not None else SingleFlight.from_env()
+        self._inference_thread: Optional[ThreadPoolExecutor] = None
+        if self.single_flight is not None:
+            self._inference_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chassis-kserve")
+        metrics.export_server_metrics(lambda: self.model, self.single_flight)
 
         with open(os.path.join(PACKAGE_DATA_PATH, "model_info"), "rb") as f:
             data = f.read()
@@ -30,30 +67,67 @@ class KServe(kserve.Model):
 
     def load(self) -> bool:
         self.model = ModelRunner.load()
+        if self.model is not None:
+            self.model.warmup()
         self.ready = self.model is not None
         return self.ready
 
-    def predict(self, payload: Union[Dict, InferRequest, ModelInferRequest],
-                headers: Optional[Dict[str, str]] = None) -> Union[Dict, InferResponse]:
-        if self.protocol == "v1":
-            return self._predictv1(payload, headers)
-        elif self.protocol == "v2":
-            return self._predictv2(payload, headers)
-        raise ValueError("Unsupported protocol version")
-
-    def _predictv1(self, payload: Union[Dict, InferRequest, ModelInferRequest],
-                   headers: Optional[Dict[str, str]] = None) -> Union[Dict, InferResponse]:
+    async def predict(self, payload: Union[Dict, InferRequest, ModelInferRequest],
+                      headers: Optional[Dict[str, str]] = None) -> Union[Dict, InferResponse]:
+        start = time.perf_counter()
+        try:
+            with tracing.start_span("KServe.predict", kind=tracing.SPAN_KIND_SERVER, carrier=headers):
+                if self.protocol == "v1":
+                    return await self._predictv1(payload, headers)
+                elif self.protocol == "v2":
+                    return await self._predictv2(payload, headers)
+                raise ValueError("Unsupported protocol version")
+        except Exception:
+            metrics.ERRORS.inc(kind="request")
+            raise
+        finally:
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - start)
+
+    async def _predict(self, instances: Sequence[Mapping[str, Any]]) -> Sequence[Mapping[str, Any]]:
+        metrics.observe_sizes(metrics.INPUT_BYTES, instances)
+        outputs: Sequence[Mapping[str, Any]]
+        if self.single_flight is not None:
+            outputs = await self.single_flight.run(instances, self._run_inference)
+        else:
+            outputs = self._run_model(instances)
+        metrics.observe_outputs(outputs)
+        return outputs
+
+    async def _run_inference(self, instances: List[Mapping[str, Any]]) -> Sequence[Mapping[str, Any]]:
+        return await asyncio.get_running_loop().run_in_executor(self._inference_thread, self._run_model, instances)
+
+    def _run_model(self, instances: Sequence[Mapping[str, Any]]) -> Sequence[Mapping[str, Any]]:
+        if self.model is None:
+            raise RuntimeError("Model not available")
+        return self.model.predict(instances)
+
+    def _input_key(self) -> str:
+        model_input = self.metadata.inputs[0]
+        if model_input.dtype:
+            raise InvalidInput(
+                f"Input '{model_input.filename}' is a tensor, which the KServe server doesn't support. "
+                f"Use the OMI server instead."
+            )
+        return model_input.filename
+
+    async def _predictv1(self, payload: Union[Dict, InferRequest, ModelInferRequest],
+                         headers: Optional[Dict[str, str]] = None) -> Union[Dict, InferResponse]:
         if self.model is None:
             raise RuntimeError("Model not available")
-        input_key: str = self.metadata.inputs[0].filename
+        input_key = self._input_key()
         output_key: str = self.metadata.outputs[0].filename
         instances = [{input_key: base64.b64decode(instance)} for instance in payload["instances"]]
-        outputs = self.model.predict(instances)
-        predictions = [o[output_key].decode() for o in outputs]
+        outputs = await self._predict(instances)
+        predictions = _predictions(outputs, output_key)
         return {"predictions": predictions}
 
-    def _predictv2(self, payload: Union[Dict, InferRequest, ModelInferRequest],
-                   headers: Optional[Dict[str, str]] = None) -> Union[Dict, InferResponse]:
+    async def _predictv2(self, payload: Union[Dict, InferRequest, ModelInferRequest],
+                         headers: Optional[Dict[str, str]] = None) -> Union[Dict, InferResponse]:
         if self.model is None:
             raise RuntimeError("Model not available")
         output_data = {
@@ -63,13 +137,13 @@ class KServe(kserve.Model):
             "outputs": [],
         }
 
-        input_key = self.metadata.inputs[0].filename
+        input_key = self._input_key()
         output_key = self.metadata.outputs[0].filename
         for inputs in payload.get("inputs", []):
             input_data = inputs.get("data", [])
             instances = [{input_key: base64.b64decode(instance)} for instance in input_data]
-            outputs = self.model.predict(instances)
-            predictions = [o[output_key].decode() for o in outputs]
+            outputs = await self._predict(instances)
+            predictions = _predictions(outputs, output_key)
             prediction_data_len = len(predictions)
             prediction_output_data = {
                 "data": predictions,
@@ -83,6 +157,21 @@ class KServe(kserve.Model):
         return output_data
 
 
+def _predictions(outputs: Sequence[Mapping[str, Any]], output_key: str) -> List[Any]:
+    """
+    Returns the prediction of each output, or fails the request with a 500
+    error naming the instances the model failed on, since the KServe
+    protocols can't report errors for individual instances.
+
+    Bytes outputs are decoded to strings and tensor outputs are converted to
+    nested lists.
+    """
+    errors = [f"instance {i}: {o['error'].decode()}" for i, o in enumerate(outputs) if is_error_output(o)]
+    if errors:
+        raise InferenceError(f"The model failed on {len(errors)} of {len(outputs)} instances ({'; '.join(errors)})")
+    return [o[output_key].tolist() if is_tensor(o[output_key]) else o[output_key].decode() for o in outputs]
+
+
 def serve():
     env = {
         "HTTP_PORT": os.getenv("HTTP_PORT", "45000"),
@@ -103,6 +192,11 @@ def serve():
     )
     model.load()
 
+    metrics_port = metrics.get_metrics_port()
+    if metrics_port is not None:
+        metrics.start_metrics_server(metrics_port)
+        print(f"Serving metrics on :{metrics_port}/metrics")
+
     kserve.ModelServer(
         http_port=int(env.get("HTTP_PORT")),
         enable_docs_url=True,
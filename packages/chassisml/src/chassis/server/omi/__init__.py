@@ -1,4 +1,4 @@
-from .server import serve
+from .server import serve, start
 
 REQUIREMENTS = [
     "grpclib",
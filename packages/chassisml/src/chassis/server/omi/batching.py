@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Mapping, Optional, Sequence
+
+from chassis.runtime import metrics
+
+PredictCallable = Callable[[List[Mapping[str, bytes]]], Awaitable[Sequence[Mapping[str, bytes]]]]
+
+
+class _PendingRun:
+    def __init__(self, inputs: Sequence[Mapping[str, bytes]], future: asyncio.Future):
+        self.inputs = inputs
+        self.future = future
+        self.submitted = time.perf_counter()
+
+
+class DynamicBatcher:
+    """
+    Coalesces the inputs of concurrent `Run` calls into shared calls to the
+    model.
+
+    Each call to `submit` queues its inputs and waits. A single background
+    task collects queued inputs until either `max_batch_size` inputs are
+    waiting or `max_wait_ms` milliseconds have passed since the first of them
+    arrived, sends all of them to the model in one call, and then hands each
+    caller back the slice of outputs that corresponds to its own inputs.
+
+    Inputs from a single call are never split across model calls, so a call
+    that is larger than `max_batch_size` is dispatched on its own and the
+    model runner is left to split it into batches.
+    """
+
+    def __init__(self, predict: PredictCallable, max_batch_size: int, max_wait_ms: float):
+        """
+        Init.
+
+        Args:
+            predict: Coroutine function that performs inference on a list of
+                inputs and returns one output per input.
+            max_batch_size: The number of inputs at which a batch is
+                dispatched without waiting any longer.
+            max_wait_ms: The maximum time in milliseconds that the first
+                queued input waits for other inputs to arrive.
+        """
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._predict = predict
+        self._pending: Deque[_PendingRun] = deque()
+        self._pending_size = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, inputs: Sequence[Mapping[str, bytes]]) -> Sequence[Mapping[str, bytes]]:
+        """
+        Queues `inputs` for inference and waits for their outputs.
+
+        Args:
+            inputs: The inputs of a single `Run` call.
+
+        Returns:
+            One output per input, in the same order as `inputs`.
+        """
+        if len(inputs) == 0:
+            return []
+        loop = asyncio.get_running_loop()
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        self._pending.append(_PendingRun(inputs, future))
+        self._pending_size += len(inputs)
+        self._wakeup.set()
+        return await future
+
+    async def close(self):
+        """
+        Stops the background task. Any inputs still queued are failed.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._pending:
+            pending = self._pending.popleft()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Batcher closed"))
+        self._pending_size = 0
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        wakeup = self._wakeup
+        while True:
+            await wakeup.wait()
+            deadline = loop.time() + self.max_wait
+            while self._pending_size < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            group = self._take_group()
+            if len(self._pending) == 0:
+                wakeup.clear()
+            else:
+                wakeup.set()
+            await self._dispatch(group)
+
+    def _take_group(self) -> List[_PendingRun]:
+        group: List[_PendingRun] = []
+        size = 0
+        while self._pending:
+            n = len(self._pending[0].inputs)
+            # Leave the next call queued if it would overflow the batch,
+            # unless the group is empty in which case it goes on its own.
+            if len(group) > 0 and size + n > self.max_batch_size:
+                break
+            group.append(self._pending.popleft())
+            size += n
+            self._pending_size -= n
+        return group
+
+    async def _dispatch(self, group: List[_PendingRun]):
+        # Skip callers that went away while they were waiting in the queue.
+        group = [p for p in group if not p.future.done()]
+        if len(group) == 0:
+            return
+        inputs = [i for p in group for i in p.inputs]
+        now = time.perf_counter()
+        for p in group:
+            metrics.QUEUE_WAIT_SECONDS.observe(now - p.submitted, queue="batcher")
+        try:
+            outputs = await self._predict(inputs)
+            if len(outputs) != len(inputs):
+                raise RuntimeError(f"Model returned {len(outputs)} outputs for {len(inputs)} inputs")
+        except Exception as e:
+            for p in group:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+        offset = 0
+        for p in group:
+            n = len(p.inputs)
+            if not p.future.done():
+                p.future.set_result(outputs[offset:offset + n])
+            offset += n
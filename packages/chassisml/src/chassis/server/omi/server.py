@@ -4,10 +4,15 @@ import asyncio
 import logging
 import os
 import signal
+import sys
+import threading
 import traceback
 from time import time as t
-from typing import Mapping, Optional, Union
+from typing import Any, List, Mapping, Optional, Sequence, Tuple, Union
 
+from grpclib.const import Status as GRPCStatus
+from grpclib.exceptions import GRPCError
+from grpclib.health.check import ServiceStatus
 from grpclib.health.service import Health
 from grpclib.reflection.service import ServerReflection
 from grpclib.server import Server, Stream
@@ -15,15 +20,34 @@ from grpclib.utils import graceful_exit
 
 from chassis.protos.v1.model_grpc import ModzyModelBase
 from chassis.protos.v1.model_pb2 import (
+    InputItem,
     OutputItem,
     RunRequest,
     RunResponse,
     ShutdownResponse,
     StatusResponse,
 )
-from chassis.runtime import ModelRunner, PACKAGE_DATA_PATH
+from chassis.runtime import InferenceExecutor, ModelRunner, PACKAGE_DATA_PATH, metrics, tracing
+from chassis.runtime.model_runner import is_error_output
+from chassis.runtime.singleflight import SingleFlight
+from chassis.runtime.tensors import is_tensor, tensor_to_proto
+from chassis.runtime.timings import (STAGE_DECODE, STAGE_PREDICT, STAGE_RESPONSE,
+                                     TIMINGS_METADATA_KEY, StageTimings)
+from chassis.runtime.transport import (
+    ACCEPT_COMPRESSION_METADATA_KEY,
+    COMPRESSION_METADATA_KEY,
+    SUPPORTED_COMPRESSION,
+    SizeLimitedProtoCodec,
+    compress,
+    decode_item,
+    getenv_size,
+    validate_compression,
+)
+from .batching import DynamicBatcher
+from .workers import run_workers
 
 GRPC_SERVER_PORT = 45000
+DEFAULT_BATCH_WAIT_MS = 5.0
 
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
@@ -37,8 +61,54 @@ def log_stack_trace():
 
 
 class ModzyModel(ModzyModelBase):
-    def __init__(self) -> None:
-        self.model: Optional[ModelRunner] = None
+    def __init__(self, dynamic_batching: Optional[bool] = None,
+                 max_batch_wait_ms: Optional[float] = None,
+                 executor: Optional[InferenceExecutor] = None,
+                 model: Optional[ModelRunner] = None,
+                 compression: Optional[Sequence[str]] = None,
+                 single_flight: Optional[SingleFlight] = None) -> None:
+        """
+        Init.
+
+        Args:
+            dynamic_batching: If `True`, the inputs of concurrent `Run` calls
+                are coalesced into shared batches of up to the model's batch
+                size. Defaults to the `CHASSIS_DYNAMIC_BATCHING` environment
+                variable.
+            max_batch_wait_ms: The maximum time in milliseconds an input waits
+                for other inputs to fill its batch. Defaults to the
+                `CHASSIS_BATCH_WAIT_MS` environment variable or 5ms.
+            executor: The executor that inferences run on so that they don't
+                block the event loop. Defaults to an executor configured by
+                the `CHASSIS_INFERENCE_EXECUTOR` and `CHASSIS_INFERENCE_WORKERS`
+                environment variables.
+            model: An already loaded model. If not supplied, the model is
+                loaded on the first call to `Status` or `load`.
+            compression: The compression algorithms ("gzip", "deflate") the
+                server may use to compress outputs for clients that accept
+                them. Defaults to the comma-separated `CHASSIS_COMPRESSION`
+                environment variable, or both algorithms if it isn't set.
+            single_flight: Deduplicates identical inputs of concurrent `Run`
+                calls so that they share one inference. Defaults to
+                deduplicating if the `CHASSIS_DEDUPLICATE_INPUTS` environment
+                variable is "true".
+        """
+        self.model: Optional[ModelRunner] = model
+        # Reported through the `Health` service when the model is loaded
+        # eagerly. `True` once the model is ready to serve inferences.
+        self.health = ServiceStatus()
+        self.health.set(model is not None)
+        self._loading: Optional[asyncio.Task] = None
+        self._load_lock = threading.Lock()
+        if compression is None:
+            compression = get_compression()
+        self.compression = [c for c in (validate_compression(c) for c in compression) if c is not None]
+        self.executor = executor if executor is not None else InferenceExecutor.from_env()
+        self.single_flight = single_flight if single_flight is not None else SingleFlight.from_env()
+        # Compressed inputs may not decompress to more than the largest
+        # message the server accepts.
+        self.max_input_size = getenv_size("CHASSIS_MAX_RECEIVE_MESSAGE_SIZE")
+        metrics.export_server_metrics(lambda: self.model, self.single_flight)
 
         with open(os.path.join(PACKAGE_DATA_PATH, "model_info"), "rb") as f:
             data = f.read()
@@ -46,6 +116,20 @@ class ModzyModel(ModzyModelBase):
         sr = StatusResponse()
         sr.ParseFromString(data)
         self.metadata = sr
+        # Tensor inputs are checked against their declared dtype and shape.
+        self._declared_tensors = {i.filename: (i.dtype, list(i.shape)) for i in sr.inputs if i.dtype}
+
+        if dynamic_batching is None:
+            dynamic_batching = get_dynamic_batching()
+        if max_batch_wait_ms is None:
+            max_batch_wait_ms = get_batch_wait_ms()
+        self.batcher: Optional[DynamicBatcher] = None
+        if dynamic_batching and self.metadata.features.batch_size > 1:
+            self.batcher = DynamicBatcher(self._predict, self.metadata.features.batch_size, max_batch_wait_ms)
+            LOGGER.info(
+                f"Dynamic batching enabled with a batch size of {self.metadata.features.batch_size} "
+                f"and a maximum wait of {max_batch_wait_ms}ms"
+            )
 
     def _build_status_response(self, status_code: int, message: str) -> StatusResponse:
         status = "OK"
@@ -58,12 +142,59 @@ class ModzyModel(ModzyModelBase):
         sr.message = message
         return sr
 
+    def load(self) -> bool:
+        """
+        Loads and warms up the model if it hasn't been loaded yet.
+
+        Returns:
+            `True` if the model is loaded.
+        """
+        # A load that was abandoned may still be running in its thread.
+        with self._load_lock:
+            if self.model is None:
+                model = ModelRunner.load()
+                if model is not None:
+                    model.warmup()
+                self.model = model
+        return self.model is not None
+
+    def start_loading(self) -> asyncio.Task:
+        """
+        Starts loading the model in the background without blocking the
+        event loop. Concurrent callers share the same load.
+
+        Returns:
+            A task that resolves to `True` once the model is loaded.
+        """
+        if self._loading is None:
+            self._loading = asyncio.get_running_loop().create_task(self._load_in_background())
+        return self._loading
+
+    async def _load_in_background(self) -> bool:
+        loaded = False
+        try:
+            loaded = await asyncio.get_running_loop().run_in_executor(None, self.load)
+        except Exception:
+            log_stack_trace()
+        finally:
+            self.health.set(loaded)
+            if not loaded:
+                # Allow the next caller to retry, also if this load was
+                # cancelled.
+                self._loading = None
+        return loaded
+
+    async def _wait_for_model(self):
+        if self.model is None and self._loading is not None:
+            # The model is being loaded eagerly, so wait for it instead of failing.
+            await asyncio.shield(self._loading)
+
     async def Status(self, stream: Stream):
         _ = await stream.recv_message()
         start_status_call = t()
         if self.model is None:
-            self.model = ModelRunner.load()
-            if self.model is None:
+            # Callers that give up don't cancel the load.
+            if not await asyncio.shield(self.start_loading()):
                 # If there is a problem in loading the model, catch it and report the error
                 message = "Model Failed to Initialize."
                 log_stack_trace()
@@ -76,6 +207,8 @@ class ModzyModel(ModzyModelBase):
             # The model is treated as a singleton that cannot be reloaded. If the model has already been initialized,
             message = "Model Already Initialized."
             LOGGER.warning(message)
+            # The thread of a cancelled load may have finished it.
+            self.health.set(True)
             status_response = self._build_status_response(200, message)
         LOGGER.info(
             f"The model is {'not ' if self.model is None else ''}loaded.\n"
@@ -89,34 +222,83 @@ class ModzyModel(ModzyModelBase):
         LOGGER.info(f"Completed call to Status Route in {t() - start_status_call}")
         await stream.send_message(status_response)
 
+    def _negotiate_compression(self, stream: Stream) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns the compression used for the request's inputs and the
+        compression to use for its outputs.
+        """
+        try:
+            input_compression = validate_compression(_metadata_value(stream, COMPRESSION_METADATA_KEY))
+        except ValueError as e:
+            raise GRPCError(GRPCStatus.INVALID_ARGUMENT, f"{e}")
+        output_compression = None
+        for c in (_metadata_value(stream, ACCEPT_COMPRESSION_METADATA_KEY) or "").split(","):
+            c = c.strip().lower()
+            if c in self.compression:
+                output_compression = c
+                break
+        return input_compression, output_compression
+
+    async def _send_compression(self, stream: Stream, compression: Optional[str]):
+        if compression is not None:
+            await stream.send_initial_metadata(metadata={COMPRESSION_METADATA_KEY: compression})
+
     async def Run(self, stream: Stream):
+        # Continue the client's trace, if it sent one.
+        with tracing.start_span("ModzyModel.Run", kind=tracing.SPAN_KIND_SERVER, carrier=stream.metadata):
+            await self._run(stream)
+
+    async def _run(self, stream: Stream):
         request: RunRequest = await stream.recv_message()
         start_run_call = t()
+        input_compression, output_compression = self._negotiate_compression(stream)
         response = RunResponse()
         outputs = []
+        timings = StageTimings()
 
+        await self._wait_for_model()
         if self.model is None:
+            metrics.ERRORS.inc(kind="request")
             # If the model has not been initialized, every input in the batch produces an error
             for _ in request.inputs:
                 output_item = create_output_item(
                     "Failed to process model input. Model has not been initialized for inference."
                 )
                 response.outputs.append(output_item)
-            return response
+            await stream.send_message(response)
+            return
         else:
             try:
                 input_length = len(request.inputs)
-                raw_outputs = self.model.predict([input_item.input for input_item in
-                                                  request.inputs])
-                for i, raw_output in enumerate(raw_outputs):
-                    # TODO: It would probably be useful to have an example of explanation/drift metadata here
-                    output_item = create_output_item(
-                        f"Processed item {i + 1} of {input_length}.", raw_output
-                    )
-                    outputs.append(output_item)
+                with timings.time(STAGE_DECODE):
+                    inputs = [
+                        self._decode(input_item, input_compression)
+                        for input_item in request.inputs
+                    ]
+                metrics.observe_sizes(metrics.INPUT_BYTES, inputs)
+                raw_outputs = await self._run_inputs(inputs, timings)
+                metrics.observe_outputs(raw_outputs)
+                with timings.time(STAGE_RESPONSE):
+                    for i, raw_output in enumerate(raw_outputs):
+                        # TODO: It would probably be useful to have an example of explanation/drift metadata here
+                        output_item = create_output_item(
+                            f"Processed item {i + 1} of {input_length}.", raw_output
+                        )
+                        outputs.append(output_item)
+            except GRPCError:
+                # Invalid inputs fail the whole request with their status.
+                metrics.ERRORS.inc(kind="request")
+                raise
             except Exception as e:
                 LOGGER.critical(f"Encountered a fatal error: {e}")
                 log_stack_trace()
+                metrics.ERRORS.inc(kind="request")
+                # Fail every input instead of returning no outputs at all so
+                # that the client can still match outputs to inputs.
+                outputs = [
+                    create_output_item(f"Failed to process model input: {e}")
+                    for _ in request.inputs
+                ]
 
         response = RunResponse(
             status_code=200,
@@ -126,11 +308,102 @@ class ModzyModel(ModzyModelBase):
         response.outputs.extend(outputs)
         num_inputs = len(request.inputs)
         run_route_time = t() - start_run_call
+        metrics.REQUEST_SECONDS.observe(run_route_time)
         LOGGER.info(
             f"Completed call to Run Route with {num_inputs} inputs in {run_route_time}. "
             f"Inputs per second: {num_inputs / run_route_time}"
         )
+        with timings.time(STAGE_RESPONSE):
+            compress_response(response, output_compression)
+        await self._send_compression(stream, output_compression)
         await stream.send_message(response)
+        await _send_timings(stream, timings)
+
+    async def RunStream(self, stream: Stream):
+        with tracing.start_span("ModzyModel.RunStream", kind=tracing.SPAN_KIND_SERVER, carrier=stream.metadata):
+            await self._run_stream(stream)
+
+    async def _run_stream(self, stream: Stream):
+        input_compression, output_compression = self._negotiate_compression(stream)
+        await self._send_compression(stream, output_compression)
+        # Timings are reported for all the requests of the stream together.
+        timings = StageTimings()
+        async for request in stream:
+            start_run_call = t()
+            input_length = len(request.inputs)
+            try:
+                with timings.time(STAGE_DECODE):
+                    inputs = [
+                        self._decode(input_item, input_compression)
+                        for input_item in request.inputs
+                    ]
+            except GRPCError:
+                # Invalid inputs fail the stream with their status.
+                metrics.ERRORS.inc(kind="request")
+                raise
+            metrics.observe_sizes(metrics.INPUT_BYTES, inputs)
+            processed = 0
+            try:
+                await self._wait_for_model()
+                if self.model is None:
+                    raise RuntimeError("Model has not been initialized for inference.")
+                async for raw_outputs in self.executor.predict_iter(self.model, inputs, timings):
+                    metrics.observe_outputs(raw_outputs)
+                    with timings.time(STAGE_RESPONSE):
+                        response = RunResponse(
+                            status_code=200,
+                            status="OK",
+                            message="Inference executed",
+                        )
+                        for raw_output in raw_outputs:
+                            processed += 1
+                            response.outputs.append(create_output_item(
+                                f"Processed item {processed} of {input_length}.", raw_output
+                            ))
+                        compress_response(response, output_compression)
+                    await stream.send_message(response)
+            except Exception as e:
+                LOGGER.critical(f"Encountered a fatal error: {e}")
+                log_stack_trace()
+                metrics.ERRORS.inc(kind="request")
+                # Fail the remaining inputs so that every input still gets
+                # exactly one output and the client can match them up.
+                response = RunResponse(
+                    status_code=500,
+                    status="Internal Server Error",
+                    message=f"{e}",
+                )
+                response.outputs.extend([
+                    create_output_item(f"Failed to process model input: {e}")
+                    for _ in range(input_length - processed)
+                ])
+                compress_response(response, output_compression)
+                await stream.send_message(response)
+            run_route_time = t() - start_run_call
+            metrics.REQUEST_SECONDS.observe(run_route_time)
+            LOGGER.info(f"Completed streamed request with {input_length} inputs in {run_route_time}.")
+        await _send_timings(stream, timings)
+
+    def _decode(self, input_item: InputItem, compression: Optional[str]) -> Mapping[str, Any]:
+        return decode_item(input_item.input, input_item.tensors, compression, self.max_input_size,
+                           self._declared_tensors)
+
+    async def _run_inputs(self, inputs: Sequence[Mapping[str, Any]], timings: StageTimings) -> Sequence[Mapping[str, Any]]:
+        if self.batcher is None and self.single_flight is None:
+            return await self._predict(inputs, timings)
+        # Inferences shared with other requests can't be broken down for
+        # this request, so the whole wait for them is timed as predict.
+        predict = self.batcher.submit if self.batcher is not None else self._predict
+        with timings.time(STAGE_PREDICT):
+            if self.single_flight is not None:
+                return await self.single_flight.run(inputs, predict)
+            return await predict(inputs)
+
+    async def _predict(self, inputs: Sequence[Mapping[str, Any]],
+                       timings: Optional[StageTimings] = None) -> Sequence[Mapping[str, Any]]:
+        if self.model is None:
+            raise RuntimeError("Model has not been initialized for inference.")
+        return await self.executor.predict(self.model, inputs, timings)
 
     async def Shutdown(self, stream: Stream):
         _ = await stream.recv_message()
@@ -140,6 +413,7 @@ class ModzyModel(ModzyModelBase):
             message="Model Shutdown Successfully.",
         )
         self.model = None
+        self.health.set(False)
         await stream.send_message(shutdown_response)
         # Currently there is a problem calling `close()` on the gRPC server object.
         # This is a much less graceful way to handle it but it works.
@@ -150,7 +424,21 @@ class ModzyModel(ModzyModelBase):
         os.kill(os.getpid(), signal.SIGTERM)
 
 
-def create_output_item(message, data: Optional[Mapping[str, bytes]] = None):
+def _metadata_value(stream: Stream, key: str) -> Optional[str]:
+    value = stream.metadata.get(key) if stream.metadata is not None else None
+    return value if isinstance(value, str) else None
+
+
+async def _send_timings(stream: Stream, timings: StageTimings):
+    """
+    Sends the timings of the request in the trailing metadata if the client
+    asked for them.
+    """
+    if (_metadata_value(stream, TIMINGS_METADATA_KEY) or "").lower() == "true":
+        await stream.send_trailing_metadata(metadata={TIMINGS_METADATA_KEY: timings.to_json()})
+
+
+def create_output_item(message, data: Optional[Mapping[str, Any]] = None):
     output_item = OutputItem()
     if data is None:
         # Deals with output items that encapsulate errors
@@ -163,29 +451,162 @@ def create_output_item(message, data: Optional[Mapping[str, bytes]] = None):
     else:
         LOGGER.info(message)
 
-        output_item.success = True
+        # The model reports inputs it failed on with an error output.
+        output_item.success = not is_error_output(data)
         for output_filename, file_contents in data.items():
-            output_item.output[output_filename] = file_contents
+            if is_tensor(file_contents):
+                output_item.tensors[output_filename].CopyFrom(tensor_to_proto(file_contents))
+            else:
+                output_item.output[output_filename] = file_contents
     return output_item
 
 
+def compress_response(response: RunResponse, compression: Optional[str]):
+    if compression is None:
+        return
+    for output_item in response.outputs:
+        for key, value in list(output_item.output.items()):
+            output_item.output[key] = compress(value, compression)
+        for tensor in output_item.tensors.values():
+            tensor.data = compress(tensor.data, compression)
+
+
 def get_server_port():
     return os.getenv("PSC_MODEL_PORT", default=GRPC_SERVER_PORT)
 
 
-async def serve():
-    services = [ModzyModel(), Health()]
-    services = ServerReflection.extend(services)
+def _getenv_bool(name: str, default: bool = False) -> bool:
+    return os.getenv(name, default=str(default)).lower() in ("1", "true", "yes")
+
+
+def get_dynamic_batching() -> bool:
+    return _getenv_bool("CHASSIS_DYNAMIC_BATCHING")
+
+
+def get_batch_wait_ms() -> float:
+    return float(os.getenv("CHASSIS_BATCH_WAIT_MS", default=DEFAULT_BATCH_WAIT_MS))
+
+
+def get_compression() -> List[str]:
+    return os.getenv("CHASSIS_COMPRESSION", default=",".join(SUPPORTED_COMPRESSION)).split(",")
+
+
+def get_codec() -> SizeLimitedProtoCodec:
+    """
+    Returns a codec that enforces the message size limits set in bytes (or
+    with a K, M or G suffix) by the `CHASSIS_MAX_SEND_MESSAGE_SIZE` and
+    `CHASSIS_MAX_RECEIVE_MESSAGE_SIZE` environment variables. Both are
+    unlimited by default. Compressed input values are also limited to
+    decompressing to `CHASSIS_MAX_RECEIVE_MESSAGE_SIZE` bytes.
+    """
+    return SizeLimitedProtoCodec(
+        max_send_message_size=getenv_size("CHASSIS_MAX_SEND_MESSAGE_SIZE"),
+        max_receive_message_size=getenv_size("CHASSIS_MAX_RECEIVE_MESSAGE_SIZE"),
+    )
+
+
+def get_eager_load() -> bool:
+    return _getenv_bool("CHASSIS_EAGER_LOAD")
+
 
-    # TODO - do we need to increase max message size?
-    server = Server(services)
+def get_num_workers(metadata: StatusResponse) -> int:
+    """
+    Returns the number of server processes to run.
+
+    Set `CHASSIS_OMI_WORKERS` to a number of workers, or to "auto" to run one
+    worker per CPU declared in the model's `num_cpus` metadata. Defaults to a
+    single process.
+    """
+    value = os.getenv("CHASSIS_OMI_WORKERS", default="1").lower()
+    if value == "auto":
+        num_cpus = int(metadata.resources.num_cpus)
+        return max(1, min(num_cpus, os.cpu_count() or num_cpus))
+    return max(1, int(value))
+
+
+def get_preload() -> bool:
+    return _getenv_bool("CHASSIS_OMI_PRELOAD")
+
+
+async def serve(reuse_port: bool = False, model: Optional[ModelRunner] = None,
+                eager_load: Optional[bool] = None, worker_id: int = 0):
+    """
+    Runs the OMI server in the current process until it is shut down.
+
+    By default, the model is loaded by the first call to `Status`. With
+    eager loading, the model starts loading in the background as soon as the
+    server is listening. Until it has loaded, the gRPC `Health` service
+    reports `NOT_SERVING` and `Run` calls wait for it, so readiness probes
+    can use the `Health` service and no request pays for loading the model.
+
+    Args:
+        reuse_port: Bind the server port with `SO_REUSEPORT` so that several
+            worker processes can accept connections on the same port.
+        model: An already loaded model to serve.
+        eager_load: Load the model at startup. Defaults to the
+            `CHASSIS_EAGER_LOAD` environment variable. Always enabled when
+            `reuse_port` is set, since any worker can receive the first `Run`
+            call.
+        worker_id: The index of the worker process. If `CHASSIS_METRICS_PORT`
+            is set, each worker serves its metrics on that port plus its
+            index, since metrics are collected per process.
+    """
+    if eager_load is None:
+        eager_load = get_eager_load()
+    eager_load = eager_load or reuse_port
+    omi_model = ModzyModel(model=model)
+    health = Health({omi_model: [omi_model.health]}) if eager_load else Health()
+    services = ServerReflection.extend([omi_model, health])
+
+    server = Server(services, codec=get_codec())
 
     server_port = get_server_port()
+    metrics_port = metrics.get_metrics_port()
+    if metrics_port is not None:
+        metrics.start_metrics_server(metrics_port + worker_id)
+        print(f"Serving metrics on :{metrics_port + worker_id}/metrics")
     with graceful_exit([server]):
-        await server.start("0.0.0.0", server_port)
+        await server.start("0.0.0.0", server_port, reuse_port=reuse_port or None)
         print(f"Serving on :{server_port}")
+        if eager_load:
+            omi_model.start_loading()
         await server.wait_closed()
+    omi_model.executor.shutdown()
+
+
+def start():
+    """
+    Starts the OMI server.
+
+    With more than one worker (see `get_num_workers`), the server pre-forks
+    one process per worker. Each worker binds the server port with
+    `SO_REUSEPORT`, so the kernel spreads incoming connections across them,
+    and loads the model after it is forked. Setting `CHASSIS_OMI_PRELOAD=true`
+    loads the model once before forking instead, so that workers share its
+    memory copy-on-write. Only preload models whose libraries are safe to use
+    after a fork (e.g. not CUDA).
+    """
+    with open(os.path.join(PACKAGE_DATA_PATH, "model_info"), "rb") as f:
+        metadata = StatusResponse.FromString(f.read())
+    num_workers = get_num_workers(metadata)
+    if num_workers == 1:
+        asyncio.run(serve())
+        return
+
+    model: Optional[ModelRunner] = None
+    if get_preload():
+        model = ModelRunner.load()
+        if model is None:
+            raise RuntimeError("Model Failed to Initialize.")
+        model.warmup()
+
+    def _serve_worker(worker_id: int):
+        asyncio.run(serve(reuse_port=True, model=model, worker_id=worker_id))
+
+    exit_code = run_workers(num_workers, _serve_worker)
+    if exit_code != 0:
+        sys.exit(exit_code)
 
 
 if __name__ == "__main__":
-    asyncio.run(serve())
+    start()
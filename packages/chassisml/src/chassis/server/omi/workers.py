@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import sys
+from typing import Any, Callable, List, Mapping
+
+LOGGER = logging.getLogger(__name__)
+
+# Workers stopped by these signals exited cleanly, whether they were killed
+# by the signal or handled it and exited with 128 plus its number (e.g. the
+# second stage of grpclib's `graceful_exit`).
+_STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+def run_workers(num_workers: int, target: Callable[[int], None]) -> int:
+    """
+    Forks `num_workers` child processes that each call `target` with their
+    worker index, then supervises them until they exit.
+
+    `SIGTERM` and `SIGINT` received by the parent are forwarded to every
+    worker. If any worker exits, the remaining workers are terminated as
+    well so that the container exits and can be restarted by its
+    orchestrator instead of silently running at reduced capacity. Workers
+    stopped by `SIGTERM` or `SIGINT`, e.g. by `docker stop` or the
+    `Shutdown` RPC, count as a clean exit.
+
+    Args:
+        num_workers: The number of worker processes to fork.
+        target: The function each worker runs. It receives the worker index.
+
+    Returns:
+        The exit code the parent process should exit with.
+    """
+    pids: List[int] = []
+    stopping = False
+
+    def _forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        _signal_all(pids, signum)
+
+    handlers = {signum: signal.signal(signum, _forward) for signum in _STOP_SIGNALS}
+    try:
+        # Signals received while forking are delivered once every worker's
+        # pid is known, so that they are forwarded to all of them.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _STOP_SIGNALS)
+        try:
+            for worker_id in range(num_workers):
+                pids.append(_fork_worker(worker_id, target, handlers))
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+        LOGGER.info(f"Started {num_workers} workers: {pids}")
+        return _supervise(pids, lambda: stopping)
+    finally:
+        _restore_handlers(handlers)
+
+
+def _supervise(pids: List[int], stopping: Callable[[], bool]) -> int:
+    exit_code = 0
+    stopped = False
+    while pids:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in pids:
+            continue
+        pids.remove(pid)
+        code = _exit_code(status)
+        LOGGER.info(f"Worker {pid} exited with code {code}")
+        if stopped or stopping():
+            continue
+        if not _is_clean_exit(code):
+            exit_code = 1
+        # Take the remaining workers down with the first one to exit.
+        stopped = True
+        _signal_all(pids, signal.SIGTERM)
+    return exit_code
+
+
+def _exit_code(status: int) -> int:
+    # Like `os.waitstatus_to_exitcode`, which was added in Python 3.9.
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _is_clean_exit(code: int) -> bool:
+    return code == 0 or any(code in (-signum, 128 + signum) for signum in _STOP_SIGNALS)
+
+
+def _fork_worker(worker_id: int, target: Callable[[int], None], handlers: Mapping[signal.Signals, Any]) -> int:
+    pid = os.fork()
+    if pid != 0:
+        return pid
+    code = 0
+    try:
+        # Workers handle signals themselves instead of forwarding them.
+        _restore_handlers(handlers)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+        target(worker_id)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException as e:
+        print(f"Worker {worker_id} exited with an error: {e}", file=sys.stderr)
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _restore_handlers(handlers: Mapping[signal.Signals, Any]):
+    for signum, handler in handlers.items():
+        # `None` means the handler wasn't installed from Python.
+        signal.signal(signum, handler if handler is not None else signal.SIG_DFL)
+
+
+def _signal_all(pids: List[int], signum: int):
+    for pid in pids:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
@@ -3,13 +3,14 @@ from __future__ import annotations
 import _io
 import os
 import string
-from typing import List, Mapping, Optional, Sequence, Union
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
 
 from chassis.metadata import ModelMetadata
 from chassis.builder import BuildContext
 from chassis.builder import DockerBuilder
 from chassis.builder import Buildable, BuildOptions
-from chassis.runtime import ModelRunner, PYTHON_MODEL_KEY
+from chassis.runtime import ModelRunner, PYTHON_MODEL_KEY, PYTHON_WARMUP_KEY
+from chassis.runtime.benchmark import benchmark
 from chassis.ftypes import PredictFunction
 from .helpers import deprecated
 
@@ -26,7 +27,12 @@ class ChassisModel(Buildable):
     """
 
     def __init__(self, process_fn: PredictFunction, batch_size: int = 1,
-                 legacy_predict_fn: bool = False, chassis_client=None):
+                 legacy_predict_fn: bool = False, chassis_client=None,
+                 warmup_inputs: Optional[Sequence[Mapping[str, bytes]]] = None,
+                 warmup_fn: Optional[Callable[[], None]] = None,
+                 concurrency: int = 1, buffer_inputs: bool = False,
+                 adaptive_batching: bool = False,
+                 bucket_key: Optional[Callable[[Mapping[str, bytes]], Any]] = None):
         """
         Init.
 
@@ -37,16 +43,73 @@ class ChassisModel(Buildable):
                 If your model does not support batching, the default value is 1.
             legacy_predict_fn: For internal backwards-compatibility use only.
             chassis_client: For internal backwards-compatibility use only.
+            warmup_inputs: Inputs the model server runs through the model
+                before reporting that it is ready. See
+                [chassisml.ChassisModel.set_warmup][].
+            warmup_fn: A function the model server calls before reporting
+                that it is ready. See [chassisml.ChassisModel.set_warmup][].
+            concurrency: For models that don't support batching, the number
+                of inputs to perform inference on at the same time on a pool
+                of threads. Only set this above 1 if `process_fn` is
+                thread-safe and releases the GIL (e.g. numpy, onnxruntime or
+                torch operations).
+            buffer_inputs: If `True`, `process_fn` receives read-only
+                `memoryview`s of the input data instead of `bytes`, so that
+                functions that accept buffers (e.g. `np.frombuffer`) can read
+                large inputs without copying them.
+            adaptive_batching: For models that support batching, tune the
+                batch size at runtime (up to `batch_size`) based on measured
+                throughput and shrink it when a batch runs out of memory.
+            bucket_key: For models that support batching, a function that
+                returns the size of an input (e.g. the length of a text).
+                Inputs are sorted by size before they are split into batches
+                so that each batch needs less padding. Outputs are returned in
+                the original order.
         """
         super().__init__()
         self.runner = ModelRunner(process_fn, batch_size=batch_size,
-                                  is_legacy_fn=legacy_predict_fn)
+                                  is_legacy_fn=legacy_predict_fn,
+                                  concurrency=concurrency,
+                                  buffer_inputs=buffer_inputs,
+                                  adaptive_batching=adaptive_batching,
+                                  bucket_key=bucket_key)
         self.python_modules[PYTHON_MODEL_KEY] = self.runner
+        self.set_warmup(warmup_inputs, warmup_fn)
         if legacy_predict_fn:
             self.metadata = ModelMetadata.legacy()
         if chassis_client is not None:
             self.chassis_client = chassis_client
 
+    def set_warmup(self, inputs: Optional[Sequence[Mapping[str, bytes]]] = None,
+                   fn: Optional[Callable[[], None]] = None):
+        """
+        Declares how the model should be warmed up in the container.
+
+        Many models (e.g. torch or transformers models) are much slower on
+        their first inference because of lazy initialization. The model
+        servers call `fn` and then run `inputs` through the model after it is
+        loaded but before reporting that it is ready, so that the first real
+        requests are as fast as the rest.
+
+        The inputs and function are serialized into the build context next
+        to the model.
+
+        Args:
+            inputs: A batch of inputs in the same format as the inputs to
+                [chassisml.ChassisModel.test][].
+            fn: A function that takes no arguments.
+
+        Example:
+        ```python
+        chassis_model = ChassisModel(process_fn=predict)
+        chassis_model.set_warmup(inputs=[{"input": open("sample.jpg", "rb").read()}])
+        ```
+        """
+        if inputs is None and fn is None:
+            self.python_modules.pop(PYTHON_WARMUP_KEY, None)
+        else:
+            self.python_modules[PYTHON_WARMUP_KEY] = {"inputs": inputs, "fn": fn}
+
     def test(self, test_input: Union[str, bytes, _io.BufferedReader, Mapping[str, bytes], Sequence[Mapping[str, bytes]]]) -> Sequence[Mapping[str, bytes]]:
         """
         Runs a test inference against the model before it is packaged.
@@ -136,6 +199,64 @@ class ChassisModel(Buildable):
             print("Invalid input. Must be buffered reader, bytes, valid filepath, or text input.")
             return False
 
+    def benchmark(self, inputs: Sequence[Mapping[str, bytes]], iterations: int = 20,
+                  concurrency: Union[int, Sequence[int]] = 1, batch_sizes: Optional[Sequence[int]] = None,
+                  warmup: int = 1, trace_allocations: bool = True) -> Dict[str, Any]:
+        """
+        Measures the performance of the model in this process, before it is
+        packaged, for several batch sizes and numbers of threads.
+
+        Use this to choose the `batch_size` and `concurrency` to build the
+        model with. For each combination of a batch size in `batch_sizes`
+        and a number of threads in `concurrency`, the model's predict
+        function is run `warmup` times, and then `iterations` times from
+        that many threads at once, each time on a batch of `batch_size`
+        inputs taken in turn from `inputs`. For models that don't support
+        batching, the number of threads with the best throughput is the
+        `concurrency` to use. For models that do, it's the number of
+        requests the model can usefully handle at the same time.
+
+        Each result contains:
+
+        - `latency_seconds`: The mean, min, p50, p95, p99 and max time of a
+            call to predict.
+        - `throughput`: Predict calls and inputs per second.
+        - `errors`: The number of inputs the model failed on.
+        - `peak_rss_bytes`: The peak resident memory of this process so far.
+            It only goes up, so run the most memory hungry configuration
+            last or in a fresh process to compare memory use.
+        - `allocations`: Measured with `tracemalloc` on one extra predict
+            call: the peak Python memory it allocated and the number and
+            size of memory blocks it allocated and didn't free (e.g.
+            caches that grow with each request).
+
+        Args:
+            inputs: Inputs in the same format as the inputs to
+                [chassisml.ChassisModel.test][].
+            iterations: The number of predict calls to time per combination.
+            concurrency: The numbers of threads to try.
+            batch_sizes: The batch sizes to try. Defaults to the model's
+                batch size. Batch sizes above 1 require a model that
+                supports batching.
+            warmup: The number of untimed predict calls per combination.
+            trace_allocations: Whether to measure allocations.
+
+        Returns:
+            A dictionary with the list of `results`, one per combination,
+            and the `best` batch size and concurrency by inputs per second.
+
+        Example:
+        ```python
+        chassis_model = ChassisModel(process_fn=batch_predict, batch_size=32)
+        report = chassis_model.benchmark(sample_inputs, concurrency=[1, 2, 4], batch_sizes=[1, 8, 32])
+        print(report["best"])
+        ```
+        """
+        if isinstance(concurrency, int):
+            concurrency = [concurrency]
+        return benchmark(self.runner, inputs, iterations=iterations, concurrency=concurrency,
+                         batch_sizes=batch_sizes, warmup=warmup, trace_allocations=trace_allocations)
+
     def test_env(self, test_input_path, conda_env=None, fix_env=True):
         """
         **No Longer Available**
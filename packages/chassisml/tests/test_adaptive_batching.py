@@ -0,0 +1,83 @@
+from chassis.runtime import ModelRunner
+from chassis.runtime.adaptive import AdaptiveBatchSizer, is_out_of_memory
+
+
+def _run(sizer, seconds_for_size, batches):
+    for _ in range(batches):
+        sizer.record(sizer.size, seconds_for_size(sizer.size))
+
+
+def test_sizer_settles_on_the_fastest_size():
+    # Throughput peaks at a batch size of 8.
+    throughput = {1: 10, 2: 20, 4: 40, 8: 80, 16: 50, 32: 30}
+    sizer = AdaptiveBatchSizer(32, window=1, hold=100)
+    _run(sizer, lambda size: size / throughput[size], 10)
+    assert sizer.size == 8
+
+
+def test_sizer_stays_at_the_maximum_when_it_is_fastest():
+    sizer = AdaptiveBatchSizer(32, window=1, hold=100)
+    _run(sizer, lambda size: 1.0, 10)
+    assert sizer.size == 32
+
+
+def test_sizer_backs_off_and_respects_the_ceiling():
+    sizer = AdaptiveBatchSizer(32, window=1, hold=0)
+    sizer.backoff(32)
+    assert sizer.size == 16
+    _run(sizer, lambda size: 1.0, 10)
+    assert sizer.size <= 31
+
+
+def test_is_out_of_memory():
+    assert is_out_of_memory(MemoryError())
+    assert is_out_of_memory(RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB"))
+    assert not is_out_of_memory(ValueError("bad input"))
+
+
+def test_runner_retries_smaller_batches_after_running_out_of_memory():
+    def predict(inputs):
+        if len(inputs) > 2:
+            raise RuntimeError("CUDA out of memory")
+        return inputs
+
+    runner = ModelRunner(predict, batch_size=8, adaptive_batching=True)
+    inputs = [{"input": str(i).encode()} for i in range(10)]
+    assert runner.predict(inputs) == inputs
+    assert runner.effective_batch_size == 2
+
+
+def _run_with_memory(sizer, fits, batches):
+    """
+    Runs batches that run out of memory unless `fits(size)`, and returns
+    the sizes used and the number of batches that ran out of memory.
+    """
+    sizes = []
+    for _ in range(batches):
+        size = sizer.size
+        sizes.append(size)
+        if fits(size):
+            sizer.record(size, 1.0)
+        else:
+            sizer.backoff(size)
+    return sizes, sum(not fits(size) for size in sizes)
+
+
+def test_sizer_binary_searches_the_largest_size_that_fits():
+    sizer = AdaptiveBatchSizer(32, window=1, hold=100, recovery=1)
+    sizes, out_of_memory = _run_with_memory(sizer, lambda size: size <= 23, 6)
+    assert sizes == [32, 16, 24, 16, 20, 22]
+    assert out_of_memory == 2
+    assert sizer.size == 23
+    # The size that failed is probed again less and less often.
+    _, out_of_memory = _run_with_memory(sizer, lambda size: size <= 23, 200)
+    assert out_of_memory <= 8
+
+
+def test_sizer_recovers_from_a_transient_out_of_memory_error():
+    sizer = AdaptiveBatchSizer(32, window=1, hold=100, recovery=1)
+    sizer.backoff(32)
+    assert sizer.size == 16
+    sizes, _ = _run_with_memory(sizer, lambda size: True, 5)
+    assert sizes == [16, 24, 28, 30, 31]
+    assert sizer.size == 32
@@ -0,0 +1,52 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from chassisml import ChassisModel
+from chassis.runtime import MMAP_MANIFEST_FILENAME, PACKAGE_DATA_PATH
+from chassis.runtime.artifacts import open_memmap, open_mmap, preload_mmap_files
+
+
+def test_open_memmap_of_npy_file_is_read_only(tmp_path):
+    weights = np.arange(12, dtype=np.float32).reshape(3, 4)
+    path = str(tmp_path / "weights.npy")
+    np.save(path, weights)
+    array = open_memmap(path)
+    assert array.dtype == np.float32
+    np.testing.assert_array_equal(array, weights)
+    with pytest.raises(ValueError):
+        array[0, 0] = 1
+    assert open_mmap(path) is open_mmap(path)
+
+
+def test_open_memmap_of_raw_file(tmp_path):
+    path = tmp_path / "weights.bin"
+    path.write_bytes(np.arange(6, dtype=np.int16).tobytes())
+    array = open_memmap(str(path), dtype=np.int16, shape=(2, 3))
+    np.testing.assert_array_equal(array, np.arange(6, dtype=np.int16).reshape(2, 3))
+
+
+def test_mmap_files_are_packaged_and_preloaded(tmp_path, monkeypatch, echo_predict_function):
+    path = tmp_path / "weights.npy"
+    np.save(str(path), np.ones(4))
+    model = ChassisModel(echo_predict_function)
+    model.metadata.model_name = "mmap"
+    model.metadata.model_version = "0.0.1"
+    model.metadata.add_input("input")
+    model.metadata.add_output("output")
+    model.add_mmap_files(str(path))
+    assert str(path) in model.additional_files
+    context = model.prepare_context()
+    try:
+        with open(os.path.join(context.data_dir, MMAP_MANIFEST_FILENAME)) as f:
+            assert json.load(f) == ["weights.npy"]
+        monkeypatch.chdir(context.base_dir)
+        assert preload_mmap_files() == ["weights.npy"]
+        # Inside the container, the local path resolves to the packaged file.
+        os.remove(path)
+        assert open_memmap(str(path)).sum() == 4
+        assert os.path.exists(os.path.join(PACKAGE_DATA_PATH, "weights.npy"))
+    finally:
+        context.cleanup()
@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from chassis.client.bench import benchmark, load_corpus
+from chassis.runtime.timings import summarize_latencies
+
+
+class FakeClient:
+    def __init__(self):
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def run(self, inputs):
+        self.batches.append([i["in"] for i in inputs])
+        if inputs[0]["in"] == b"fail":
+            raise RuntimeError("request failed")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return SimpleNamespace(outputs=[SimpleNamespace(success=i["in"] != b"bad") for i in inputs])
+
+
+def test_benchmark_report():
+    client = FakeClient()
+    corpus = [{"in": b"a"}, {"in": b"bad"}, {"in": b"fail"}]
+    report = asyncio.run(benchmark(client, corpus, requests=6, concurrency=3, batch_size=1, warmup=1))
+    # The warmup request takes the first input.
+    assert client.batches[0] == [b"a"]
+    assert len(client.batches) == 7
+    assert client.max_in_flight == 3
+    assert report["requests"] == 6
+    assert report["inputs"] == 6
+    errors = report["errors"]
+    assert errors.pop("latency_seconds")["max"] < 0.01
+    assert errors == {"requests": 2, "inputs": 2, "request_error_rate": 2 / 6, "input_error_rate": 2 / 6}
+    # Failed requests don't count towards the latencies.
+    assert 0.01 <= report["latency_seconds"]["min"] <= report["latency_seconds"]["max"]
+    assert report["throughput"]["requests_per_second"] > 0
+
+
+def test_benchmark_rate_and_batch_size():
+    client = FakeClient()
+    report = asyncio.run(benchmark(client, [{"in": b"a"}, {"in": b"b"}], requests=5, concurrency=2, rate=50,
+                                   batch_size=3))
+    assert client.batches[:2] == [[b"a", b"b", b"a"], [b"b", b"a", b"b"]]
+    assert report["inputs"] == 15
+    # Five requests at 50 per second are spread over at least 80ms.
+    assert report["duration_seconds"] >= 0.08
+
+
+def test_load_corpus(tmp_path):
+    (tmp_path / "images").mkdir()
+    for name in ["b.jpg", "a.jpg", "c.jpg"]:
+        (tmp_path / "images" / name).write_bytes(name.encode())
+    (tmp_path / "config.json").write_bytes(b"{}")
+    corpus = load_corpus({"image": str(tmp_path / "images"), "config": str(tmp_path / "config.json")})
+    assert corpus == [
+        {"image": b"a.jpg", "config": b"{}"},
+        {"image": b"b.jpg", "config": b"{}"},
+        {"image": b"c.jpg", "config": b"{}"},
+    ]
+    with pytest.raises(ValueError):
+        asyncio.run(benchmark(FakeClient(), []))
+
+
+def test_summarize_latencies():
+    summary = summarize_latencies([0.4, 0.1, 0.2, 0.3, 0.5])
+    assert summary["min"] == 0.1
+    assert summary["max"] == 0.5
+    assert summary["p50"] == 0.3
+    assert summary["p95"] == pytest.approx(0.48)
+    assert summary["mean"] == pytest.approx(0.3)
+    assert summarize_latencies([])["p99"] == 0.0
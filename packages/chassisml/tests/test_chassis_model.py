@@ -56,3 +56,28 @@ def test_each_model_instance_has_own_default_values(echo_predict_function):
     assert model2.metadata.has_inputs() is False
 
 # Verify that the fields in the metadata are updated based on the values provided during `prepare_context`.
+
+
+def test_benchmark_sweeps_batch_sizes_and_concurrency():
+    calls = []
+
+    def batch_predict(inputs):
+        calls.append(len(inputs))
+        return [{"out": i["in"] * 2} for i in inputs]
+
+    model = ChassisModel(batch_predict, batch_size=4)
+    report = model.benchmark([{"in": b"a"}, {"in": b"b"}], iterations=5, concurrency=[1, 2], batch_sizes=[1, 4])
+    results = report["results"]
+    assert [(r["batch_size"], r["concurrency"]) for r in results] == [(1, 1), (1, 2), (4, 1), (4, 2)]
+    for result in results:
+        assert result["iterations"] == 5
+        assert result["inputs"] == 5 * result["batch_size"]
+        assert result["errors"] == 0
+        assert 0 <= result["latency_seconds"]["p50"] <= result["latency_seconds"]["p99"]
+        assert result["allocations"]["peak_bytes"] >= 0
+    # Batch size 1 calls the batch predict function with one input at a time.
+    assert set(calls) == {1, 4}
+    assert (report["best"]["batch_size"], report["best"]["concurrency"]) in [(r["batch_size"], r["concurrency"]) for r in results]
+
+    with pytest.raises(ValueError):
+        ChassisModel(lambda i: i).benchmark([{"in": b"a"}], batch_sizes=[2])
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from chassis.server.omi.batching import DynamicBatcher
+
+
+def test_concurrent_calls_are_coalesced():
+    calls = []
+
+    async def predict(inputs):
+        calls.append(len(inputs))
+        return [{"out": i["in"] * 2} for i in inputs]
+
+    async def main():
+        batcher = DynamicBatcher(predict, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*[
+            batcher.submit([{"in": b"a" * n}, {"in": b"b" * n}]) for n in range(1, 5)
+        ])
+        await batcher.close()
+        return results
+
+    results = asyncio.run(main())
+    assert calls == [8]
+    for n, result in enumerate(results, start=1):
+        assert result == [{"out": b"a" * n * 2}, {"out": b"b" * n * 2}]
+
+
+def test_batch_is_dispatched_after_max_wait():
+    calls = []
+
+    async def predict(inputs):
+        calls.append(len(inputs))
+        return inputs
+
+    async def main():
+        batcher = DynamicBatcher(predict, max_batch_size=32, max_wait_ms=1)
+        result = await batcher.submit([{"in": b"1"}])
+        await batcher.close()
+        return result
+
+    assert asyncio.run(main()) == [{"in": b"1"}]
+    assert calls == [1]
+
+
+def test_calls_are_not_split_across_batches():
+    calls = []
+
+    async def predict(inputs):
+        calls.append(len(inputs))
+        return inputs
+
+    async def main():
+        batcher = DynamicBatcher(predict, max_batch_size=4, max_wait_ms=20)
+        await asyncio.gather(
+            batcher.submit([{}] * 3),
+            batcher.submit([{}] * 3),
+            batcher.submit([{}] * 6),
+        )
+        await batcher.close()
+
+    asyncio.run(main())
+    assert calls == [3, 3, 6]
+
+
+def test_errors_are_raised_in_every_caller():
+    async def predict(inputs):
+        raise ValueError("boom")
+
+    async def main():
+        batcher = DynamicBatcher(predict, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(
+            batcher.submit([{}]),
+            batcher.submit([{}]),
+            return_exceptions=True,
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from chassis.runtime import InferenceExecutor, ModelRunner, pickling
+from chassis.runtime.constants import PACKAGE_DATA_PATH, PYTHON_MODEL_KEY, python_pickle_filename_for_key
+from chassis.runtime.timings import STAGE_PREDICT, StageTimings
+
+
+def test_executor_from_env(monkeypatch):
+    monkeypatch.delenv("CHASSIS_INFERENCE_EXECUTOR", raising=False)
+    monkeypatch.delenv("CHASSIS_INFERENCE_WORKERS", raising=False)
+    executor = InferenceExecutor.from_env()
+    assert (executor.kind, executor.workers) == ("thread", 1)
+    executor.shutdown()
+
+    monkeypatch.setenv("CHASSIS_INFERENCE_EXECUTOR", "Process")
+    monkeypatch.setenv("CHASSIS_INFERENCE_WORKERS", "3")
+    executor = InferenceExecutor.from_env()
+    assert (executor.kind, executor.workers) == ("process", 3)
+    # Workers are spawned rather than forked from the server.
+    assert executor._executor._mp_context.get_start_method() == "spawn"
+    executor.shutdown()
+
+    monkeypatch.setenv("CHASSIS_INFERENCE_EXECUTOR", "fiber")
+    with pytest.raises(ValueError):
+        InferenceExecutor.from_env()
+
+
+def test_thread_executor_runs_inferences_concurrently_off_the_event_loop():
+    # Both inferences must be in flight at once to pass the barrier.
+    barrier = threading.Barrier(2, timeout=5)
+    threads = []
+
+    def predict(inputs):
+        threads.append(threading.current_thread().name)
+        barrier.wait()
+        return inputs
+
+    runner = ModelRunner(predict, batch_size=2)
+    executor = InferenceExecutor(workers=2)
+
+    async def scenario():
+        timings = StageTimings()
+        outputs = await asyncio.gather(
+            executor.predict(runner, [{"input": b"a"}], timings),
+            executor.predict(runner, [{"input": b"b"}]),
+        )
+        assert len(timings.stages[STAGE_PREDICT]) == 1
+        return outputs
+
+    assert asyncio.run(scenario()) == [[{"input": b"a"}], [{"input": b"b"}]]
+    assert all(name.startswith("chassis-inference") for name in threads)
+    executor.shutdown()
+
+
+def test_thread_executor_errors_reach_the_caller():
+    def predict(inputs, timings=None):
+        raise RuntimeError("worker failed")
+
+    executor = InferenceExecutor()
+    with pytest.raises(RuntimeError, match="worker failed"):
+        asyncio.run(executor.predict(SimpleNamespace(predict=predict), [{"input": b"a"}]))
+    executor.shutdown()
+
+
+def test_shutdown_waits_for_inferences_in_flight():
+    started = threading.Event()
+    release = threading.Event()
+
+    def predict(inputs):
+        started.set()
+        release.wait(5)
+        return inputs
+
+    runner = ModelRunner(predict, batch_size=2)
+    executor = InferenceExecutor()
+
+    async def scenario():
+        inference = asyncio.ensure_future(executor.predict(runner, [{"input": b"a"}]))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        threading.Timer(0.05, release.set).start()
+        await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+        assert release.is_set()
+        assert await inference == [{"input": b"a"}]
+        with pytest.raises(RuntimeError):
+            await executor.predict(runner, [{"input": b"b"}])
+
+    asyncio.run(scenario())
+
+
+def test_process_executor_uses_the_model_loaded_by_each_worker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir(PACKAGE_DATA_PATH)
+    runner = ModelRunner(lambda inputs: [{"pid": str(os.getpid()).encode()} for _ in inputs], batch_size=2)
+    with open(os.path.join(PACKAGE_DATA_PATH, python_pickle_filename_for_key(PYTHON_MODEL_KEY)), "wb") as f:
+        pickling.dump({PYTHON_MODEL_KEY: runner}, f)
+    executor = InferenceExecutor("process")
+
+    async def scenario():
+        timings = StageTimings()
+        outputs = await executor.predict(runner, [{"input": b"a"}], timings)
+        assert STAGE_PREDICT in timings.stages
+        return outputs
+
+    try:
+        outputs = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert outputs[0]["pid"] != str(os.getpid()).encode()
+
+
+def test_process_executor_reports_workers_without_a_model(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    executor = InferenceExecutor("process")
+    try:
+        with pytest.raises(RuntimeError, match="failed to initialize in worker"):
+            asyncio.run(executor.predict(ModelRunner(lambda inputs: inputs, batch_size=2), [{"input": b"a"}]))
+    finally:
+        executor.shutdown()
@@ -0,0 +1,72 @@
+import asyncio
+import base64
+
+import numpy as np
+import pytest
+
+from chassis.protos.v1.model_pb2 import ModelInput, ModelOutput, StatusResponse
+from chassis.runtime import ModelRunner
+from chassis.runtime.singleflight import SingleFlight
+
+kserve = pytest.importorskip("kserve")
+
+from kserve.errors import InferenceError  # noqa: E402
+
+from chassis.server.kserve.server import KServe  # noqa: E402
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    metadata = StatusResponse(inputs=[ModelInput(filename="input")], outputs=[ModelOutput(filename="results.json")])
+    (tmp_path / "data" / "model_info").write_bytes(metadata.SerializeToString())
+    monkeypatch.chdir(tmp_path)
+
+    def predict(inputs):
+        if any(i["input"] == b"bad" for i in inputs):
+            raise ValueError("bad input")
+        return [{"results.json": i["input"].upper()} for i in inputs]
+
+    server = KServe("model", "v1")
+    server.model = ModelRunner(predict, batch_size=4)
+    return server
+
+
+def _instances(*values):
+    return [base64.b64encode(v).decode() for v in values]
+
+
+def test_failed_instances_fail_the_request(server):
+    assert asyncio.run(server.predict({"instances": _instances(b"a", b"b")})) == {"predictions": ["A", "B"]}
+    with pytest.raises(InferenceError, match="1 of 3 instances .*instance 1: bad input"):
+        asyncio.run(server.predict({"instances": _instances(b"a", b"bad", b"c")}))
+    server.protocol = "v2"
+    with pytest.raises(InferenceError):
+        asyncio.run(server.predict({"inputs": [{"name": "input", "datatype": "BYTES", "data": _instances(b"bad")}]}))
+
+
+def test_concurrent_identical_instances_share_an_inference(server):
+    batches = []
+    predict_fn = server.model.predict_fn
+
+    def predict(inputs):
+        batches.append([i["input"] for i in inputs])
+        return predict_fn(inputs)
+
+    server = KServe("model", "v1", single_flight=SingleFlight())
+    server.model = ModelRunner(predict, batch_size=4)
+
+    async def scenario():
+        return await asyncio.gather(
+            server.predict({"instances": _instances(b"a", b"b")}),
+            server.predict({"instances": _instances(b"b", b"a", b"c")}),
+        )
+
+    assert asyncio.run(scenario()) == [{"predictions": ["A", "B"]}, {"predictions": ["B", "A", "C"]}]
+    assert batches == [[b"a", b"b"], [b"c"]]
+    assert server.single_flight.deduplicated == 2
+
+
+def test_tensor_outputs_are_returned_as_lists(server):
+    server.model = ModelRunner(lambda inputs: [{"results.json": np.full(2, len(i["input"]))} for i in inputs], batch_size=4)
+    assert asyncio.run(server.predict({"instances": _instances(b"a", b"bc")})) == {"predictions": [[1, 1], [2, 2]]}
@@ -0,0 +1,71 @@
+import urllib.request
+
+import pytest
+
+from chassis.runtime import ModelRunner, metrics
+from chassis.runtime.metrics import Counter, Histogram, start_metrics_server
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+
+
+def _collect(registry):
+    text = prometheus_client.generate_latest(registry).decode()
+    return {s.name: s for family in text_string_to_metric_families(text) for s in family.samples if "le" not in s.labels}
+
+
+def test_metrics_record_labelled_values():
+    registry = prometheus_client.CollectorRegistry()
+    latency = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), labelnames=("route",), registry=registry)
+    errors = Counter("errors_total", "Errors.", labelnames=("kind",), registry=registry)
+    latency.observe(0.05, route="a")
+    latency.observe(5, route="a")
+    errors.inc(kind="input")
+    errors.inc(2, kind="input")
+    assert latency.count(route="a") == 2
+    assert latency.count(route="b") == 0
+    samples = _collect(registry)
+    assert samples["latency_seconds_sum"].value == 5.05
+    assert samples["errors_total"].labels == {"kind": "input"}
+    assert samples["errors_total"].value == 3
+
+
+def test_metrics_do_nothing_without_prometheus_client(monkeypatch):
+    monkeypatch.setattr(metrics, "prometheus_client", None)
+    latency = Histogram("latency_seconds", "Latency.")
+    latency.observe(1.0)
+    Counter("errors_total", "Errors.").inc(kind="input")
+    assert latency.count() == 0
+    assert not metrics.is_enabled()
+    with pytest.raises(RuntimeError):
+        start_metrics_server(0)
+
+
+def test_server_metrics_report_the_current_model():
+    model = ModelRunner(lambda inputs: inputs, batch_size=4)
+    metrics.export_server_metrics(lambda: model)
+    assert _collect(metrics.REGISTRY)["chassis_effective_batch_size"].value == 4
+    metrics.export_server_metrics(lambda: None)
+    assert _collect(metrics.REGISTRY)["chassis_effective_batch_size"].value == 0
+
+
+def test_metrics_server():
+    registry = prometheus_client.CollectorRegistry()
+    Counter("requests_total", "Requests.", registry=registry).inc()
+    server = start_metrics_server(0, host="127.0.0.1", registry=registry)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.headers["Content-Type"] == prometheus_client.CONTENT_TYPE_LATEST
+            assert "requests_total 1.0" in response.read().decode().splitlines()
+    finally:
+        server.shutdown()
+
+
+def test_model_runner_records_batches():
+    runner = ModelRunner(lambda inputs: [{"out": i["in"]} for i in inputs], batch_size=4)
+    batches = metrics.BATCH_PREDICT_SECONDS.count()
+    fills = metrics.BATCH_FILL_RATIO.count()
+    runner.predict([{"in": b"x"}] * 6)
+    assert metrics.BATCH_PREDICT_SECONDS.count() == batches + 2
+    assert metrics.BATCH_FILL_RATIO.count() == fills + 2
@@ -103,3 +103,16 @@ def test_add_multiple_outputs():
     assert obj.outputs[1].filename == "explanation"
     assert obj.outputs[1].media_type == "text/plain"
     assert obj.outputs[1].max_size == "10K"
+
+
+def test_add_tensor_input_and_output():
+    md = ModelMetadata.default()
+    md.add_input("features", dtype="float32", shape=[-1, 4])
+    md.add_output("scores", dtype=float)
+    obj: StatusResponse = StatusResponse.FromString(md.serialize())
+    assert obj.inputs[0].dtype == "float32"
+    assert obj.inputs[0].shape == [-1, 4]
+    assert obj.outputs[0].dtype == "float64"
+    assert obj.outputs[0].shape == []
+    with pytest.raises(ValueError):
+        md.add_input("text", dtype="str")
@@ -0,0 +1,187 @@
+import json
+import threading
+
+import cloudpickle
+import numpy as np
+
+from chassisml import ChassisModel
+from chassis.builder import BuildOptions
+from chassis.runtime import ModelRunner
+from chassis.runtime.model_runner import is_error_output
+from chassis.runtime.timings import StageTimings
+
+
+def test_predict_iter_yields_each_batch(batch_predict_function):
+    runner = ModelRunner(batch_predict_function, batch_size=4)
+    inputs = [{"input": str(i).encode()} for i in range(10)]
+    chunks = list(runner.predict_iter(inputs))
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert [o for c in chunks for o in c] == inputs
+
+
+def test_predict_iter_yields_each_single_output(predict_function):
+    runner = ModelRunner(predict_function)
+    inputs = [{"input": str(i).encode()} for i in range(3)]
+    chunks = list(runner.predict_iter(inputs))
+    assert chunks == [[i] for i in inputs]
+
+
+def test_warmup_is_packaged_next_to_the_model(tmp_path, monkeypatch, predict_function):
+    model = ChassisModel(predict_function, warmup_inputs=[{"input": b"warm"}])
+    model.metadata.model_name = "Warmup Model"
+    model.metadata.model_version = "0.0.1"
+    model.metadata.add_input("input")
+    model.metadata.add_output("input")
+    model.prepare_context(BuildOptions(base_dir=str(tmp_path)))
+    assert (tmp_path / "data" / "warmup.pkl").exists()
+
+    monkeypatch.chdir(tmp_path)
+    runner = ModelRunner.load()
+    assert runner.warmup_inputs == [{"input": b"warm"}]
+    runner.warmup()
+
+
+def test_concurrent_predict_keeps_order_and_errors():
+    # Every input waits until four are in flight at once, so the inputs can
+    # only get past the barrier if they run concurrently.
+    barrier = threading.Barrier(4, timeout=5)
+
+    def predict(input_item):
+        barrier.wait()
+        if input_item["input"] == b"3":
+            raise ValueError("bad input")
+        return input_item
+
+    runner = ModelRunner(predict, concurrency=4)
+    inputs = [{"input": str(i).encode()} for i in range(8)]
+    outputs = runner.predict(inputs)
+    assert outputs[3] == {"error": b"bad input"}
+    assert [o for i, o in enumerate(outputs) if i != 3] == [x for i, x in enumerate(inputs) if i != 3]
+
+    runner = cloudpickle.loads(cloudpickle.dumps(ModelRunner(lambda input_item: input_item, concurrency=4)))
+    assert runner.concurrency == 4
+    assert runner.predict(inputs[:2]) == inputs[:2]
+
+
+def test_buffer_inputs_are_read_only_views():
+    data = bytearray(b"\x01\x02\x03\x04")
+
+    def predict(input_item):
+        view = input_item["input"]
+        assert isinstance(view, memoryview)
+        assert view.readonly
+        assert view.obj is data
+        return {"sum": bytes([sum(view)])}
+
+    runner = ModelRunner(predict, buffer_inputs=True)
+    assert runner.predict([{"input": data}]) == [{"sum": b"\x0a"}]
+
+
+def test_legacy_batch_outputs_are_encoded_per_batch():
+    def predict(inputs):
+        return np.array([[len(i), 0.5] for i in inputs])
+
+    runner = ModelRunner(predict, batch_size=2, is_legacy_fn=True)
+    inputs = [{"input": b"a" * i} for i in range(5)]
+    chunks = list(runner.predict_iter(inputs))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert [json.loads(o["results.json"]) for c in chunks for o in c] == [[i, 0.5] for i in range(5)]
+    assert runner.predict(inputs) == [o for c in chunks for o in c]
+
+
+def test_bucketed_batches_group_similar_sizes_and_keep_order():
+    batches = []
+
+    def predict(inputs):
+        batches.append([len(i["input"]) for i in inputs])
+        return [{"length": str(len(i["input"])).encode()} for i in inputs]
+
+    runner = ModelRunner(predict, batch_size=2, bucket_key=lambda i: len(i["input"]))
+    lengths = [5, 1, 4, 2, 3]
+    inputs = [{"input": b"x" * n} for n in lengths]
+    chunks = list(runner.predict_iter(inputs))
+    assert batches == [[1, 2], [3, 4], [5]]
+    assert [o["length"] for c in chunks for o in c] == [str(n).encode() for n in lengths]
+    # The first input is the longest, so nothing can be yielded before the
+    # last batch.
+    assert [len(c) for c in chunks] == [5]
+
+
+def test_failing_batch_is_bisected_to_the_bad_inputs():
+    calls = []
+
+    def predict(inputs):
+        calls.append(len(inputs))
+        if any(i["input"] == b"bad" for i in inputs):
+            raise ValueError("bad input")
+        return inputs
+
+    runner = ModelRunner(predict, batch_size=8)
+    inputs = [{"input": str(i).encode()} for i in range(8)]
+    inputs[5] = {"input": b"bad"}
+    outputs = runner.predict(inputs)
+    assert [is_error_output(o) for o in outputs] == [i == 5 for i in range(8)]
+    assert outputs[5] == {"error": b"bad input"}
+    assert [o for i, o in enumerate(outputs) if i != 5] == [x for i, x in enumerate(inputs) if i != 5]
+    # One full batch, then two halves at each of the three levels.
+    assert sorted(calls, reverse=True) == [8, 4, 4, 2, 2, 1, 1]
+
+
+def test_bisection_retries_are_timed_and_checked():
+    def predict(inputs):
+        if any(i["input"] == b"bad" for i in inputs):
+            raise ValueError("bad input")
+        # Drops an output, so it can't be matched to its input.
+        if any(i["input"] == b"short" for i in inputs):
+            return inputs[1:]
+        return inputs
+
+    runner = ModelRunner(predict, batch_size=4)
+    inputs = [{"input": b"0"}, {"input": b"bad"}, {"input": b"short"}, {"input": b"3"}]
+    timings = StageTimings()
+    outputs = runner.predict(inputs, timings)
+    assert [is_error_output(o) for o in outputs] == [False, True, True, False]
+    assert outputs[0] == inputs[0]
+    assert outputs[3] == inputs[3]
+    assert b"1 inputs" in outputs[2]["error"]
+    # Every call that returned is timed, including the ones whose outputs
+    # were rejected: the second half, then three of the four single inputs.
+    assert len(timings.stages["predict"]) == 4
+
+
+def test_batch_isolation_retries_are_bounded():
+    calls = []
+
+    def predict(inputs):
+        calls.append(len(inputs))
+        raise ValueError("always fails")
+
+    runner = ModelRunner(predict, batch_size=64)
+    outputs = runner.predict([{"input": b""}] * 64)
+    assert all(is_error_output(o) for o in outputs)
+    assert len(calls) == 1 + 4 * (64).bit_length()
+
+
+def test_predict_records_stage_timings():
+    runner = ModelRunner(lambda inputs: [{"out": i["in"]} for i in inputs], batch_size=2, buffer_inputs=True)
+    timings = StageTimings()
+    runner.predict([{"in": b"x"}] * 5, timings)
+    assert set(timings.stages) == {"input", "predict"}
+    assert len(timings.stages["predict"]) == 3
+
+    legacy = ModelRunner(lambda inputs: [{"out": 1} for _ in inputs], batch_size=2, is_legacy_fn=True)
+    timings = StageTimings()
+    legacy.predict([{"input": b"x"}] * 3, timings)
+    assert len(timings.stages["predict"]) == len(timings.stages["encode"]) == 2
+    assert StageTimings.from_json(timings.to_json()).stages == timings.stages
+
+
+def test_runner_pickled_before_new_attributes_loads(batch_predict_function):
+    state = ModelRunner(batch_predict_function, batch_size=4).__getstate__()
+    for key in ["concurrency", "buffer_inputs", "adaptive_batching", "bucket_key", "warmup_inputs", "warmup_fn"]:
+        del state[key]
+    runner = ModelRunner.__new__(ModelRunner)
+    runner.__setstate__(state)
+    runner.warmup()
+    inputs = [{"input": b"a"}, {"input": b"b"}]
+    assert runner.predict(inputs) == inputs
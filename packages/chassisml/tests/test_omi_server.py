@@ -0,0 +1,230 @@
+import asyncio
+import contextlib
+import itertools
+import socket
+import threading
+
+import numpy as np
+import pytest
+from grpclib.const import Status
+from grpclib.exceptions import GRPCError
+from grpclib.health.service import Health
+from grpclib.server import Server
+from grpclib.health.v1.health_grpc import HealthStub
+from grpclib.health.v1.health_pb2 import HealthCheckRequest, HealthCheckResponse
+from grpclib.testing import ChannelFor
+
+from chassis.protos.v1.model_grpc import ModzyModelStub
+from chassis.protos.v1.model_pb2 import ModelInput, ModelOutput, StatusRequest, StatusResponse
+from chassis.client import OMIClient
+from chassis.runtime import ModelRunner
+from chassis.runtime.tensors import tensor_from_proto
+from chassis.server.omi.server import ModzyModel, get_codec
+
+SERVICE = "ModzyModel"
+SERVING = HealthCheckResponse.SERVING
+NOT_SERVING = HealthCheckResponse.NOT_SERVING
+
+
+@pytest.fixture(autouse=True)
+def model_info(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    metadata = StatusResponse(inputs=[ModelInput(filename="input")], outputs=[ModelOutput(filename="results.json")])
+    (tmp_path / "data" / "model_info").write_bytes(metadata.SerializeToString())
+    monkeypatch.chdir(tmp_path)
+
+
+def _runner():
+    return ModelRunner(lambda inputs: [{"results.json": i["input"].upper()} for i in inputs], batch_size=4)
+
+
+class SlowLoad:
+    """
+    Replaces `ModelRunner.load` with a load that blocks until it's released.
+    """
+
+    def __init__(self, monkeypatch, result=_runner):
+        self.release = threading.Event()
+        self.calls = 0
+        self.result = result
+        monkeypatch.setattr(ModelRunner, "load", self)
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.result()
+
+
+async def _health(channel):
+    response = await HealthStub(channel).Check(HealthCheckRequest(service=SERVICE))
+    return response.status
+
+
+def test_eager_load_gates_health(monkeypatch):
+    load = SlowLoad(monkeypatch)
+
+    async def scenario():
+        server = ModzyModel()
+        async with ChannelFor([server, Health({server: [server.health]})]) as channel:
+            assert await _health(channel) == NOT_SERVING
+            server.start_loading()
+            await asyncio.sleep(0.05)
+            assert await _health(channel) == NOT_SERVING
+            load.release.set()
+            assert await server.start_loading()
+            assert await _health(channel) == SERVING
+            response = await ModzyModelStub(channel).Status(StatusRequest())
+            assert response.status_code == 200
+            assert load.calls == 1
+        server.executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_status_timeout_does_not_cancel_the_load(monkeypatch):
+    load = SlowLoad(monkeypatch)
+
+    async def scenario():
+        server = ModzyModel()
+        async with ChannelFor([server, Health({server: [server.health]})]) as channel:
+            stub = ModzyModelStub(channel)
+            with pytest.raises(asyncio.TimeoutError):
+                await stub.Status(StatusRequest(), timeout=0.05)
+            load.release.set()
+            assert await server.start_loading()
+            assert await _health(channel) == SERVING
+            assert (await stub.Status(StatusRequest())).status_code == 200
+            assert load.calls == 1
+        server.executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("failure", ["none", "error"])
+def test_failed_load_reports_unhealthy_and_can_be_retried(monkeypatch, failure):
+    def fail():
+        if failure == "error":
+            raise RuntimeError("warmup failed")
+        return None
+
+    load = SlowLoad(monkeypatch, result=fail)
+    load.release.set()
+
+    async def scenario():
+        server = ModzyModel()
+        async with ChannelFor([server, Health({server: [server.health]})]) as channel:
+            stub = ModzyModelStub(channel)
+            assert (await stub.Status(StatusRequest())).status_code == 500
+            assert await _health(channel) == NOT_SERVING
+            assert server._loading is None
+            load.result = _runner
+            assert (await stub.Status(StatusRequest())).status_code == 200
+            assert await _health(channel) == SERVING
+        server.executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+@contextlib.asynccontextmanager
+async def _serving(model):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = Server([model], codec=get_codec())
+    await server.start("127.0.0.1", port)
+    client = OMIClient("127.0.0.1", port)
+    try:
+        yield client
+    finally:
+        await client.__aexit__(None, None, None)
+        server.close()
+        await server.wait_closed()
+        model.executor.shutdown()
+
+
+def _stream_runner(calls):
+    def predict(inputs):
+        calls.append(len(inputs))
+        if any(i["input"] == b"bad" for i in inputs):
+            raise ValueError("bad input")
+        return [{"results.json": i["input"].upper()} for i in inputs]
+
+    return ModelRunner(predict, batch_size=4)
+
+
+def test_run_stream_returns_outputs_in_order_with_per_item_errors():
+    calls = []
+    values = [str(i).encode() for i in range(10)]
+    values[6] = b"bad"
+
+    async def scenario():
+        async with _serving(ModzyModel(model=_stream_runner(calls))) as client:
+            return [o async for o in client.run_stream(({"input": v} for v in values), chunk_size=3)]
+
+    outputs = asyncio.run(scenario())
+    assert [o.success for o in outputs] == [v != b"bad" for v in values]
+    assert [o.output["results.json"] for o in outputs if o.success] == [v for v in values if v != b"bad"]
+    assert b"bad input" in outputs[6].output["error"]
+    # The failing request is retried in halves to isolate the bad input.
+    assert calls == [3, 3, 3, 1, 2, 1]
+
+
+def test_run_stream_fails_every_input_of_a_failed_request():
+    async def scenario():
+        async with _serving(ModzyModel()) as client:
+            return [o async for o in client.run_stream([{"input": b"a"}, {"input": b"b"}])]
+
+    outputs = asyncio.run(scenario())
+    assert len(outputs) == 2
+    assert not any(o.success for o in outputs)
+    assert b"not been initialized" in outputs[0].output["error"]
+
+
+def test_client_can_close_a_stream_early():
+    calls = []
+
+    async def scenario():
+        async with _serving(ModzyModel(model=_stream_runner(calls))) as client:
+            # The inputs never end, so the stream only stops because the
+            # client closes it.
+            outputs = client.run_stream(({"input": str(i).encode()} for i in itertools.count()), chunk_size=2)
+            first = [o.output["results.json"] async for o in _take(outputs, 3)]
+            await outputs.aclose()
+            # The server keeps serving the client's other calls.
+            again = [o.output["results.json"] async for o in client.run_stream([{"input": b"x"}])]
+            return first, again
+
+    assert asyncio.run(scenario()) == ([b"0", b"1", b"2"], [b"X"])
+
+
+async def _take(iterator, n):
+    async for item in iterator:
+        yield item
+        n -= 1
+        if n == 0:
+            return
+
+
+@pytest.mark.parametrize("features", [
+    np.zeros((2, 4), dtype=np.float32),
+    np.zeros((2, 3), dtype=np.float64),
+])
+def test_tensors_that_dont_match_their_declaration_are_invalid(tmp_path, features):
+    metadata = StatusResponse(
+        inputs=[ModelInput(filename="features", dtype="float32", shape=[-1, 3])],
+        outputs=[ModelOutput(filename="sum", dtype="float32")],
+    )
+    (tmp_path / "data" / "model_info").write_bytes(metadata.SerializeToString())
+    runner = ModelRunner(lambda inputs: [{"sum": i["features"].sum(axis=1)} for i in inputs], batch_size=4)
+
+    async def scenario():
+        async with _serving(ModzyModel(model=runner)) as client:
+            result = await client.run([{"features": np.ones((2, 3), dtype=np.float32)}])
+            np.testing.assert_array_equal(tensor_from_proto(result.outputs[0].tensors["sum"]), [3, 3])
+            with pytest.raises(GRPCError) as run_error:
+                await client.run([{"features": features}])
+            with pytest.raises(GRPCError) as stream_error:
+                [o async for o in client.run_stream([{"features": features}])]
+            return run_error.value.status, stream_error.value.status
+
+    assert asyncio.run(scenario()) == (Status.INVALID_ARGUMENT, Status.INVALID_ARGUMENT)
@@ -0,0 +1,102 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from chassis.runtime import pickling
+
+
+def test_large_arrays_are_extracted_and_memory_mapped(tmp_path):
+    weights = np.arange(1024, dtype=np.float64)
+    bias = np.ones(4)
+
+    def predict(x):
+        return x @ weights[:4] + bias
+
+    f = io.BytesIO()
+    pickling.dump({"model": predict, "copy": weights}, f, weights_dir=str(tmp_path), min_size=1024)
+    # The same array is only written once and small arrays stay in the pickle.
+    assert len(os.listdir(tmp_path)) == 1
+    assert f.tell() < weights.nbytes
+
+    f.seek(0)
+    loaded = pickling.load(f, str(tmp_path))
+    assert isinstance(loaded["copy"], np.memmap)
+    np.testing.assert_array_equal(loaded["copy"], weights)
+    np.testing.assert_array_equal(loaded["model"](np.ones(4)), predict(np.ones(4)))
+    # Weights are copy-on-write, so modifying them doesn't change the file.
+    loaded["copy"][0] = -1
+    f.seek(0)
+    assert pickling.load(f, str(tmp_path))["copy"][0] == 0
+
+
+def test_dump_without_weights_dir_keeps_arrays_in_pickle(tmp_path):
+    f = io.BytesIO()
+    pickling.dump(np.zeros(1024), f)
+    f.seek(0)
+    loaded = pickling.load(f, str(tmp_path))
+    assert not isinstance(loaded, np.memmap)
+    assert f.tell() > loaded.nbytes
+
+
+def test_out_of_band_buffers_are_aligned_and_memory_mapped(tmp_path):
+    arrays = [np.arange(2000, dtype=np.int16), np.random.rand(3, 500), np.ones(4)]
+    buffers_path = str(tmp_path / "model.pkl.buffers")
+    f = io.BytesIO()
+    with open(buffers_path, "wb") as buffers_file:
+        pickling.dump(arrays, f, buffers_file=buffers_file)
+    # Only the small array's data is in the pickle.
+    assert f.tell() < 1024
+
+    f.seek(0)
+    loaded = pickling.load(f, str(tmp_path), buffers_path)
+    for array, expected in zip(loaded, arrays):
+        np.testing.assert_array_equal(array, expected)
+    assert loaded[1].ctypes.data % 64 == 0
+    # Buffers are copy-on-write.
+    loaded[1][0, 0] = -1
+    f.seek(0)
+    assert pickling.load(f, str(tmp_path), buffers_path)[1][0, 0] == arrays[1][0, 0]
+
+
+def test_repeated_arrays_are_hashed_once(tmp_path, monkeypatch):
+    weights = np.arange(1024, dtype=np.float64)
+    extracted = []
+    extract = pickling.WeightsPickler._extract
+    monkeypatch.setattr(pickling.WeightsPickler, "_extract",
+                        lambda self, array, kind: extracted.append(kind) or extract(self, array, kind))
+    f = io.BytesIO()
+    pickling.dump([weights, weights, {"copy": weights}], f, weights_dir=str(tmp_path), min_size=1024)
+    assert extracted == ["numpy"]
+
+
+def test_tensor_views_share_their_storage_after_loading(tmp_path):
+    torch = pytest.importorskip("torch")
+    base = torch.arange(512, dtype=torch.float32)
+    model = {
+        "base": base,
+        "view": base[10:20],
+        "transposed": base.view(16, 32).t(),
+        "same_contents": torch.arange(512, dtype=torch.float32),
+        "param": torch.nn.Parameter(torch.ones(512)),
+        "frozen": torch.nn.Parameter(torch.ones(512), requires_grad=False),
+        "bfloat16": torch.ones(1024, dtype=torch.bfloat16),
+    }
+    f = io.BytesIO()
+    pickling.dump(model, f, weights_dir=str(tmp_path), min_size=1024)
+    # Storages with the same contents are written once.
+    assert len(os.listdir(tmp_path)) == 3
+    assert f.tell() < 2048
+
+    f.seek(0)
+    loaded = pickling.load(f, str(tmp_path))
+    for key, tensor in model.items():
+        assert type(loaded[key]) is type(tensor)
+        assert loaded[key].requires_grad == tensor.requires_grad
+        assert loaded[key].stride() == tensor.stride()
+        assert torch.equal(loaded[key], tensor)
+    loaded["base"][15] = -1
+    assert loaded["view"][5] == -1
+    assert loaded["transposed"][15, 0] == -1
+    assert loaded["same_contents"][15] == 15
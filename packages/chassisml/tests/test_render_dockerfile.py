@@ -41,3 +41,17 @@ def test_render_dockerfile_with_apt_packages(echo_predict_function):
     options = BuildOptions()
     rendered_dockerfile = model.render_dockerfile(options)
     assert re.search("apt-get install -y (?:libgmp |opencv-headless ){2}", rendered_dockerfile) is not None
+
+
+def test_render_dockerfile_with_input_deduplication(echo_predict_function):
+    model = ChassisModel(echo_predict_function)
+    rendered_dockerfile = model.render_dockerfile(BuildOptions(deduplicate_inputs=True))
+    assert 'ENV CHASSIS_DEDUPLICATE_INPUTS="true"' in rendered_dockerfile.splitlines()
+
+
+def test_render_dockerfile_with_extracted_weights(echo_predict_function):
+    model = ChassisModel(echo_predict_function)
+    assert "COPY weights data/weights" not in model.render_dockerfile(BuildOptions())
+    rendered_dockerfile = model.render_dockerfile(BuildOptions(extract_weights=True))
+    lines = rendered_dockerfile.splitlines()
+    assert lines.index("COPY weights data/weights") < lines.index("COPY data data")
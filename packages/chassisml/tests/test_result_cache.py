@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+
+from chassisml import ChassisModel
+from chassis.builder import BuildOptions
+from chassis.runtime import ModelRunner
+from chassis.runtime.cache import ResultCache, hash_input
+
+
+def test_hash_input_depends_on_keys_and_content():
+    assert hash_input({"a": b"1", "b": b"2"}) == hash_input({"b": b"2", "a": b"1"})
+    assert hash_input({"a": b"12"}) != hash_input({"a1": b"2"})
+    assert hash_input({"a": memoryview(b"xy")}) == hash_input({"a": b"xy"})
+    assert hash_input({"a": np.zeros(2, dtype=np.int32)}) != hash_input({"a": np.zeros((1, 2), dtype=np.int32)})
+
+
+def test_cache_evicts_least_recently_used_within_budget():
+    cache = ResultCache(max_memory=3 * 300)
+    for key in (b"a", b"b", b"c"):
+        cache.put(key, {"out": key})
+    assert cache.get(b"a") is not None
+    cache.put(b"d", {"out": b"d"})
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+
+def test_cache_entries_expire():
+    cache = ResultCache(max_memory=1024, ttl=0.01)
+    cache.put(b"a", {"out": b"a"})
+    time.sleep(0.02)
+    assert cache.get(b"a") is None
+    assert len(cache) == 0
+
+
+def test_only_cache_misses_reach_the_model():
+    batches = []
+
+    def predict(inputs):
+        batches.append([i["input"] for i in inputs])
+        return [{"output": i["input"] * 2} for i in inputs]
+
+    runner = ModelRunner(predict, batch_size=4)
+    runner.result_cache = ResultCache(max_memory=1024 * 1024)
+    assert runner.predict([{"input": b"a"}, {"input": b"b"}]) == [{"output": b"aa"}, {"output": b"bb"}]
+    assert runner.predict([{"input": b"b"}, {"input": b"c"}, {"input": b"a"}]) == [
+        {"output": b"bb"}, {"output": b"cc"}, {"output": b"aa"}]
+    assert batches == [[b"a", b"b"], [b"c"]]
+    assert (runner.result_cache.hits, runner.result_cache.misses) == (2, 3)
+
+
+def test_cache_options_are_rendered_into_the_dockerfile(echo_predict_function):
+    model = ChassisModel(echo_predict_function)
+    dockerfile = model.render_dockerfile(BuildOptions(result_cache_max_memory="256M", result_cache_ttl=60))
+    assert 'ENV CHASSIS_RESULT_CACHE_MAX_MEMORY="256M"' in dockerfile.splitlines()
+    assert 'ENV CHASSIS_RESULT_CACHE_TTL="60"' in dockerfile.splitlines()
+    assert "CHASSIS_RESULT_CACHE" not in model.render_dockerfile(BuildOptions())
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+from chassis.runtime.numpy_encoder import NumpyEncoder
+from chassis.runtime.serializers import get_serializer, orjson
+
+RESULT = {
+    "array": np.arange(4, dtype=np.int64).reshape(2, 2),
+    "float16": np.float16(0.5),
+    "uint8": np.uint8(7),
+    "bool": np.bool_(True),
+    "strided": np.arange(6, dtype=np.float64)[::2],
+    "nested": [{"score": np.float32(0.25)}],
+}
+EXPECTED = {
+    "array": [[0, 1], [2, 3]],
+    "float16": 0.5,
+    "uint8": 7,
+    "bool": True,
+    "strided": [0.0, 2.0, 4.0],
+    "nested": [{"score": 0.25}],
+}
+
+
+def test_numpy_encoder_handles_all_scalar_types():
+    assert json.loads(json.dumps(RESULT, cls=NumpyEncoder)) == EXPECTED
+
+
+@pytest.mark.parametrize("name", [
+    "json",
+    pytest.param("orjson", marks=pytest.mark.skipif(orjson is None, reason="orjson is not installed")),
+])
+def test_serializers_produce_the_same_json(name):
+    assert json.loads(get_serializer(name).dumps(RESULT)) == EXPECTED
+
+
+def test_unknown_serializer():
+    with pytest.raises(ValueError):
+        get_serializer("pickle")
+
+
+def test_default_serializer_is_json(monkeypatch):
+    monkeypatch.delenv("CHASSIS_JSON_SERIALIZER", raising=False)
+    assert get_serializer().name == "json"
+    # NaN and integers wider than 64 bits are written like `json.dumps` does.
+    assert get_serializer().dumps({"score": float("nan"), "id": 2 ** 70}) == b'{"score":NaN,"id":1180591620717411303424}'
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_falls_back_to_json_for_unsupported_values():
+    serializer = get_serializer("orjson")
+    assert serializer.dumps({"id": 2 ** 70}) == b'{"id":1180591620717411303424}'
+    assert serializer.dumps_batch([{"id": 1}, {"id": 2 ** 70}]) == [b'{"id":1}', b'{"id":1180591620717411303424}']
+    assert serializer.dumps({"score": float("nan")}) == b'{"score":null}'
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from chassis.runtime.singleflight import SingleFlight
+
+
+def test_concurrent_identical_inputs_share_one_inference():
+    calls = []
+
+    async def predict(inputs):
+        calls.append([i["in"] for i in inputs])
+        await asyncio.sleep(0.05)
+        return [{"out": i["in"] * 2} for i in inputs]
+
+    async def main():
+        single_flight = SingleFlight()
+        results = await asyncio.gather(
+            single_flight.run([{"in": b"a"}, {"in": b"b"}, {"in": b"a"}], predict),
+            single_flight.run([{"in": b"b"}, {"in": b"c"}], predict),
+        )
+        # Nothing is in flight anymore, so the same input runs again.
+        results.append(await single_flight.run([{"in": b"a"}], predict))
+        return single_flight, results
+
+    single_flight, results = asyncio.run(main())
+    assert calls == [[b"a", b"b"], [b"c"], [b"a"]]
+    assert results == [
+        [{"out": b"aa"}, {"out": b"bb"}, {"out": b"aa"}],
+        [{"out": b"bb"}, {"out": b"cc"}],
+        [{"out": b"aa"}],
+    ]
+    assert single_flight.deduplicated == 2
+
+
+def test_errors_and_cancellation_are_shared_safely():
+    async def predict(inputs):
+        await asyncio.sleep(0.05)
+        if inputs[0]["in"] == b"bad":
+            raise ValueError("failed")
+        return [{"out": b"ok"} for _ in inputs]
+
+    async def main():
+        single_flight = SingleFlight()
+        with pytest.raises(ValueError):
+            await asyncio.gather(
+                single_flight.run([{"in": b"bad"}], predict),
+                single_flight.run([{"in": b"bad"}], predict),
+            )
+        # Cancelling the caller that started an inference doesn't cancel it
+        # for the callers sharing it.
+        first = asyncio.ensure_future(single_flight.run([{"in": b"x"}], predict))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(single_flight.run([{"in": b"x"}], predict))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == [{"out": b"ok"}]
+
+
+def test_shared_errors_reach_every_caller_and_cancelled_sharers_dont_cancel():
+    calls = []
+
+    async def predict(inputs):
+        calls.append(len(inputs))
+        await asyncio.sleep(0.05)
+        if inputs[0]["in"] == b"bad":
+            raise ValueError("failed")
+        return [{"out": b"ok"} for _ in inputs]
+
+    async def main():
+        single_flight = SingleFlight()
+        errors = await asyncio.gather(
+            single_flight.run([{"in": b"bad"}], predict),
+            single_flight.run([{"in": b"bad"}], predict),
+            return_exceptions=True,
+        )
+        assert [type(e) for e in errors] == [ValueError, ValueError]
+        # Cancelling a caller that joined an inference in flight doesn't
+        # cancel it for the caller that started it.
+        first = asyncio.ensure_future(single_flight.run([{"in": b"x"}], predict))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(single_flight.run([{"in": b"x"}], predict))
+        await asyncio.sleep(0)
+        second.cancel()
+        return await first
+
+    assert asyncio.run(main()) == [{"out": b"ok"}]
+    assert calls == [1, 1]
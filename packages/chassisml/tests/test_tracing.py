@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from chassis.runtime import InferenceExecutor, ModelRunner, tracing
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    in_memory = pytest.importorskip("opentelemetry.sdk.trace.export.in_memory_span_exporter")
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+    exporter = in_memory.InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return exporter
+
+
+def test_model_spans_are_children_of_the_server_span(exporter):
+    exporter.clear()
+    runner = ModelRunner(lambda inputs: [{"out": i["in"]} for i in inputs], batch_size=2)
+    executor = InferenceExecutor()
+
+    async def main():
+        with tracing.start_span("client", kind=tracing.SPAN_KIND_CLIENT):
+            metadata = tracing.inject({"chassis-compression": "gzip"})
+        assert metadata["chassis-compression"] == "gzip"
+        with tracing.start_span("server", kind=tracing.SPAN_KIND_SERVER, carrier=metadata):
+            await executor.predict(runner, [{"in": b"a"}] * 3)
+
+    asyncio.run(main())
+    executor.shutdown()
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert spans["server"].parent.span_id == spans["client"].context.span_id
+    assert spans["ModelRunner.predict"].parent.span_id == spans["server"].context.span_id
+    batches = [s for s in exporter.get_finished_spans() if s.name == "ModelRunner.batch"]
+    assert [s.attributes["chassis.batch_size"] for s in batches] == [2, 1]
+    assert all(s.parent.span_id == spans["ModelRunner.predict"].context.span_id for s in batches)
+
+
+def test_spans_are_noops_without_opentelemetry(monkeypatch):
+    monkeypatch.setattr(tracing, "trace", None)
+    monkeypatch.setattr(tracing, "propagate", None)
+    with tracing.start_span("noop") as span:
+        span.set_attribute("key", "value")
+        assert not span.is_recording()
+    assert tracing.inject(None) is None
+    assert tracing.inject({"key": "value"}) == {"key": "value"}
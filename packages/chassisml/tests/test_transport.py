@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from grpclib.const import Status
+from grpclib.exceptions import GRPCError
+
+from chassis.protos.v1.model_pb2 import InputItem, RunRequest
+from chassis.runtime.tensors import tensor_from_proto, tensor_to_proto
+from chassis.runtime.transport import (SizeLimitedProtoCodec, compress,
+                                       compress_mapping, decode_item,
+                                       decompress, decompress_mapping,
+                                       encode_item, parse_size,
+                                       validate_compression)
+
+
+def test_parse_size():
+    assert parse_size(None) is None
+    assert parse_size(1000) == 1000
+    assert parse_size("1000") == 1000
+    assert parse_size("4K") == 4096
+    assert parse_size("1.5M") == 1536 * 1024
+    assert parse_size("1GB") == 1024 ** 3
+
+
+@pytest.mark.parametrize("compression", ["gzip", "deflate", None])
+def test_compression_round_trip(compression):
+    data = {"input": b"abc" * 1000, "config.json": b"{}"}
+    compressed = compress_mapping(data, compression)
+    assert decompress_mapping(compressed, compression) == data
+
+
+@pytest.mark.parametrize("compression", ["gzip", "deflate"])
+def test_decompression_is_bounded(compression):
+    # A few kilobytes that expand to 16MB.
+    bomb = compress(b"\0" * (16 << 20), compression)
+    assert len(bomb) < 64 << 10
+    with pytest.raises(GRPCError) as e:
+        decompress(bomb, compression, max_size=1 << 20)
+    assert e.value.status == Status.RESOURCE_EXHAUSTED
+    data = b"x" * 1024
+    assert decompress(compress(data, compression), compression, max_size=1024) == data
+    with pytest.raises(GRPCError) as e:
+        decompress(compress(data, compression)[:-4], compression)
+    assert e.value.status == Status.INVALID_ARGUMENT
+
+
+def test_unsupported_compression():
+    assert validate_compression("none") is None
+    assert validate_compression("GZIP") == "gzip"
+    with pytest.raises(ValueError):
+        validate_compression("brotli")
+
+
+def test_codec_enforces_message_size_limits():
+    message = RunRequest(inputs=[InputItem(input={"input": b"x" * 1024})])
+    data = SizeLimitedProtoCodec().encode(message, RunRequest)
+    with pytest.raises(GRPCError):
+        SizeLimitedProtoCodec(max_send_message_size=1024).encode(message, RunRequest)
+    with pytest.raises(GRPCError):
+        SizeLimitedProtoCodec(max_receive_message_size=1024).decode(data, RunRequest)
+    assert SizeLimitedProtoCodec(max_receive_message_size=2048).decode(data, RunRequest) == message
+
+
+@pytest.mark.parametrize("compression", ["gzip", None])
+def test_tensor_round_trip(compression):
+    features = np.arange(12, dtype=np.float32).reshape(3, 4)
+    values, tensors = encode_item({"features": features, "config.json": b"{}"}, compression)
+    assert list(values) == ["config.json"]
+    item = InputItem(input=values, tensors=tensors)
+    data = decode_item(item.input, item.tensors, compression)
+    assert data["config.json"] == b"{}"
+    assert data["features"].dtype == np.float32
+    assert not data["features"].flags.writeable
+    np.testing.assert_array_equal(data["features"], features)
+
+
+def test_tensor_from_big_endian_and_non_contiguous_arrays():
+    array = np.arange(6, dtype=">i4").reshape(2, 3).T
+    tensor = tensor_to_proto(array)
+    assert tensor.dtype == "int32"
+    assert list(tensor.shape) == [3, 2]
+    np.testing.assert_array_equal(tensor_from_proto(tensor), array)
+
+
+def test_tensor_size_mismatch_is_invalid_argument():
+    values, tensors = encode_item({"features": np.zeros((2, 3), dtype=np.float32)}, None)
+    tensors["features"].shape[:] = [2, 4]
+    with pytest.raises(GRPCError) as e:
+        decode_item(values, tensors, None)
+    assert e.value.status == Status.INVALID_ARGUMENT
+    tensors["features"].shape[:] = [-2, -3]
+    with pytest.raises(GRPCError):
+        decode_item(values, tensors, None)
+
+
+def test_tensors_are_checked_against_their_declaration():
+    declared = {"features": ("float32", [-1, 3])}
+    for features in (np.zeros((5, 3), dtype=np.float32), np.zeros((1, 3), dtype=np.float32)):
+        values, tensors = encode_item({"features": features}, None)
+        assert decode_item(values, tensors, None, declared=declared)["features"].shape == features.shape
+    for features in (np.zeros((5, 4), dtype=np.float32), np.zeros(3, dtype=np.float32), np.zeros((5, 3))):
+        values, tensors = encode_item({"features": features}, None)
+        with pytest.raises(GRPCError) as e:
+            decode_item(values, tensors, None, declared=declared)
+        assert e.value.status == Status.INVALID_ARGUMENT
+    # Tensors declared without a shape can have any shape.
+    values, tensors = encode_item({"features": np.zeros((2, 2, 2), dtype=np.float32)}, None)
+    decode_item(values, tensors, None, declared={"features": ("float32", [])})
@@ -0,0 +1,54 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from chassis.server.omi.workers import run_workers
+
+
+@pytest.fixture(autouse=True)
+def default_signal_handlers():
+    # Other modules imported by the test session (e.g. kserve) install
+    # their own handlers, which the workers would inherit.
+    handlers = {signum: signal.signal(signum, signal.SIG_DFL) for signum in (signal.SIGTERM, signal.SIGINT)}
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+def _sleep(worker_id):
+    time.sleep(30)
+
+
+def test_workers_stopped_by_sigterm_exit_cleanly():
+    # `docker stop` sends SIGTERM to the parent, which forwards it.
+    handler = signal.getsignal(signal.SIGTERM)
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    start = time.monotonic()
+    assert run_workers(2, _sleep) == 0
+    assert time.monotonic() - start < 10
+    assert signal.getsignal(signal.SIGTERM) == handler
+
+
+def test_worker_shutdown_stops_the_others():
+    def target(worker_id):
+        if worker_id == 0:
+            # Like the `Shutdown` RPC.
+            time.sleep(0.2)
+            os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(30)
+
+    assert run_workers(2, target) == 0
+
+
+def test_failing_worker_fails_the_parent():
+    def target(worker_id):
+        if worker_id == 0:
+            raise RuntimeError("failed to load the model")
+        time.sleep(30)
+
+    assert run_workers(2, target) == 1